@@ -0,0 +1,135 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from figures import Rectangle
+from reb_archive import (
+    MEMBER_SEPARATOR,
+    close_ranges,
+    open_source,
+    read_range
+)
+from reb_options import REBOptions
+from reb_writer import EventWriter, write_events
+from station import Station
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+        plain = os.path.join(self.directory.name, "plain", "reb")
+        packed = os.path.join(self.directory.name, "packed", "reb")
+        os.makedirs(plain)
+        os.makedirs(packed)
+
+        shutil.copy("../tests/test_new.txt", os.path.join(plain, "a.txt"))
+        shutil.copy("../tests/test_old.txt", os.path.join(plain, "b.txt"))
+
+        with open("../tests/test_new.txt", "rb") as source, \
+                gzip.open(os.path.join(packed, "a.txt.gz"), "wb") as target:
+            shutil.copyfileobj(source, target)
+
+        with zipfile.ZipFile(
+            os.path.join(packed, "b.zip"),
+            "w",
+            zipfile.ZIP_DEFLATED
+        ) as archive:
+            archive.write("../tests/test_old.txt", "b.txt")
+
+        self.plain = self._options(os.path.dirname(plain))
+        self.packed = self._options(os.path.dirname(packed))
+
+    def tearDown(self):
+        close_ranges()
+        self.directory.cleanup()
+
+    def _options(self, directory):
+        options = REBOptions(
+            Rectangle(90, -90, -180, 180),
+            directory,
+            [
+                Station("NVAR", 38.43, -118.3, [])
+            ]
+        )
+
+        options.process_directories()
+
+        return options
+
+    def test_zip_member_source(self):
+        self.assertTrue(
+            self.packed.get_events()[-1].source.endswith(
+                "b.zip" + MEMBER_SEPARATOR + "b.txt"
+            )
+        )
+
+    def test_same_events(self):
+        self.assertEqual(
+            [event.data for event in self.packed.get_events()],
+            [event.data for event in self.plain.get_events()]
+        )
+
+    def test_same_result_file(self):
+        results = []
+
+        for options in (self.plain, self.packed):
+            path = os.path.join(self.directory.name, "result.txt")
+            write_events(path, options.get_events())
+
+            with open(path, "rb") as file:
+                results.append(file.read())
+
+        self.assertEqual(results[0], results[1])
+
+    def test_sorted_result_file(self):
+        results = []
+
+        for options in (self.plain, self.packed):
+            path = os.path.join(self.directory.name, "sorted.txt")
+            write_events(
+                path,
+                options.get_events().sort("time", descending=True)
+            )
+
+            with open(path, "rb") as file:
+                results.append(file.read())
+
+        self.assertEqual(results[0], results[1])
+
+    def test_sorted_result_chunks(self):
+        path = os.path.join(self.directory.name, "sorted.txt")
+        write_events(path, self.plain.get_events().sort("time"))
+
+        # Порция из одного события: сжатые файлы читаются по очереди
+        with EventWriter(path + ".chunks") as writer:
+            writer.PREFETCH_SIZE = 1
+            writer.write_table(self.packed.get_events().sort("time"))
+
+        with open(path, "rb") as file, open(path + ".chunks", "rb") as chunks:
+            self.assertEqual(chunks.read(), file.read())
+
+    def test_gzip_result_file(self):
+        path = os.path.join(self.directory.name, "result.txt")
+        write_events(path, self.plain.get_events())
+        write_events(path + ".gz", self.plain.get_events(), compress=True)
+
+        with open(path, "rb") as file, gzip.open(path + ".gz") as packed:
+            self.assertEqual(packed.read(), file.read())
+
+    def test_prefetch_stream(self):
+        source = self.packed.get_events()[0].source
+
+        with open_source(source, prefetch=True) as file:
+            text = file.read()
+
+        self.assertEqual(
+            read_range(source, 100, 50),
+            text[100:150]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import tempfile
+import unittest
+from reb_catalog import REBCatalog
+from reb_options import REBOptions
+from figures import Rectangle
+from station import Station
+from station_index import StationFilter
+from reb_query import make_query
+from reb_formats import SNIFF_SIZE, detect_format
+from reb_parser import REBParser
+
+
+class TestCatalog(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "catalog.sqlite")
+
+        self.rect = Rectangle(
+            36,
+            25,
+            -46,
+            -35
+        )
+
+        self.stations = [
+            Station(
+                "NVAR",
+                38.43,
+                -118.3,
+                []
+            )
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _events(self, catalog):
+        options = REBOptions(
+            self.rect,
+            "../tests",
+            self.stations,
+            catalog=catalog
+        )
+
+        options.process_directories()
+
+        return [
+            (event.event, event.date, event.latitude, event.longtitude)
+            for event in options.get_events()
+        ]
+
+    def test_same_events(self):
+        self.assertEqual(
+            self._events(self.path),
+            self._events(None)
+        )
+
+    def test_second_run(self):
+        first = self._events(self.path)
+
+        self.assertEqual(
+            self._events(self.path),
+            first
+        )
+
+    def test_unchanged_files_skipped(self):
+        self._events(self.path)
+
+        with REBCatalog(self.path) as catalog:
+            self.assertEqual(
+                catalog._changed_files(
+                    [
+                        os.path.abspath("../tests/test_new.txt"),
+                        os.path.abspath("../tests/test_old.txt")
+                    ]
+                ),
+                []
+            )
+
+    def test_stations_stored(self):
+        with REBCatalog(self.path) as catalog:
+            catalog.update(["../tests/test_old.txt"])
+
+            self.assertIn(
+                "NVAR",
+                catalog.query(make_query(None, StationFilter(["NVAR"])))[0].stations
+            )
+
+
+    def test_query_without_stations(self):
+        with open("../tests/test_new.txt", "rb") as file:
+            expected = [
+                event.event for event in
+                REBParser(detect_format(file.peek(SNIFF_SIZE))).parse(
+                    file,
+                    "test_new.txt"
+                )
+            ]
+
+        with REBCatalog(self.path) as catalog:
+            catalog.update(["../tests/test_new.txt"])
+
+            events = catalog.query(make_query(None, None))
+
+            self.assertEqual([event.event for event in events], expected)
+
+    def test_many_stations(self):
+        names = ["S{:04d}".format(i) for i in range(2000)] + ["NVAR"]
+
+        with REBCatalog(self.path) as catalog:
+            catalog.update(["../tests/test_old.txt"])
+
+            self.assertEqual(
+                len(catalog.query(make_query(None, StationFilter(names)))),
+                len(catalog.query(make_query(None, StationFilter(["NVAR"]))))
+            )
+
+    def test_all_detecting_stations(self):
+        tables = []
+
+        for catalog in (None, self.path):
+            options = REBOptions(
+                self.rect,
+                "../tests",
+                self.stations,
+                catalog=catalog
+            )
+
+            options.process_directories()
+            tables.append(options.get_events())
+
+        stations = [
+            [table.stations(i) for i in range(len(table))] for table in tables
+        ]
+
+        self.assertEqual(stations[0], stations[1])
+        self.assertIn("NVAR", stations[0][0])
+        self.assertGreater(len(stations[0][0]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
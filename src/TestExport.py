@@ -0,0 +1,163 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from figures import Rectangle
+from reb_export import (
+    CSVExporter,
+    ParquetExporter,
+    export_events,
+    guess_format
+)
+from reb_options import REBOptions
+from station import Station
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+        options = REBOptions(
+            Rectangle(90, -90, -180, 180),
+            "../tests",
+            [
+                Station("NVAR", 38.43, -118.3, [])
+            ]
+        )
+
+        options.process_directories()
+
+        self.events = options.get_events()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_guess_format(self):
+        self.assertEqual(guess_format("events.csv"), ("csv", False))
+        self.assertEqual(guess_format("EVENTS.JSONL.GZ"), ("jsonl", True))
+        self.assertEqual(guess_format("result.txt"), (None, False))
+
+    def test_csv(self):
+        path = self._path("events.csv")
+        export_events(path, self.events)
+
+        with open(path, newline="") as file:
+            rows = list(csv.DictReader(file))
+
+        self.assertEqual(
+            [int(row["event"]) for row in rows],
+            list(self.events.event)
+        )
+        self.assertIn("NVAR", rows[0]["stations"].split())
+
+    def test_gzip_json_lines(self):
+        path = self._path("events.jsonl.gz")
+        export_events(path, self.events)
+
+        with gzip.open(path, "rt") as file:
+            records = [json.loads(line) for line in file]
+
+        self.assertEqual(len(records), len(self.events))
+        self.assertTrue(records[0]["time"].endswith("Z"))
+        self.assertEqual(
+            records[0]["latitude"],
+            float(str(self.events.latitude[0]))
+        )
+
+    def test_geojson(self):
+        path = self._path("events.geojson")
+        export_events(path, self.events)
+
+        with open(path) as file:
+            collection = json.load(file)
+
+        self.assertEqual(len(collection["features"]), len(self.events))
+        self.assertEqual(
+            collection["features"][0]["geometry"]["coordinates"],
+            [
+                float(str(self.events.longtitude[0])),
+                float(str(self.events.latitude[0]))
+            ]
+        )
+
+    def _break(self, batches):
+        """Первый кусок записывается, на втором выгрузка прерывается"""
+        def broken(table):
+            iterator = batches(table)
+            yield next(iterator)
+            raise OSError("диск заполнен")
+
+        return broken
+
+    def test_failed_export(self):
+        exporter = CSVExporter()
+        exporter.BATCH_SIZE = 1
+        exporter.batches = self._break(exporter.batches)
+
+        with self.assertRaises(OSError):
+            exporter.export(self._path("events.csv"), self.events)
+
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def _check_arrow_table(self, table):
+        self.assertEqual(
+            table.column("event").to_pylist(),
+            list(self.events.event)
+        )
+        self.assertEqual(
+            table.column("stations").to_pylist()[0],
+            list(self.events.stations(0))
+        )
+        self.assertEqual(
+            table.column("time").to_pylist()[0].strftime("%Y/%m/%d"),
+            self.events[0].date
+        )
+
+    @unittest.skipUnless(pyarrow, "нужен пакет pyarrow")
+    def test_arrow(self):
+        path = self._path("events.arrow")
+        export_events(path, self.events)
+
+        with pyarrow.ipc.open_file(path) as reader:
+            self._check_arrow_table(reader.read_all())
+
+    @unittest.skipUnless(pyarrow, "нужен пакет pyarrow")
+    def test_gzip_parquet(self):
+        path = self._path("events.parquet.gz")
+        export_events(path, self.events)
+
+        self._check_arrow_table(pyarrow.parquet.read_table(path))
+
+        metadata = pyarrow.parquet.ParquetFile(path).metadata
+        self.assertEqual(metadata.row_group(0).column(0).compression, "GZIP")
+        self.assertEqual(
+            os.listdir(self.directory.name),
+            ["events.parquet.gz"]
+        )
+
+    @unittest.skipUnless(pyarrow, "нужен пакет pyarrow")
+    def test_failed_parquet(self):
+        exporter = ParquetExporter()
+        exporter.BATCH_SIZE = 1
+        exporter.record_batches = self._break(exporter.record_batches)
+
+        with self.assertRaises(OSError):
+            exporter.export(self._path("events.parquet"), self.events)
+
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from figures import Rectangle
+from reb_formats import (
+    FORMATS,
+    SNIFF_SIZE,
+    NewREBFormat,
+    OldREBFormat,
+    detect_format,
+    parse_coverage
+)
+from reb_options import REBOptions
+from station import Station
+
+
+class TestFormats(unittest.TestCase):
+    def setUp(self):
+        options = REBOptions(
+            Rectangle(
+                36,
+                25,
+                -46,
+                -35
+            ),
+            "../tests",
+            [
+                Station(
+                    "NVAR",
+                    38.43,
+                    -118.3,
+                    []
+                )
+            ]
+        )
+
+        options.process_directories()
+
+        self.events = options.get_events()
+
+    def _head(
+        self,
+        name: str
+    ) -> bytes:
+        with open("../tests/" + name, "rb") as file:
+            return file.read(SNIFF_SIZE)
+
+    def test_registered_formats(self):
+        self.assertIs(FORMATS[b"GSE2.0"], OldREBFormat)
+        self.assertIs(FORMATS[b"IMS2.0"], NewREBFormat)
+
+    def test_detect_old_format(self):
+        self.assertIsInstance(
+            detect_format(self._head("test_old.txt")),
+            OldREBFormat
+        )
+
+    def test_detect_new_format(self):
+        self.assertIsInstance(
+            detect_format(self._head("test_new.txt")),
+            NewREBFormat
+        )
+
+    def test_detect_by_event(self):
+        # Незнакомый диалект, формат угадывается по строке EVENT
+        head = self._head("test_old.txt").replace(b"GSE2.0", b"GSE9.9")
+
+        self.assertIsInstance(detect_format(head), OldREBFormat)
+
+    def test_coverage(self):
+        self.assertEqual(
+            parse_coverage(self._head("test_old.txt")),
+            (("2003/04/02", "00:00:00"), ("2003/04/03", "00:00:00"))
+        )
+
+    def test_first_event_header(self):
+        depth, ndef, nsta, gap, smajor, sminor, strike, mb, ml, ms = (
+            self.events[0].header
+        )
+
+        self.assertEqual(
+            (depth, ndef, nsta, gap, strike),
+            (0, 15, 15, 107, 169)
+        )
+        self.assertAlmostEqual(smajor, 28.8, places=5)
+        self.assertAlmostEqual(mb, 3.8, places=5)
+        self.assertAlmostEqual(ms, 3.5, places=5)
+        self.assertNotEqual(ml, ml)
+
+    def test_old_event_header(self):
+        header = self.events[1].header
+
+        self.assertEqual(header[1:4], (24, 20, 183))
+        self.assertAlmostEqual(header[4], 29.0, places=5)
+        self.assertAlmostEqual(header[7], 5.0, places=5)
+        self.assertAlmostEqual(header[9], 5.6, places=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
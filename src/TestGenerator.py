@@ -0,0 +1,126 @@
+import filecmp
+import math
+import os
+import tempfile
+import unittest
+from benchmark import Corpus, run_benchmarks
+from figures import Rectangle
+from reb_generator import (
+    BulletinGenerator,
+    MIXED,
+    NEW,
+    OLD,
+    STATIONS,
+    generate_corpus
+)
+from reb_options import REBOptions
+from station import Station
+
+
+class TestGenerator(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.generator = BulletinGenerator(seed=5, events=40)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _path(self, *names):
+        return os.path.join(self.directory.name, *names)
+
+    def _events(self, directory):
+        options = REBOptions(
+            Rectangle(90, -90, -180, 180),
+            directory,
+            [Station(name, None, None, []) for name, _, _ in STATIONS]
+        )
+
+        options.process_directories()
+
+        return options.get_events()
+
+    def test_parsed_as_generated(self):
+        for reb_format in (OLD, NEW):
+            os.makedirs(self._path(reb_format))
+            expected = self.generator.write_file(
+                self._path(reb_format, "2018_01_04.txt"),
+                3,
+                reb_format
+            )
+
+            events = self._events(self._path(reb_format))
+
+            self.assertEqual(len(events), len(expected))
+
+            for event, truth in zip(events, expected):
+                self.assertEqual(
+                    (event.event, event.date, event.time[:8], event.stations),
+                    (truth.event, truth.date, truth.time[:8], truth.stations)
+                )
+                self.assertAlmostEqual(event.latitude, truth.latitude, 3)
+                self.assertEqual(
+                    [None if math.isnan(value) else round(value, 1)
+                     for value in event.header],
+                    [None if math.isnan(value) else value
+                     for value in truth.header]
+                )
+
+    def test_reproducible(self):
+        for name in ("a.txt", "b.txt"):
+            self.generator.write_file(self._path(name), 7)
+
+        BulletinGenerator(seed=6, events=40).write_file(self._path("c.txt"), 7)
+
+        self.assertTrue(
+            filecmp.cmp(self._path("a.txt"), self._path("b.txt"), False)
+        )
+        self.assertFalse(
+            filecmp.cmp(self._path("a.txt"), self._path("c.txt"), False)
+        )
+
+    def test_compressed_corpus(self):
+        paths = generate_corpus(
+            self._path("plain"),
+            4,
+            self.generator,
+            MIXED,
+            files_per_directory=2
+        )
+        generate_corpus(
+            self._path("packed"),
+            4,
+            self.generator,
+            MIXED,
+            files_per_directory=2,
+            compress=".gz"
+        )
+
+        self.assertEqual(len(os.listdir(self._path("plain"))), 2)
+        self.assertEqual(
+            list(self._events(self._path("packed")).event),
+            list(self._events(self._path("plain")).event)
+        )
+        self.assertEqual(len(self._events(self._path("plain"))), 4 * 40)
+        self.assertTrue(paths[0].endswith("2018_01_01.txt"))
+
+    def test_benchmark_record(self):
+        paths = generate_corpus(self._path("corpus"), 2, self.generator)
+
+        corpus = Corpus(
+            self._path("corpus"),
+            paths,
+            dict(files=2, events=40, seed=5)
+        )
+
+        try:
+            record = run_benchmarks(corpus, ["write"], 1)
+        finally:
+            corpus.cleanup()
+
+        self.assertEqual(record["corpus"]["bytes"], corpus.size)
+        self.assertEqual(record["results"][0]["name"], "write/result")
+        self.assertGreater(record["results"][0]["rate"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+from label_layout import declutter
+
+
+class TestLabelLayout(unittest.TestCase):
+    def test_colliding_labels_dropped(self):
+        points = np.array(
+            [
+                [100, 100],
+                [110, 105],
+                [300, 100],
+                [340, 110]
+            ],
+            dtype=float
+        )
+
+        self.assertEqual(
+            declutter(points, (0, 0, 500, 500), 60, 30, 10),
+            [0, 2]
+        )
+
+    def test_outside_labels_dropped(self):
+        points = np.array([[-10, 10], [10, 10]], dtype=float)
+
+        self.assertEqual(
+            declutter(points, (0, 0, 100, 100), 60, 30, 10),
+            [1]
+        )
+
+    def test_max_labels(self):
+        points = np.array([[i * 100, 0] for i in range(10)], dtype=float)
+
+        self.assertEqual(
+            len(declutter(points, (0, 0, 1000, 100), 60, 30, 3)),
+            3
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+import unittest
+from figures import Rectangle
+from reb_options import REBOptions
+from reb_writer import EventWriter
+from run_metrics import (
+    EVENTS_ACCEPTED,
+    EVENTS_SEEN,
+    FILES,
+    FILTER,
+    PARSE,
+    WRITE,
+    RunMetrics
+)
+from station import Station
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.rect = Rectangle(
+            36,
+            25,
+            -46,
+            -35
+        )
+
+        self.station = Station(
+            "NVAR",
+            38.43,
+            -118.3,
+            []
+        )
+
+    def _options(
+        self,
+        **kwargs
+    ) -> REBOptions:
+        options = REBOptions(
+            self.rect,
+            "../tests",
+            [
+                self.station
+            ],
+            **kwargs
+        )
+
+        options.process_directories()
+
+        return options
+
+    def test_run_metrics(self):
+        serial = self._options()
+        parallel = self._options(workers=2)
+
+        counters = serial.metrics.counters
+
+        self.assertEqual(
+            (counters[FILES], counters[EVENTS_SEEN], counters[EVENTS_ACCEPTED]),
+            (2, 140, len(serial.get_events()))
+        )
+        self.assertEqual(parallel.metrics.counters, counters)
+        self.assertEqual(serial.metrics.stages[PARSE][2], 2)
+        self.assertGreater(serial.metrics.stages[FILTER][2], 0)
+        self.assertGreater(parallel.metrics.stages[FILTER][2], 0)
+
+        # Процессорное время проверок замеряется, а не копирует время по часам
+        self.assertGreater(serial.metrics.stages[FILTER][1], 0)
+        self.assertNotEqual(
+            serial.metrics.stages[FILTER][0],
+            serial.metrics.stages[FILTER][1]
+        )
+
+    def test_write_stage(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with EventWriter(os.path.join(directory, "result.txt")) as writer:
+                options = REBOptions(
+                    self.rect,
+                    "../tests",
+                    [
+                        self.station
+                    ]
+                )
+
+                options.process_directories(writer)
+
+        # Все записи попадают в этап WRITE одним вхождением на событие
+        self.assertEqual(options.metrics.stages[WRITE][2], writer.count)
+        self.assertGreater(options.metrics.stages[WRITE][0], 0)
+
+    def test_run_report(self):
+        options = self._options(
+            metrics=RunMetrics(profile=True, trace_memory=True)
+        )
+        options.metrics.finish()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "report.json")
+            options.metrics.write(path)
+
+            with open(path, encoding="utf-8") as file:
+                report = json.load(file)
+
+            self.assertTrue(
+                os.path.exists(os.path.join(directory, "report.prof"))
+            )
+
+        self.assertEqual(report["mode"], "serial")
+        self.assertEqual(
+            report["counters"][EVENTS_ACCEPTED],
+            len(options.get_events())
+        )
+        self.assertTrue(report["profile"])
+        self.assertGreater(report["memory"]["peak"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,12 @@
+import os
+import tempfile
 import unittest
 from reb_options import REBOptions
-from figures import Rectangle
+from reb_event import Event
+from figures import Rectangle, Ellipse
 from station import Station
-
+from progress import Progress
+from reb_writer import EventWriter
 
 class TestOptions(unittest.TestCase):
     def setUp(self):
@@ -51,12 +55,160 @@ class TestOptions(unittest.TestCase):
             )
         )
 
+    def test_rect_inside_many(self):
+        self.assertEqual(
+            list(
+                self.rect.check_inside_many(
+                    [30, 100],
+                    [-40, 100]
+                )
+            ),
+            [True, False]
+        )
+
+    def test_ellipse_inside_many(self):
+        ellipse = Ellipse(
+            10,
+            5,
+            30,
+            0,
+            0
+        )
+
+        latitudes = [0, 4, 6, -3, 20]
+        longtitudes = [0, 8, -2, 9, 0]
+
+        self.assertEqual(
+            list(ellipse.check_inside_many(latitudes, longtitudes)),
+            [
+                ellipse.check_inside(latitude, longtitude)
+                for latitude, longtitude in zip(latitudes, longtitudes)
+            ]
+        )
+
+    def test_rect_bounding_box(self):
+        self.assertEqual(
+            self.rect.bounding_box(),
+            (25, 36, -46, -35)
+        )
+
+    def test_ellipse_bounding_box(self):
+        latitude_min, latitude_max, longtitude_min, longtitude_max = Ellipse(
+            10,
+            5,
+            90,
+            0,
+            0
+        ).bounding_box()
+
+        self.assertAlmostEqual(latitude_max, 10)
+        self.assertAlmostEqual(longtitude_max, 5)
+
     def test_events_length(self):
         self.assertEqual(
             len(self.events),
             3
         )
 
+    def test_parallel_events(self):
+        options = REBOptions(
+            self.rect,
+            "../tests",
+            [
+                self.station
+            ],
+            workers=2
+        )
+
+        options.process_directories()
+
+        self.assertEqual(
+            [event.event for event in options.get_events()],
+            [event.event for event in self.events]
+        )
+
+    def test_progress(self):
+        self.assertEqual(
+            (self.options.progress.files_done, self.options.progress.events),
+            (2, len(self.events))
+        )
+
+    def test_cancel(self):
+        # Отменяем обработку сразу после первого файла
+        progress = Progress(
+            lambda progress: progress.files_done and progress.cancel()
+        )
+
+        options = REBOptions(
+            self.rect,
+            "../tests",
+            [
+                self.station
+            ],
+            progress=progress
+        )
+
+        options.process_directories()
+
+        self.assertEqual(
+            progress.files_done,
+            1
+        )
+
+    def test_iter_events(self):
+        options = REBOptions(
+            self.rect,
+            "../tests",
+            [
+                self.station
+            ]
+        )
+
+        self.assertEqual(
+            [event.event for event in options.iter_events()],
+            [event.event for event in self.events]
+        )
+
+    def test_discard_partial_result(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "result.txt")
+
+            with EventWriter(path, atomic=True) as writer:
+                self.options.process_directories(writer)
+                writer.discard()
+
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_table_take(self):
+        table = self.events.take([1])
+
+        self.assertEqual(
+            (table[0].event, table[0].stations, table[0].data),
+            (self.second.event, self.second.stations, self.second.data)
+        )
+
+    def test_table_filter_sort(self):
+        table = self.events.filter(self.events.between("Ms", 4.0))
+        table = table.sort("mb", descending=True)
+
+        self.assertEqual(
+            [event.event for event in table],
+            ["1641063", "1641387"]
+        )
+
+    def test_sort_missing_time(self):
+        table = self.events.take([0, 1])
+        table.append(Event(None, 0.0, 0.0, event="1", date=""))
+
+        self.assertEqual(
+            list(table.sort("time").event),
+            [int(self.second.event), int(self.first.event), 1]
+        )
+        self.assertEqual(
+            list(table.sort("time", descending=True).event),
+            [int(self.first.event), int(self.second.event), 1]
+        )
+
     def test_first_event_latitude(self):
         self.assertEqual(
             self.first.latitude,
@@ -81,6 +233,13 @@ class TestOptions(unittest.TestCase):
             "2018/05/03"
         )
 
+    def test_first_event_data(self):
+        self.assertTrue(
+            self.first.data.startswith(
+                "EVENT  15761185"
+            )
+        )
+
     def test_second_event_latitude(self):
         self.assertEqual(
             self.second.latitude,
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+from figures import Ellipse, Rectangle
+from reb_options import REBOptions, parse_file
+from reb_query import make_query
+from run_metrics import EVENTS_SEEN
+from station import Station
+from station_index import StationFilter
+
+
+class TestParser(unittest.TestCase):
+    def setUp(self):
+        self.rect = Rectangle(
+            36,
+            25,
+            -46,
+            -35
+        )
+
+        self.station = Station(
+            "NVAR",
+            38.43,
+            -118.3,
+            []
+        )
+
+    def _events(
+        self,
+        figure,
+        mapped,
+        directory="../tests"
+    ):
+        options = REBOptions(
+            figure,
+            directory,
+            [
+                self.station
+            ],
+            mapped=mapped
+        )
+
+        options.process_directories()
+
+        return options, options.get_events()
+
+    def test_mapped_events(self):
+        _, events = self._events(self.rect, False)
+        _, mapped = self._events(self.rect, True)
+
+        self.assertGreater(len(events), 0)
+        self.assertEqual(
+            [(event.offset, event.length) for event in mapped],
+            [(event.offset, event.length) for event in events]
+        )
+
+    def test_mapped_selective(self):
+        # Эллипс отсекает большую часть событий еще по строке координат
+        ellipse = Ellipse(
+            10,
+            5,
+            30,
+            30,
+            -40
+        )
+
+        _, events = self._events(ellipse, False)
+        _, mapped = self._events(ellipse, True)
+
+        self.assertGreater(len(events), 0)
+        self.assertEqual(
+            [(event.event, event.stations) for event in mapped],
+            [(event.event, event.stations) for event in events]
+        )
+
+    def test_mapped_file(self):
+        # Оба способа чтения дают одинаковый текст событий обоих форматов
+        query = make_query(
+            Rectangle(90, -90, -180, 180),
+            StationFilter(["NVAR"])
+        )
+
+        for name in ("test_new.txt", "test_old.txt"):
+            path = os.path.join("../tests", name)
+
+            self.assertEqual(
+                [event.data for event in parse_file(path, query, True)],
+                [event.data for event in parse_file(path, query, False)]
+            )
+
+    def test_broken_event_number(self):
+        with open("../tests/test_new.txt", "rb") as file:
+            text = file.read()
+
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "a.txt"), "wb") as file:
+                file.write(text.replace(b"EVENT  15761185", b"EVENT  1576X185"))
+
+            for mapped in (False, True):
+                options, events = self._events(
+                    Rectangle(90, -90, -180, 180),
+                    mapped,
+                    directory
+                )
+
+                self.assertEqual(options.metrics.counters[EVENTS_SEEN], 65)
+                self.assertNotIn(15761185, list(events.event))
+                self.assertGreater(len(events), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from figures import Rectangle
+from event_table import from_epoch_ms, parse_moment, to_epoch_ms
+from reb_options import REBOptions
+from run_metrics import SKIPPED
+from station import Station
+
+
+class TestPruning(unittest.TestCase):
+    def setUp(self):
+        self.options = REBOptions(
+            Rectangle(
+                36,
+                25,
+                -46,
+                -35
+            ),
+            "../tests",
+            [
+                Station(
+                    "NVAR",
+                    38.43,
+                    -118.3,
+                    []
+                )
+            ],
+            time_window=(
+                to_epoch_ms("2018/05/03", "10:00:00"),
+                to_epoch_ms("2018/05/03", "11:00:00")
+            )
+        )
+
+    def test_prune_files(self):
+        # Старый файл за 2003 год пропускается без разбора
+        self.assertEqual(
+            self.options._prune_files(self.options._collect_files()),
+            ["../tests/test_new.txt"]
+        )
+        self.assertEqual(self.options.metrics.counters[SKIPPED], 1)
+
+    def test_time_window(self):
+        self.options.process_directories()
+
+        self.assertEqual(
+            [event.event for event in self.options.get_events()],
+            ["15761185"]
+        )
+
+    def test_mapped_time_window(self):
+        self.options.mapped = True
+        self.options.process_directories()
+
+        self.assertEqual(
+            [event.event for event in self.options.get_events()],
+            ["15761185"]
+        )
+
+    def test_epoch_time(self):
+        self.assertEqual(
+            from_epoch_ms(to_epoch_ms("2018/05/03", "00:03:38.45")),
+            ("2018/05/03", "00:03:38.45")
+        )
+
+    def test_parse_moment(self):
+        self.assertEqual(
+            parse_moment("2018/05/03T10:00"),
+            to_epoch_ms("2018/05/03", "10:00:00")
+        )
+
+        with self.assertRaisesRegex(ValueError, "ГГГГ/ММ/ДД"):
+            parse_moment("2018-05-03")
+
+
+if __name__ == "__main__":
+    unittest.main()
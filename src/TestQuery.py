@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from figures import Ellipse, Rectangle
+from reb_options import REBOptions
+from reb_query import (
+    BoundingBox,
+    HeaderRange,
+    InsideFigure,
+    ORIGIN,
+    TimeWindow,
+    make_query
+)
+from station import Station
+from station_index import StationFilter
+
+
+class TestQuery(unittest.TestCase):
+    def setUp(self):
+        self.stations = [
+            Station(name, None, None, [])
+            for name in ("NVAR", "TXAR", "PDAR", "MKAR", "GERES", "ARCES")
+        ]
+
+    def _events(self, **kwargs):
+        options = REBOptions(
+            Rectangle(90, -90, -180, 180),
+            "../tests",
+            self.stations,
+            **kwargs
+        )
+
+        options.process_directories()
+
+        return options.get_events()
+
+    def test_bounding_box_first(self):
+        query = make_query(
+            Ellipse(30, 10, 20, 10, 30),
+            StationFilter(["NVAR"])
+        )
+
+        self.assertEqual(
+            [type(predicate) for predicate in query.stages[ORIGIN]],
+            [BoundingBox, InsideFigure]
+        )
+
+    def test_replan_by_selectivity(self):
+        query = make_query(
+            Rectangle(90, -90, -180, 180),
+            StationFilter(["NVAR"]),
+            time_window=(0, 1)
+        )
+
+        # Прямоугольник пропускает все события, а интервал отсекает все
+        for _ in range(query.REPLAN_INTERVAL):
+            query.check(ORIGIN, ("2018/05/03", "10:27:58.95", 31.9, -40.6))
+
+        self.assertIsInstance(query.stages[ORIGIN][0], TimeWindow)
+
+    def test_magnitude_while_parsing(self):
+        events = self._events()
+        selected = events.filter(events.between("mb", 4.5))
+
+        self.assertEqual(
+            list(self._events(predicates=[HeaderRange("mb", low=4.5)]).event),
+            list(selected.event)
+        )
+
+    def test_catalog_matches_parsing(self):
+        predicates = [HeaderRange("mb", low=4.0), HeaderRange("depth", high=10)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            catalog = os.path.join(directory, "catalog.sqlite")
+
+            self.assertEqual(
+                list(self._events(catalog=catalog, predicates=predicates).event),
+                list(self._events(predicates=predicates).event)
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
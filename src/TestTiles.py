@@ -0,0 +1,56 @@
+import os
+import unittest
+from tiles import TileCache, TileRegion, load_regions
+
+
+class TestTiles(unittest.TestCase):
+    def setUp(self):
+        self.region = TileRegion("../resources/tiles/nevada")
+
+    def test_load_regions(self):
+        self.assertEqual(
+            [region.name for region in load_regions("../resources/tiles")],
+            ["lobnor", "nevada", "pungeri"]
+        )
+
+    def test_coarse_level(self):
+        # Весь земной шар на экране шириной около 1000 точек
+        self.assertEqual(
+            self.region.choose_level(360 / 1000),
+            0
+        )
+
+    def test_fine_level(self):
+        self.assertEqual(
+            self.region.choose_level(0.001),
+            2
+        )
+
+    def test_visible_tiles(self):
+        tiles = self.region.tiles(2, (-120, -118, 40, 42))
+
+        self.assertEqual(
+            [os.path.basename(path) for path, _ in tiles],
+            ["0_1.jpg", "1_1.jpg"]
+        )
+
+    def test_outside_tiles(self):
+        self.assertEqual(
+            self.region.tiles(2, (0, 10, 0, 10)),
+            []
+        )
+
+    def test_cache_limit(self):
+        cache = TileCache(2)
+
+        for path, _ in self.region.tiles(1, (-125, -110, 30, 45)):
+            self.assertIsNotNone(cache.get(path))
+
+        self.assertEqual(
+            len(cache.tiles),
+            2
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,8 @@
-from matplotlib import axes
-from cartopy.crs import Projection
-from matplotlib.transforms import offset_copy
-from matplotlib.patches import Rectangle as Rect
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from matplotlib import axes
+    from cartopy.crs import Projection
 
 
 class AreaShape:
@@ -14,8 +15,8 @@ class AreaShape:
 
     def draw_on_map(
         self,
-        ax: axes,
-        projection: Projection,
+        ax: "axes",
+        projection: "Projection",
         name: str
     ) -> None:
         """Отрисовываем полигон на графике"""
@@ -70,11 +71,13 @@ class AreaDot(AreaShape):
 
     def draw_on_map(
         self,
-        ax: axes,
-        projection: Projection,
+        ax: "axes",
+        projection: "Projection",
         name: str
     ) -> None:
         """Отрисовываем точку на карте"""
+        from matplotlib.transforms import offset_copy
+
         # Рисуем саму точку
         ax.plot(
             self.longtitude,
@@ -164,11 +167,13 @@ class AreaRectangle(AreaShape):
 
     def draw_on_map(
         self,
-        ax: axes,
-        projection: Projection,
+        ax: "axes",
+        projection: "Projection",
         name: str
     ) -> None:
         """Отрисовываем прямоугольник на карте"""
+        from matplotlib.patches import Rectangle as Rect
+
         # Рисуем сам прямоугольник
         ax.add_patch(
             Rect(
@@ -0,0 +1,166 @@
+import argparse
+import os
+import time
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from event_table import NO_TIME
+from figures import Figure, Rectangle, Ellipse
+from reb_export import GZIP_SUFFIX, export_events, guess_format
+from reb_options import REBOptions
+from reb_query import HeaderRange, Predicate
+from reb_writer import EventWriter, write_events
+from run_metrics import REPORT_FILE, RunMetrics, WRITE
+from station import Station
+
+
+def make_figure(argv: argparse.Namespace) -> Figure:
+    """Собираем фигуру из параметров командной строки так же, как окно"""
+    if argv.rectangle:
+        latitude1, latitude2, longtitude1, longtitude2 = argv.rectangle
+
+        return Rectangle(
+            max(latitude1, latitude2),
+            min(latitude1, latitude2),
+            min(longtitude1, longtitude2),
+            max(longtitude1, longtitude2)
+        )
+
+    a, b, phi, latitude, longtitude = argv.ellipse
+
+    return Ellipse(
+        max(a, b),
+        min(a, b),
+        phi,
+        latitude,
+        longtitude
+    )
+
+
+def make_time_window(argv: argparse.Namespace) -> Optional[Tuple[int, int]]:
+    """Интервал времени из --from и --to, открытая граница не ограничена"""
+    if argv.time_from is None and argv.time_to is None:
+        return None
+
+    return (
+        # NO_TIME - событие без даты, в открытый интервал оно не входит
+        NO_TIME + 1 if argv.time_from is None else argv.time_from,
+        np.iinfo(np.int64).max if argv.time_to is None else argv.time_to
+    )
+
+
+def make_predicates(argv: argparse.Namespace) -> List[Predicate]:
+    """Условия на магнитуду и глубину, они проверяются еще при разборе"""
+    predicates = []
+
+    if argv.min_magnitude is not None:
+        predicates.append(
+            HeaderRange(argv.magnitude_type, low=argv.min_magnitude)
+        )
+
+    if argv.max_depth is not None:
+        predicates.append(HeaderRange("depth", high=argv.max_depth))
+
+    return predicates
+
+
+def run_batch(argv: argparse.Namespace) -> int:
+    """Обработка без графического интерфейса, возвращает код завершения"""
+    if not os.path.isdir(argv.root_directory):
+        print("Не найдена папка " + argv.root_directory)
+        return 1
+
+    start = time.perf_counter()
+
+    metrics = RunMetrics(argv.profile, argv.trace_memory)
+    metrics.start()
+
+    # Для выборки нужны только коды станций
+    stations = [
+        Station(name, None, None, []) for name in argv.stations
+    ]
+
+    reb_options = REBOptions(
+        make_figure(argv),
+        argv.root_directory,
+        stations,
+        result=argv.output,
+        workers=argv.workers,
+        catalog=argv.catalog,
+        mapped=argv.mapped,
+        station_mode=argv.station_mode,
+        min_stations=argv.min_stations,
+        time_window=make_time_window(argv),
+        predicates=make_predicates(argv),
+        metrics=metrics
+    )
+
+    export_format = argv.format or guess_format(argv.output)[0]
+
+    if export_format == "reb":
+        export_format = None
+
+    # Исходный текст событий тоже можно сжать: --gzip или имя файла .gz
+    compress = argv.gzip or argv.output.lower().endswith(GZIP_SUFFIX)
+
+    if argv.sort_by or export_format:
+        # Для сортировки и выгрузки таблицы нужны все события сразу
+        reb_options.process_directories()
+
+        events = reb_options.get_events()
+
+        if argv.sort_by:
+            events = events.sort(argv.sort_by, argv.descending)
+
+    if export_format:
+        try:
+            with metrics.stage(WRITE):
+                export_events(
+                    argv.output,
+                    events,
+                    export_format,
+                    argv.gzip or guess_format(argv.output)[1]
+                )
+        except (ImportError, ValueError) as error:
+            print(error)
+            return 1
+
+        count = len(events)
+    elif argv.sort_by:
+        with metrics.stage(WRITE):
+            count = write_events(argv.output, events, compress)
+    else:
+        # События пишутся в файл по мере разбора и не копятся в памяти,
+        # время записи копится здесь и попадает в WRITE один раз
+        wall = cpu = 0.0
+
+        with EventWriter(argv.output, compress=compress) as writer:
+            for event in reb_options.iter_events():
+                start_write = time.perf_counter()
+                cpu_start = time.thread_time()
+                writer.write(event)
+                cpu += time.thread_time() - cpu_start
+                wall += time.perf_counter() - start_write
+
+        count = writer.count
+        metrics.add(WRITE, wall, cpu, count)
+
+    metrics.finish()
+
+    print(
+        "Найдено событий: {}, результат записан в {} за {:.1f} с".format(
+            count,
+            argv.output,
+            time.perf_counter() - start
+        )
+    )
+
+    if argv.report or argv.profile or argv.trace_memory:
+        report = argv.report or REPORT_FILE
+        metrics.write(report)
+
+        print("Отчет о запуске записан в " + report)
+
+    return 0
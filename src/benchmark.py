@@ -0,0 +1,584 @@
+"""
+Замеры производительности на синтетическом корпусе (см. reb_generator.py)
+
+Замеряются разбор (REBOptions.process_directories в разных режимах),
+проверка попадания в фигуры, запись результата и обновление карты.
+Каждый запуск дописывает строку JSON в файл результатов, а --compare
+сравнивает запуск с предыдущим на корпусе тех же размеров
+
+Пример:
+
+python benchmark.py --files 20 --events 500 --compare
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from event_table import EventTable
+from figures import Ellipse, Rectangle
+from progress import file_size
+from reb_generator import (
+    BulletinGenerator,
+    FORMATS,
+    MIXED,
+    STATIONS,
+    generate_corpus
+)
+from reb_options import REBOptions
+from reb_writer import write_events
+from station import Station
+
+
+RESULTS_FILE = "benchmarks.jsonl"
+
+# Станции выборки при разборе
+SELECTED_STATIONS = ("NVAR", "ARCES", "MKAR", "TXAR")
+
+# Эллипс вокруг Невады, в который попадает малая часть событий
+SELECTIVE_FIGURE = (6, 4, 30, 38.5, -117)
+
+POINTS = 100000
+
+RESOURCES_PATH = "../resources/"
+
+MAP_SIZE = (1200, 800)
+
+
+class Corpus:
+    """Сгенерированный корпус и общие для замеров данные"""
+
+    def __init__(
+        self,
+        directory: str,
+        files: List[str],
+        parameters: Dict[str, Any]
+    ) -> None:
+        self.directory = directory
+        self.files = files
+        self.parameters = parameters
+        self.size = sum(file_size(path) for path in files)
+        self.total = parameters["files"] * parameters["events"]
+        self.work = tempfile.mkdtemp(prefix="reb_benchmark_")
+
+        # Таблица найденных событий для записи и карты, заполняется
+        # при первом разборе
+        self.events = EventTable()
+
+    def options(
+        self,
+        figure=None,
+        **kwargs
+    ) -> REBOptions:
+        return REBOptions(
+            figure or Rectangle(90, -90, -180, 180),
+            self.directory,
+            [
+                Station(name, None, None, []) for name in SELECTED_STATIONS
+            ],
+            **kwargs
+        )
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.work, ignore_errors=True)
+
+
+def measure(
+    function: Callable[[], Any],
+    repeat: int
+) -> Tuple[float, Any]:
+    """Лучшее из repeat время выполнения и результат последнего запуска"""
+    best = float("inf")
+    result = None
+
+    # Сообщения об обработке файлов не нужны в выводе замеров
+    with open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function()
+            best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+
+def make_result(
+    name: str,
+    seconds: float,
+    count: int,
+    unit: str,
+    size: Optional[int]=None,
+    found: Optional[int]=None
+) -> Dict[str, Any]:
+    """
+    Запись о замере: время и скорость обработки count единиц unit
+
+    size - обработано байт, found - сколько событий подошло
+    """
+    result = {
+        "name": name,
+        "seconds": seconds,
+        "count": count,
+        "unit": unit,
+        "rate": count / seconds if seconds else None
+    }
+
+    if size is not None:
+        result["megabytes_per_second"] = size / 2 ** 20 / seconds
+
+    if found is not None:
+        result["found"] = found
+
+    return result
+
+
+# Замеры по названию: функция от корпуса и числа повторов
+BENCHMARKS: Dict[str, Callable[[Corpus, int], List[Dict[str, Any]]]] = dict()
+
+
+def benchmark(name: str) -> Callable:
+    """Регистрируем замер, чтобы его можно было выбрать в --only"""
+    def register(function: Callable) -> Callable:
+        BENCHMARKS[name] = function
+        return function
+
+    return register
+
+
+@benchmark("parse")
+def bench_parse(
+    corpus: Corpus,
+    repeat: int
+) -> List[Dict[str, Any]]:
+    """REBOptions.process_directories в режимах разбора и каталога"""
+    modes = [
+        ("parse/lines", None, dict()),
+        ("parse/mmap", None, dict(mapped=True)),
+        ("parse/selective", Ellipse(*SELECTIVE_FIGURE), dict(mapped=True))
+    ]
+
+    if (os.cpu_count() or 1) > 1:
+        modes.append(
+            ("parse/workers", None, dict(workers=os.cpu_count()))
+        )
+
+    results = []
+
+    for name, figure, kwargs in modes:
+        def run():
+            options = corpus.options(figure, **kwargs)
+            options.process_directories()
+            return options.get_events()
+
+        seconds, events = measure(run, repeat)
+        results.append(
+            make_result(
+                name,
+                seconds,
+                corpus.total,
+                "events",
+                corpus.size,
+                len(events)
+            )
+        )
+
+        if figure is None and not len(corpus.events):
+            corpus.events = events
+
+    catalog = os.path.join(corpus.work, "catalog.sqlite")
+
+    def build():
+        if os.path.exists(catalog):
+            os.remove(catalog)
+
+        options = corpus.options(catalog=catalog)
+        options.process_directories()
+        return options.get_events()
+
+    def query():
+        options = corpus.options(Ellipse(*SELECTIVE_FIGURE), catalog=catalog)
+        options.process_directories()
+        return options.get_events()
+
+    seconds, events = measure(build, repeat)
+    results.append(
+        make_result(
+            "catalog/build",
+            seconds,
+            corpus.total,
+            "events",
+            corpus.size,
+            len(events)
+        )
+    )
+
+    seconds, events = measure(query, repeat)
+    results.append(
+        make_result(
+            "catalog/query",
+            seconds,
+            corpus.total,
+            "events",
+            found=len(events)
+        )
+    )
+
+    return results
+
+
+@benchmark("figures")
+def bench_figures(
+    corpus: Corpus,
+    repeat: int
+) -> List[Dict[str, Any]]:
+    """Figure.check_inside по одной точке и check_inside_many по массиву"""
+    random_state = np.random.default_rng(corpus.parameters["seed"])
+    latitudes = np.degrees(np.arcsin(random_state.uniform(-1, 1, POINTS)))
+    longtitudes = random_state.uniform(-180, 180, POINTS)
+
+    points = list(zip(latitudes.tolist(), longtitudes.tolist()))
+
+    results = []
+
+    for name, figure in (
+        ("rectangle", Rectangle(45, 30, -125, -110)),
+        ("ellipse", Ellipse(*SELECTIVE_FIGURE))
+    ):
+        seconds, _ = measure(
+            lambda: [figure.check_inside(*point) for point in points],
+            repeat
+        )
+        results.append(
+            make_result("check_inside/" + name, seconds, POINTS, "points")
+        )
+
+        seconds, _ = measure(
+            lambda: figure.check_inside_many(latitudes, longtitudes),
+            repeat
+        )
+        results.append(
+            make_result("check_inside_many/" + name, seconds, POINTS, "points")
+        )
+
+    return results
+
+
+def _events(corpus: Corpus) -> EventTable:
+    """Все события корпуса с выбранными станциями"""
+    if not len(corpus.events):
+        options = corpus.options()
+        options.process_directories()
+        corpus.events = options.get_events()
+
+    return corpus.events
+
+
+@benchmark("write")
+def bench_write(
+    corpus: Corpus,
+    repeat: int
+) -> List[Dict[str, Any]]:
+    """Запись текста найденных событий в файл результата"""
+    events = _events(corpus)
+    result = os.path.join(corpus.work, "result.txt")
+
+    seconds, _ = measure(lambda: write_events(result, events), repeat)
+
+    return [
+        make_result(
+            "write/result",
+            seconds,
+            len(events),
+            "events",
+            os.path.getsize(result)
+        )
+    ]
+
+
+@benchmark("map")
+def bench_map(
+    corpus: Corpus,
+    repeat: int
+) -> List[Dict[str, Any]]:
+    """GlobeMap.update со всеми событиями, без подписей и с подписями"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    from cartopy.crs import PlateCarree
+    from PyQt5 import QtWidgets
+
+    from globe_map import GlobeMap
+
+    application = QtWidgets.QApplication.instance() or \
+        QtWidgets.QApplication([])
+
+    class MapWindow(QtWidgets.QWidget):
+        """Окно только с картой, как в MainWindow.add_map"""
+
+        def add_map(
+            self,
+            globe_map: GlobeMap
+        ) -> None:
+            layout = QtWidgets.QVBoxLayout(self)
+            layout.addWidget(globe_map.canvas)
+            layout.addWidget(globe_map.toolbar)
+
+    window = MapWindow()
+    window.resize(*MAP_SIZE)
+    globe_map = GlobeMap(window, PlateCarree(), True, RESOURCES_PATH)
+    window.show()
+    globe_map.canvas.draw()
+
+    stations = [
+        Station(name, latitude, longtitude, [])
+        for name, latitude, longtitude in STATIONS
+    ]
+    figure = Ellipse(*SELECTIVE_FIGURE)
+    events = _events(corpus)
+
+    results = []
+
+    for name, names_visible in (("map/update", False), ("map/labels", True)):
+        seconds, _ = measure(
+            lambda: globe_map.update(stations, figure, events, names_visible),
+            repeat
+        )
+        results.append(make_result(name, seconds, len(events), "events"))
+
+    window.close()
+    application.processEvents()
+
+    return results
+
+
+def _commit() -> Optional[str]:
+    """Текущий коммит, если программа запущена из git репозитория"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    corpus: Corpus,
+    names: List[str],
+    repeat: int
+) -> Dict[str, Any]:
+    """Выполняем замеры names и собираем запись о запуске"""
+    results = []
+    skipped = dict()
+
+    for name in names:
+        try:
+            results.extend(BENCHMARKS[name](corpus, repeat))
+        except ImportError as error:
+            # Например, нет PyQt5 для замера карты
+            skipped[name] = str(error)
+
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "corpus": dict(corpus.parameters, bytes=corpus.size),
+        "repeat": repeat,
+        "results": results,
+        "skipped": skipped
+    }
+
+
+def load_previous(
+    filename: str,
+    corpus: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """Последний запуск на корпусе с теми же параметрами"""
+    if not os.path.exists(filename):
+        return None
+
+    previous = None
+
+    with open(filename, encoding="utf-8") as file:
+        for line in file:
+            record = json.loads(line)
+
+            if record.get("corpus") == corpus:
+                previous = record
+
+    return previous
+
+
+def compare(
+    previous: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerance: float
+) -> List[str]:
+    """Замеры, ставшие медленнее больше чем на tolerance"""
+    before = {result["name"]: result for result in previous["results"]}
+    regressions = []
+
+    for result in current["results"]:
+        old = before.get(result["name"])
+        if old is None:
+            continue
+
+        ratio = result["seconds"] / old["seconds"]
+        mark = ""
+
+        if ratio > 1 + tolerance:
+            regressions.append(result["name"])
+            mark = "  <-- медленнее"
+
+        print("{:<28}{:>10.4f} с{:>10.4f} с{:>8.2f}x{}".format(
+            result["name"],
+            old["seconds"],
+            result["seconds"],
+            ratio,
+            mark
+        ))
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Замеры производительности на синтетическом корпусе"
+    )
+
+    parser.add_argument(
+        "--corpus",
+        help="Папка корпуса: если ее нет, корпус создается в ней и "
+             "остается для следующих запусков. По умолчанию - "
+             "временная папка"
+    )
+    parser.add_argument("--files", type=int, default=20, help="Файлов")
+    parser.add_argument("--events", type=int, default=200, help="Событий в файле")
+    parser.add_argument(
+        "--arrivals",
+        type=int,
+        nargs=2,
+        default=(5, 30),
+        metavar=("MIN", "MAX"),
+        help="Сколько станций видит событие"
+    )
+    parser.add_argument(
+        "--format",
+        dest="reb_format",
+        choices=FORMATS,
+        default=MIXED,
+        help="Формат донесений"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed корпуса")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Сколько раз повторять замер, берется лучшее время"
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=tuple(BENCHMARKS),
+        default=list(BENCHMARKS),
+        help="Какие замеры выполнять"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=RESULTS_FILE,
+        help="Файл результатов, в него дописывается строка JSON"
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Сравнить с предыдущим запуском, код 1 при замедлении"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Допустимое замедление для --compare, доля"
+    )
+
+    argv = parser.parse_args()
+
+    parameters = dict(
+        files=argv.files,
+        events=argv.events,
+        arrivals=list(argv.arrivals),
+        format=argv.reb_format,
+        seed=argv.seed
+    )
+
+    directory = argv.corpus or tempfile.mkdtemp(prefix="reb_corpus_")
+
+    if argv.corpus and os.path.isdir(argv.corpus):
+        files = sorted(
+            os.path.join(dirname, filename)
+            for dirname, _, filenames in os.walk(argv.corpus)
+            for filename in filenames
+        )
+    else:
+        files = generate_corpus(
+            directory,
+            argv.files,
+            BulletinGenerator(argv.seed, argv.events, tuple(argv.arrivals)),
+            argv.reb_format
+        )
+
+    corpus = Corpus(directory, files, parameters)
+
+    try:
+        record = run_benchmarks(corpus, argv.only, argv.repeat)
+    finally:
+        corpus.cleanup()
+
+        if not argv.corpus:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    for result in record["results"]:
+        print("{:<28}{:>10.4f} с{:>14.0f} {}/с".format(
+            result["name"],
+            result["seconds"],
+            result["rate"],
+            result["unit"]
+        ))
+
+    for name, reason in record["skipped"].items():
+        print("{} пропущен: {}".format(name, reason))
+
+    previous = load_previous(argv.output, record["corpus"])
+
+    with open(argv.output, "a", encoding="utf-8") as file:
+        file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    if argv.compare and previous is not None:
+        print("Сравнение с запуском {} ({})".format(
+            previous["date"],
+            previous["commit"]
+        ))
+
+        if compare(previous, record, argv.tolerance):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
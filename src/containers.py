@@ -1,7 +1,11 @@
 from station import Station
 from PyQt5 import QtWidgets
 
-from fields import ComboBoxField, DirectoryField
+from fields import ComboBoxField, DirectoryField, ChoiceField, NumberField
+
+from station_index import StationFilter
+
+from progress import ProgressSnapshot
 
 from typing import List
 
@@ -11,9 +15,13 @@ class InstrumentsContainer:
     
     - выпадающий список станций
     
+    - режим совпадения станций
+    
     - выбор директории
     
-    - кнопку запуска обработки"""
+    - кнопки запуска и отмены обработки
+
+    - ход обработки"""
 
     STATIONS_FILE = "stations.json"
 
@@ -29,10 +37,33 @@ class InstrumentsContainer:
             Station.load_from_json(resources_path + self.STATIONS_FILE)
         )
 
+        self.station_mode_field = ChoiceField(
+            "Событие видели",
+            [
+                ("любая из станций", StationFilter.ANY),
+                ("все станции", StationFilter.ALL),
+                ("не менее N станций", StationFilter.AT_LEAST)
+            ]
+        )
+
+        self.min_stations_field = NumberField(
+            "N станций",
+            1,
+            1,
+            100
+        )
+
         self.directory_field = DirectoryField("Выбрать папку")
 
         self.start_button = QtWidgets.QPushButton("Начать обработку")
 
+        self.cancel_button = QtWidgets.QPushButton("Отменить")
+        self.cancel_button.setEnabled(False)
+
+        self.progress_bar = QtWidgets.QProgressBar()
+
+        self.progress_label = QtWidgets.QLabel()
+
         self.populate_window()
 
     def get_directory(self) -> str:
@@ -41,6 +72,45 @@ class InstrumentsContainer:
     def get_stations(self) -> List[Station]:
         return self.stations_box.get_stations()
 
+    def get_station_mode(self) -> str:
+        return self.station_mode_field.get_data()
+
+    def get_min_stations(self) -> int:
+        return int(self.min_stations_field.get_data())
+
+    def set_processing(
+        self,
+        processing: bool
+    ) -> None:
+        """Во время обработки доступна только кнопка отмены"""
+        self.start_button.setEnabled(not processing)
+        self.cancel_button.setEnabled(processing)
+
+    def show_progress(
+        self,
+        progress: ProgressSnapshot
+    ) -> None:
+        """Показываем ход обработки"""
+        # Считаем в килобайтах, чтобы не выйти за int у QProgressBar
+        self.progress_bar.setMaximum(max(progress.total_bytes // 1024, 1))
+        self.progress_bar.setValue(progress.bytes_done // 1024)
+
+        eta = progress.eta
+
+        self.progress_label.setText(
+            "Файлов: {}/{}, {:.1f}/{:.1f} МБ, событий: {}, осталось: {}".format(
+                progress.files_done,
+                progress.total_files,
+                progress.bytes_done / 2 ** 20,
+                progress.total_bytes / 2 ** 20,
+                progress.events,
+                "--:--" if eta is None else "{}:{:02d}".format(
+                    int(eta) // 60,
+                    int(eta) % 60
+                )
+            )
+        )
+
     def populate_window(self) -> None:
         """Заполняем окно элементами"""
         self.parent.add_widget(
@@ -55,6 +125,18 @@ class InstrumentsContainer:
             1
         )
 
+        self.parent.add_widget(
+            self.station_mode_field,
+            9,
+            0
+        )
+
+        self.parent.add_widget(
+            self.min_stations_field,
+            9,
+            1
+        )
+
         self.parent.l.addWidget(
             self.start_button,
             0,
@@ -62,3 +144,25 @@ class InstrumentsContainer:
             2,
             1
         )
+
+        self.parent.l.addWidget(
+            self.progress_bar,
+            4,
+            0,
+            1,
+            6
+        )
+
+        self.parent.l.addWidget(
+            self.progress_label,
+            4,
+            6,
+            1,
+            4
+        )
+
+        self.parent.l.addWidget(
+            self.cancel_button,
+            4,
+            10
+        )
@@ -0,0 +1,474 @@
+import array
+import datetime
+import functools
+import math
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from reb_event import Event
+from reb_formats import HEADER_FIELDS
+
+
+EPOCH = datetime.date(1970, 1, 1)
+
+# Время события, у которого нет даты
+NO_TIME = np.iinfo(np.int64).min
+
+MILLISECONDS_PER_DAY = 86400000
+
+# Отсутствующее значение целочисленного поля заголовка
+MISSING = -1
+
+
+@functools.lru_cache(maxsize=4096)
+def _date_ms(date: str) -> int:
+    """Начало дня вида 2018/05/03 в миллисекундах, в файле дней немного"""
+    year, month, day = date.split("/")
+    days = (datetime.date(int(year), int(month), int(day)) - EPOCH).days
+
+    return days * MILLISECONDS_PER_DAY
+
+
+def to_epoch_ms(
+    date: Optional[str],
+    time: Optional[str]
+) -> int:
+    """Дата вида 2018/05/03 и время вида 00:03:38.45 в миллисекундах от 1970 года"""
+    if not date:
+        return NO_TIME
+
+    milliseconds = _date_ms(date)
+
+    if time:
+        hours, minutes, seconds = time.split(":")
+        milliseconds += (int(hours) * 3600 + int(minutes) * 60) * 1000
+        milliseconds += round(float(seconds) * 1000)
+
+    return milliseconds
+
+
+def parse_moment(text: str) -> int:
+    """
+    Момент вида 2018/05/03, 2018/05/03T10:27 или 2018/05/03T10:27:58
+    в миллисекундах, секунды по умолчанию равны нулю
+    """
+    date, _, time = text.strip().replace("T", " ").partition(" ")
+    time = time.strip()
+
+    if time.count(":") == 1:
+        time += ":00"
+
+    try:
+        return to_epoch_ms(date, time or None)
+    except ValueError:
+        raise ValueError(
+            "Неверный момент времени {!r}, ожидается ГГГГ/ММ/ДД "
+            "или ГГГГ/ММ/ДДTЧЧ:ММ[:СС]".format(text)
+        ) from None
+
+
+def from_epoch_ms(milliseconds: int) -> Tuple[Optional[str], Optional[str]]:
+    """Обратное к to_epoch_ms преобразование в строки даты и времени"""
+    if milliseconds == NO_TIME:
+        return None, None
+
+    days, milliseconds = divmod(milliseconds, MILLISECONDS_PER_DAY)
+    date = EPOCH + datetime.timedelta(days=days)
+
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+
+    return (
+        "{:04d}/{:02d}/{:02d}".format(date.year, date.month, date.day),
+        "{:02d}:{:02d}:{:02d}.{:02d}".format(
+            hours,
+            minutes,
+            seconds,
+            milliseconds // 10
+        )
+    )
+
+
+class EventTable:
+    """
+    Таблица событий по столбцам
+
+    Вместо объекта на каждое событие хранятся массивы: номер события,
+    время в миллисекундах от 1970 года, координаты и положение текста в
+    исходном файле, а также поля заголовка: глубина, число станций, эллипс
+    ошибок и магнитуды. Пути к файлам, коды станций и хвосты событий
+    хранятся по одному разу, а в столбцах лежат их номера. Станции
+    события - отрезок общего массива кодов. Объект Event создается только
+    при обращении к строке таблицы
+
+    Отбор и сортировка выполняются над столбцами целиком, см. between,
+    filter и sort
+    """
+
+    # Столбец и тип его элементов в array
+    COLUMNS = (
+        ("event", "q"),
+        ("time", "q"),
+        ("latitude", "d"),
+        ("longtitude", "d"),
+        ("source", "i"),
+        ("offset", "q"),
+        ("length", "q"),
+        ("padding", "b"),
+        ("depth", "f"),
+        ("ndef", "h"),
+        ("nsta", "h"),
+        ("gap", "h"),
+        ("smajor", "f"),
+        ("sminor", "f"),
+        ("strike", "h"),
+        ("mb", "f"),
+        ("ML", "f"),
+        ("Ms", "f")
+    )
+
+    # Целочисленные поля заголовка, NaN в них хранится как MISSING
+    INTEGER_FIELDS = ("ndef", "nsta", "gap", "strike")
+    _INTEGER_HEADER = tuple(map(INTEGER_FIELDS.__contains__, HEADER_FIELDS))
+
+    # Столбцы, по которым имеет смысл упорядочивать события
+    SORT_COLUMNS = ("time", "event", "latitude", "longtitude") + HEADER_FIELDS
+
+    def __init__(self) -> None:
+        self._columns: Dict[str, array.array] = {
+            name: array.array(typecode) for name, typecode in self.COLUMNS
+        }
+
+        # Станции i-го события - station_codes[starts[i]:starts[i + 1]]
+        self._station_starts = array.array("q", [0])
+        self._station_codes = array.array("i")
+
+        self.sources: List[str] = list()
+        self.station_names: List[str] = list()
+        self.paddings: List[bytes] = list()
+        self._codes: Dict[str, dict] = {
+            kind: dict() for kind in ("source", "station", "padding")
+        }
+
+        # Текст событий, у которых нет исходного файла
+        self._texts: Dict[int, str] = dict()
+
+        self._arrays: Dict[str, np.ndarray] = dict()
+
+    def __len__(self) -> int:
+        return len(self._columns["event"])
+
+    def __iter__(self) -> Iterator[Event]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(
+        self,
+        index: int
+    ) -> Event:
+        """Собираем событие из строки таблицы"""
+        if index < 0:
+            index += len(self)
+
+        if not 0 <= index < len(self):
+            raise IndexError("Нет события с номером " + str(index))
+
+        columns = self._columns
+        source = columns["source"][index]
+        date, time = from_epoch_ms(columns["time"][index])
+
+        return Event(
+            self._texts.get(index),
+            columns["latitude"][index],
+            columns["longtitude"][index],
+            event=str(columns["event"][index]),
+            date=date,
+            time=time,
+            header=self.header(index),
+            stations=self.stations(index),
+            source=self.sources[source] if source >= 0 else None,
+            offset=columns["offset"][index],
+            length=columns["length"][index],
+            padding=self.paddings[columns["padding"][index]]
+        )
+
+    def column(
+        self,
+        name: str
+    ) -> np.ndarray:
+        """Столбец таблицы в виде массива NumPy"""
+        values = self._arrays.get(name)
+
+        if values is None or len(values) != len(self):
+            values = np.array(self._columns[name])
+            self._arrays[name] = values
+
+        return values
+
+    @property
+    def latitude(self) -> np.ndarray:
+        return self.column("latitude")
+
+    @property
+    def longtitude(self) -> np.ndarray:
+        return self.column("longtitude")
+
+    @property
+    def event(self) -> np.ndarray:
+        return self.column("event")
+
+    @property
+    def time(self) -> np.ndarray:
+        return self.column("time")
+
+    @property
+    def depth(self) -> np.ndarray:
+        return self.column("depth")
+
+    def header(
+        self,
+        index: int
+    ) -> tuple:
+        """Поля заголовка события в порядке HEADER_FIELDS"""
+        values = []
+
+        for name in HEADER_FIELDS:
+            value = self._columns[name][index]
+
+            if name in self.INTEGER_FIELDS:
+                value = math.nan if value == MISSING else float(value)
+
+            values.append(value)
+
+        return tuple(values)
+
+    def stations(
+        self,
+        index: int
+    ) -> tuple:
+        """Станции, зарегистрировавшие событие"""
+        return tuple(
+            self.station_names[code] for code in self._station_codes[
+                self._station_starts[index]:self._station_starts[index + 1]
+            ]
+        )
+
+    def _code(
+        self,
+        kind: str,
+        values: list,
+        value
+    ) -> int:
+        """Номер пути, станции или хвоста, новое значение добавляется"""
+        codes = self._codes[kind]
+        code = codes.get(value)
+
+        if code is None:
+            code = len(values)
+            values.append(value)
+            codes[value] = code
+
+        return code
+
+    def append(
+        self,
+        event: Event
+    ) -> None:
+        """Добавляем событие в конец таблицы"""
+        columns = self._columns
+
+        if event.source is None:
+            # Без файла событие можно восстановить только по тексту
+            if event._data is not None:
+                self._texts[len(self)] = event._data
+
+            source = -1
+        else:
+            source = self._code("source", self.sources, event.source)
+
+        columns["event"].append(int(event.event))
+        columns["time"].append(to_epoch_ms(event.date, event.time))
+        columns["latitude"].append(event.latitude)
+        columns["longtitude"].append(event.longtitude)
+        columns["source"].append(source)
+        columns["offset"].append(event.offset)
+        columns["length"].append(event.length)
+        columns["padding"].append(
+            self._code("padding", self.paddings, event.padding)
+        )
+
+        header = event.header
+        if header is None:
+            header = (math.nan,) * len(HEADER_FIELDS)
+
+        for name, integer, value in zip(
+            HEADER_FIELDS,
+            self._INTEGER_HEADER,
+            header
+        ):
+            if integer:
+                value = MISSING if math.isnan(value) else int(value)
+
+            columns[name].append(value)
+
+        # Станций у события много, почти все уже известны
+        station_codes = self._codes["station"]
+        codes = [station_codes.get(name) for name in event.stations]
+
+        if None in codes:
+            codes = [
+                self._code("station", self.station_names, name)
+                for name in event.stations
+            ]
+
+        self._station_codes.extend(codes)
+        self._station_starts.append(len(self._station_codes))
+
+    def append_record(
+        self,
+        source: str,
+        record: tuple
+    ) -> None:
+        """Добавляем событие из записи Event.to_record"""
+        self.append(Event.from_record(source, record))
+
+    def extend(
+        self,
+        events: Iterable[Event]
+    ) -> None:
+        for event in events:
+            self.append(event)
+
+    def take(
+        self,
+        indices: Iterable[int]
+    ) -> "EventTable":
+        """Новая таблица из строк с номерами indices"""
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+
+        table = EventTable()
+
+        for name, typecode in self.COLUMNS:
+            table._columns[name] = array.array(
+                typecode,
+                self.column(name)[indices].tobytes()
+            )
+
+        # Отрезки станций выбранных событий склеиваются подряд
+        starts = np.array(self._station_starts)
+        lengths = starts[indices + 1] - starts[indices]
+        new_starts = np.concatenate(([0], np.cumsum(lengths)))
+
+        positions = (
+            np.repeat(starts[indices] - new_starts[:-1], lengths) +
+            np.arange(new_starts[-1])
+        )
+
+        table._station_starts = array.array("q", new_starts.tobytes())
+        table._station_codes = array.array(
+            "i",
+            np.array(self._station_codes)[positions].tobytes()
+        )
+
+        table.sources = list(self.sources)
+        table.station_names = list(self.station_names)
+        table.paddings = list(self.paddings)
+        table._codes = {
+            kind: dict(codes) for kind, codes in self._codes.items()
+        }
+
+        if self._texts:
+            table._texts = {
+                new: self._texts[old]
+                for new, old in enumerate(indices.tolist())
+                if old in self._texts
+            }
+
+        return table
+
+    def _present(
+        self,
+        name: str,
+        values: np.ndarray
+    ) -> np.ndarray:
+        """Маска событий, у которых есть значение столбца name"""
+        if name in self.INTEGER_FIELDS:
+            return values != MISSING
+
+        if name == "time":
+            return values != NO_TIME
+
+        if values.dtype.kind == "f":
+            return ~np.isnan(values)
+
+        return np.ones(len(values), dtype=bool)
+
+    def between(
+        self,
+        name: str,
+        low: float=None,
+        high: float=None
+    ) -> np.ndarray:
+        """
+        Маска событий, у которых значение столбца name лежит в [low, high]
+
+        Не заданная граница не проверяется, события без значения поля
+        в маску не попадают
+        """
+        values = self.column(name)
+        mask = self._present(name, values)
+
+        if low is not None:
+            mask &= values >= low
+
+        if high is not None:
+            mask &= values <= high
+
+        return mask
+
+    def filter(
+        self,
+        mask: np.ndarray
+    ) -> "EventTable":
+        """Новая таблица из строк, отмеченных в mask"""
+        return self.take(np.flatnonzero(mask))
+
+    def sort(
+        self,
+        name: str,
+        descending: bool=False
+    ) -> "EventTable":
+        """
+        Новая таблица, упорядоченная по столбцу name
+
+        Сортировка устойчивая, события без значения поля идут последними
+        """
+        values = self.column(name)
+        missing = ~self._present(name, values)
+
+        if descending:
+            # Для целых ~x убывает вместе с -x, но не переполняется
+            values = -values if values.dtype.kind == "f" else ~values
+
+        # Последний ключ lexsort главный: сначала события со значением
+        return self.take(np.lexsort((values, missing)))
+
+    def ranges(self) -> Iterator[Tuple[Optional[str], int, int, bytes]]:
+        """Путь к исходному файлу, смещение, длина и хвост каждого события"""
+        columns = self._columns
+
+        for source, offset, length, padding in zip(
+            columns["source"],
+            columns["offset"],
+            columns["length"],
+            columns["padding"]
+        ):
+            yield (
+                self.sources[source] if source >= 0 else None,
+                offset,
+                length,
+                self.paddings[padding]
+            )
@@ -1,6 +1,6 @@
 from PyQt5 import QtWidgets, QtGui, QtCore
 
-from typing import List
+from typing import List, Tuple
 
 import os
 
@@ -9,6 +9,10 @@ from station import Station
 
 class ComboBoxField(QtWidgets.QComboBox):
     """Выпадающий список станций"""
+
+    # Отмечена или снята какая-то из станций
+    stations_changed = QtCore.pyqtSignal()
+
     def __init__(
         self,
         name: str,
@@ -56,6 +60,8 @@ class ComboBoxField(QtWidgets.QComboBox):
 
         self.setModel(self.model)
 
+        self.model.itemChanged.connect(lambda item: self.stations_changed.emit())
+
     def get_stations(self) -> List[Station]:
         """Получить список выбранных пунктов"""
         chosen_stations = []
@@ -134,3 +140,31 @@ class NumberField(QtWidgets.QDoubleSpinBox):
     def get_data(self) -> float:
         """Получить данные с элемента"""
         return self.value()
+
+
+class ChoiceField(QtWidgets.QComboBox):
+    """Выпадающий список с выбором одного из вариантов"""
+    def __init__(
+        self,
+        name: str,
+        choices: List[Tuple[str, str]],
+        *args,
+        **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+
+        self.name = name
+
+        self.label = QtWidgets.QLabel(
+            "<center>{}</center>".format(
+                self.name
+            )
+        )
+
+        # Показываем подпись варианта, а храним его значение
+        for title, value in choices:
+            self.addItem(title, value)
+
+    def get_data(self) -> str:
+        """Получить значение выбранного варианта"""
+        return self.currentData()
@@ -4,6 +4,8 @@ from figures import Figure, Ellipse, Rectangle
 
 from fields import NumberField
 
+from typing import List
+
 
 class FigureButton:
     """Базовый класс для кнопки фигуры"""
@@ -25,6 +27,10 @@ class FigureButton:
         """Собирает данные с элементов управления и возвращает нужную фигуру"""
         raise NotImplementedError
 
+    def get_fields(self) -> List[NumberField]:
+        """Поля, от которых зависит фигура"""
+        raise NotImplementedError
+
 
 class RectangleButton(FigureButton):
     """Кнопка для простого прямоугольника"""
@@ -95,6 +101,14 @@ class RectangleButton(FigureButton):
         self.parent.remove_widget(self.field_long_1)
         self.parent.remove_widget(self.field_long_2)
 
+    def get_fields(self) -> List[NumberField]:
+        return [
+            self.field_lat_1,
+            self.field_lat_2,
+            self.field_long_1,
+            self.field_long_2
+        ]
+
     def get_figure(self) -> Rectangle:
         """Собирает данные и возвращает готовый Rectangle"""
         return Rectangle(
@@ -200,6 +214,15 @@ class EllipseButton(FigureButton):
         self.parent.remove_widget(self.field_lat)
         self.parent.remove_widget(self.field_long)
 
+    def get_fields(self) -> List[NumberField]:
+        return [
+            self.field_par_a,
+            self.field_par_b,
+            self.field_par_phi,
+            self.field_lat,
+            self.field_long
+        ]
+
     def get_figure(self) -> Ellipse:
         """Собирает данные и возвращает готовый Ellipse"""
         return Ellipse(
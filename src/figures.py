@@ -1,11 +1,13 @@
 import math
-from matplotlib import axes
-from cartopy.crs import Projection
+from typing import Tuple, TYPE_CHECKING
 
 import numpy as np
 
-from matplotlib.patches import Rectangle as Rect
-from matplotlib.patches import Ellipse as Ell
+# matplotlib и cartopy нужны только для отрисовки, поэтому импортируются
+# внутри методов draw_on_map: пакетный режим работает без них
+if TYPE_CHECKING:
+    from matplotlib import axes
+    from cartopy.crs import Projection
 
 
 class Figure:
@@ -32,10 +34,25 @@ class Figure:
         """Проверка попадания координат в заданную фигуру"""
         raise NotImplementedError
 
+    def check_inside_many(
+        self,
+        latitudes: np.ndarray,
+        longtitudes: np.ndarray
+    ) -> np.ndarray:
+        """Проверка попадания сразу многих точек, возвращает маску"""
+        raise NotImplementedError
+
+    def bounding_box(self) -> Tuple[float, float, float, float]:
+        """
+        Описанный прямоугольник фигуры: нижняя и верхняя широта,
+        левая и правая долгота
+        """
+        raise NotImplementedError
+
     def draw_on_map(
         self,
-        ax: axes,
-        projection: Projection
+        ax: "axes",
+        projection: "Projection"
     ) -> None:
         """Отрисовка фигуры на графике"""
         raise NotImplementedError
@@ -77,12 +94,39 @@ class Rectangle(Figure):
         else:
             return False
 
+    def check_inside_many(
+        self,
+        latitudes: np.ndarray,
+        longtitudes: np.ndarray
+    ) -> np.ndarray:
+        """Проверка попадания многих точек в прямоугольник"""
+        latitudes = np.asarray(latitudes)
+        longtitudes = np.asarray(longtitudes)
+
+        return (
+            (latitudes <= self.latitude1) &
+            (latitudes >= self.latitude2) &
+            (longtitudes >= self.longtitude1) &
+            (longtitudes <= self.longtitude2)
+        )
+
+    def bounding_box(self) -> Tuple[float, float, float, float]:
+        """Прямоугольник сам себе описанный прямоугольник"""
+        return (
+            self.latitude2,
+            self.latitude1,
+            self.longtitude1,
+            self.longtitude2
+        )
+
     def draw_on_map(
         self,
-        ax: axes,
-        projection: Projection
+        ax: "axes",
+        projection: "Projection"
     ) -> None:
         """Отрисовка прямоугольника на графике"""
+        from matplotlib.patches import Rectangle as Rect
+
         ax.add_patch(
             Rect(
                 (
@@ -125,30 +169,64 @@ class Ellipse(Figure):
         self.latitude = latitude
         self.longtitude = longtitude
 
+        # Тригонометрия от угла поворота считается один раз на фигуру
+        self._cos_phi = math.cos(math.radians(self.phi))
+        self._sin_phi = math.sin(math.radians(self.phi))
+
     def check_inside(
         self,
         latitude: float,
         longtitude: float
     ) -> bool:
         """Проверка попадания координат в эллипс"""
+        d_long = longtitude - self.longtitude
+        d_lat = latitude - self.latitude
+
         x = (
-            math.cos(math.radians(self.phi)) * (longtitude - self.longtitude) \
-                + math.sin(math.radians(self.phi)) * (latitude - self.latitude)
+            self._cos_phi * d_long + self._sin_phi * d_lat
         ) ** 2 / (self.a ** 2)
 
         y = (
-            math.sin(math.radians(self.phi)) * (longtitude - self.longtitude) \
-                - math.cos(math.radians(self.phi)) * (latitude - self.latitude)
+            self._sin_phi * d_long - self._cos_phi * d_lat
         ) ** 2 / (self.b ** 2)
 
         return x + y <= 1
 
+    def check_inside_many(
+        self,
+        latitudes: np.ndarray,
+        longtitudes: np.ndarray
+    ) -> np.ndarray:
+        """Проверка попадания многих точек в эллипс"""
+        d_long = np.asarray(longtitudes, dtype=np.float64) - self.longtitude
+        d_lat = np.asarray(latitudes, dtype=np.float64) - self.latitude
+
+        x = self._cos_phi * d_long + self._sin_phi * d_lat
+        y = self._sin_phi * d_long - self._cos_phi * d_lat
+
+        return x * x / (self.a ** 2) + y * y / (self.b ** 2) <= 1
+
+    def bounding_box(self) -> Tuple[float, float, float, float]:
+        """Описанный прямоугольник повернутого эллипса"""
+        # Полуширина по долготе и полувысота по широте
+        half_width = math.hypot(self.a * self._cos_phi, self.b * self._sin_phi)
+        half_height = math.hypot(self.a * self._sin_phi, self.b * self._cos_phi)
+
+        return (
+            max(self.latitude - half_height, -90),
+            min(self.latitude + half_height, 90),
+            max(self.longtitude - half_width, -180),
+            min(self.longtitude + half_width, 180)
+        )
+
     def draw_on_map(
         self,
-        ax: axes,
-        projection: Projection
+        ax: "axes",
+        projection: "Projection"
     ) -> None:
         """Отрисовка эллипса на графике"""
+        from matplotlib.patches import Ellipse as Ell
+
         ax.add_patch(
             Ell(
                 (
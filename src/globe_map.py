@@ -2,12 +2,12 @@ import matplotlib.pyplot as plt
 from cartopy.crs import Projection, PlateCarree
 from matplotlib.image import imread
 
-from PyQt5 import QtWidgets
+from PyQt5 import QtCore, QtWidgets
 
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT
 
-from typing import List
+from typing import Dict, Iterable, List
 
 from station import Station
 
@@ -15,9 +15,36 @@ from figures import Figure
 
 from reb_event import Event
 
+from event_table import EventTable
+
+from tiles import TileCache, load_regions
+
 
 class GlobeMap:
-    """Карта мира"""
+    """
+    Карта мира
+
+    Все, что рисуется поверх подложки, разбито на слои. Каждый слой помнит
+    свои элементы, поэтому при изменении перерисовывается только он.
+
+    Подложка (изображения и сетка) полностью рисуется только при смене
+    области просмотра и сохраняется в кэше, а слои накладываются на нее
+    без перерисовки остальной карты
+    """
+
+    STATIONS = "stations"
+    FIGURE = "figure"
+    EVENTS = "events"
+    LABELS = "labels"
+
+    LAYERS = (STATIONS, FIGURE, EVENTS, LABELS)
+
+    TILES_DIRECTORY = "tiles"
+
+    # Пауза после перемещения или масштабирования, после которой
+    # подгружаются тайлы и раскладываются подписи, мс
+    VIEW_UPDATE_DELAY = 100
+
     def __init__(
         self,
         window: QtWidgets,
@@ -31,12 +58,40 @@ class GlobeMap:
         self.projection = projection
         self.light = light
         self.resources_path = resources_path
+        self.layers: Dict[str, list] = {layer: [] for layer in self.LAYERS}
+        self.background = None
+
+        # Последние отрисованные данные, подписи по ним раскладываются
+        # заново при смене масштаба
+        self.stations = list()
+        self.figure = None
+        self.events = EventTable()
+        self.event_names_visible = False
+
+        # Подробные участки карты, тайлы подгружаются под текущую область
+        self.tile_regions = list()
+        self.tile_cache = TileCache()
+        self.tile_images = dict()
+        self.updating_tiles = False
+
+        # xlim_changed, ylim_changed и resize_event при одном перемещении
+        # приходят много раз, область обрабатывается один раз после паузы
+        self.view_timer = QtCore.QTimer()
+        self.view_timer.setSingleShot(True)
+        self.view_timer.setInterval(self.VIEW_UPDATE_DELAY)
+        self.view_timer.timeout.connect(self._on_view_changed)
+
         self.globe = plt.figure()
         self.canvas = FigureCanvasQTAgg(self.globe)
         self.toolbar = NavigationToolbar2QT(
             self.canvas,
             self.window
         )
+
+        # Полная перерисовка бывает при перемещении, масштабировании
+        # и изменении размера окна
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
         self._first_draw()
 
     def _draw_stock_img(self) -> None:
@@ -58,54 +113,104 @@ class GlobeMap:
             ]
         )
 
-    def _draw_chunks(self) -> None:
+    def _draw_tiles(self) -> bool:
         """
-        Отрисовываем части карты в высоком разрешении, чтобы
-        не так сильно тормозило
+        Показываем тайлы подробных участков для текущей области просмотра
+
+        Для каждого участка берется самый грубый уровень, которого хватает
+        для текущего масштаба. Уже показанные тайлы не перерисовываются,
+        а ушедшие из области просмотра убираются с карты. Возвращаем,
+        изменился ли набор тайлов на карте
         """
-        self.ax.imshow(
-            imread(
-                self.resources_path + "chunks/nevada.jpg"
-            ),
-            origin="upper",
-            transform=PlateCarree(),
-            extent=[
-                -125,
-                -110,
-                30,
-                45
-            ]
-        )
+        if self.updating_tiles:
+            return False
 
-        self.ax.imshow(
-            imread(
-                self.resources_path + "chunks/pungeri.jpg"
-            ),
-            origin="upper",
-            transform=PlateCarree(),
-            extent=[
-                120,
-                135,
-                30,
-                50
-            ]
+        self.updating_tiles = True
+        changed = False
+
+        # Ошибка загрузки или отрисовки тайла не должна навсегда
+        # отключить обновление тайлов
+        try:
+            west, east = self.ax.get_xlim()
+            south, north = self.ax.get_ylim()
+            degrees_per_pixel = (east - west) / max(self.ax.bbox.width, 1)
+            view = (west, east, south, north)
+
+            needed = dict()
+            for region in self.tile_regions:
+                z = region.choose_level(degrees_per_pixel)
+
+                for path, extent in region.tiles(z, view):
+                    needed[path] = extent
+
+            for path in list(self.tile_images):
+                if path not in needed:
+                    self.tile_images.pop(path).remove()
+                    changed = True
+
+            for path, extent in needed.items():
+                if path in self.tile_images:
+                    continue
+
+                tile = self.tile_cache.get(path)
+                if tile is None:
+                    continue
+
+                self.tile_images[path] = self.ax.imshow(
+                    tile,
+                    origin="upper",
+                    transform=PlateCarree(),
+                    extent=extent
+                )
+                changed = True
+        finally:
+            self.updating_tiles = False
+
+        return changed
+
+    def _load_tiles(self) -> None:
+        """Находим подробные участки карты и показываем их тайлы"""
+        self.tile_regions = load_regions(
+            self.resources_path + self.TILES_DIRECTORY
         )
 
-        self.ax.imshow(
-            imread(
-                self.resources_path + "chunks/lobnor.jpg"
-            ),
-            origin="upper",
-            transform=PlateCarree(),
-            extent=[
-                50,
-                110,
-                20,
-                55
-            ]
+        self._draw_tiles()
+
+    def _connect_view_changes(self) -> None:
+        """Следим за перемещением, масштабированием и размером карты"""
+        # Тайлы не должны менять границы карты
+        self.ax.set_autoscale_on(False)
+
+        self.ax.callbacks.connect(
+            "xlim_changed",
+            lambda ax: self.view_timer.start()
+        )
+        self.ax.callbacks.connect(
+            "ylim_changed",
+            lambda ax: self.view_timer.start()
+        )
+        self.canvas.mpl_connect(
+            "resize_event",
+            lambda event: self.view_timer.start()
         )
 
-        self.ax.set_global()
+    def _on_view_changed(self) -> None:
+        """
+        Подгружаем тайлы и раскладываем подписи под новую область
+
+        Новые тайлы попадают в подложку, поэтому тогда карта рисуется
+        целиком, а иначе на подложку накладываются только слои
+        """
+        tiles_changed = not self.light and self._draw_tiles()
+        labels_changed = self.event_names_visible and len(self.events)
+
+        if labels_changed:
+            self._draw_layer(self.LABELS)
+
+        if tiles_changed:
+            self.canvas.draw_idle()
+        elif labels_changed:
+            self._blit()
 
     def _first_draw(self) -> None:
         """Инициализация карты"""
@@ -123,18 +228,46 @@ class GlobeMap:
         self._draw_stock_img()
         self.ax.gridlines()
 
-        if not self.light:
-            self._draw_chunks()
+        self.ax.set_global()
 
         self.globe.tight_layout()
+
+        self._connect_view_changes()
+
+        if not self.light:
+            self._load_tiles()
+
         self.canvas.draw()
 
-    def _clear(self) -> None:
-        """Очищаем все нарисованное на карте"""
-        # Оставляем 2 первых элемента из-за cartopy
-        self.ax.patches = self.ax.patches[:2]
-        self.ax.texts = list()
-        self.ax.lines = list()
+    def _on_draw(self, event) -> None:
+        """Запоминаем только что нарисованную подложку и рисуем слои поверх"""
+        self.background = self.canvas.copy_from_bbox(self.globe.bbox)
+        self._draw_layers()
+
+    def _draw_layers(self) -> None:
+        for layer in self.LAYERS:
+            for artist in self.layers[layer]:
+                self.ax.draw_artist(artist)
+
+    def _blit(self) -> None:
+        """Накладываем слои на сохраненную подложку"""
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+
+        self.canvas.restore_region(self.background)
+        self._draw_layers()
+        self.canvas.blit(self.globe.bbox)
+
+    def _clear(
+        self,
+        layer: str
+    ) -> None:
+        """Убираем с карты все элементы слоя"""
+        for artist in self.layers[layer]:
+            artist.remove()
+
+        self.layers[layer] = list()
 
     def _draw_stations(
         self,
@@ -161,31 +294,77 @@ class GlobeMap:
 
     def _draw_events(
         self,
-        events: List[Event],
-        event_names_visible: bool
+        events: EventTable
     ) -> None:
         """Отрисовываем события на карте"""
-        for event in events:
-            event.draw_on_map(
+        Event.draw_many_on_map(
+            self.ax,
+            self.projection,
+            events
+        )
+
+    def _draw_labels(
+        self,
+        events: EventTable,
+        event_names_visible: bool
+    ) -> None:
+        """Подписываем события, которые помещаются на экране"""
+        if event_names_visible:
+            Event.draw_names_on_map(
                 self.ax,
                 self.projection,
-                event_names_visible
+                events
+            )
+
+    def _draw_layer(
+        self,
+        layer: str
+    ) -> None:
+        """Пересобираем один слой по последним данным"""
+        draw = {
+            self.STATIONS: lambda: self._draw_stations(self.stations),
+            self.FIGURE: lambda: self._draw_figure(self.figure),
+            self.EVENTS: lambda: self._draw_events(self.events),
+            self.LABELS: lambda: self._draw_labels(
+                self.events,
+                self.event_names_visible
             )
+        }
+
+        self._clear(layer)
+
+        # Элементы слоя - все, что появилось на карте при его отрисовке
+        before = set(self.ax.get_children())
+        draw[layer]()
+
+        self.layers[layer] = [
+            artist for artist in self.ax.get_children()
+            if artist not in before
+        ]
+
+        # Слои не попадают в полную перерисовку и в кэш подложки
+        for artist in self.layers[layer]:
+            artist.set_animated(True)
 
     def update(
         self,
         stations: List[Station],
         figure: Figure,
-        events: List[Event],
-        event_names_visible: bool
+        events: EventTable,
+        event_names_visible: bool,
+        layers: Iterable[str]=LAYERS
     ) -> None:
-        """Обновление карты"""
-        self._clear()
-
-        self._draw_stations(stations)
+        """
+        Обновление карты
 
-        self._draw_figure(figure)
+        layers - изменившиеся слои, остальные остаются как есть
+        """
+        self.stations = stations
+        self.figure = figure
+        self.events = events
+        self.event_names_visible = event_names_visible
 
-        self._draw_events(events, event_names_visible)
+        for layer in layers:
+            self._draw_layer(layer)
 
-        self.canvas.draw_idle()
+        self._blit()
@@ -0,0 +1,67 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+def declutter(
+    points: np.ndarray,
+    bounds: Tuple[float, float, float, float],
+    label_width: float,
+    label_height: float,
+    max_labels: int
+) -> List[int]:
+    """
+    Отбираем точки, подписи которых не налезают друг на друга
+
+    points - экранные координаты точек (N, 2) в порядке приоритета
+    bounds - видимая часть экрана (x0, y0, x1, y1)
+
+    Экран делится на ячейки размером с подпись. Сначала в каждой ячейке
+    остается только первая точка, затем оставшиеся кандидаты проверяются
+    на пересечение с уже размещенными подписями из соседних ячеек.
+    При приближении точки расходятся по разным ячейкам, и подписей
+    становится больше. Возвращает номера точек в порядке приоритета
+    """
+    x0, y0, x1, y1 = bounds
+
+    x = points[:, 0]
+    y = points[:, 1]
+
+    visible = np.flatnonzero(
+        np.isfinite(x) & np.isfinite(y) &
+        (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+    )
+
+    columns = ((x[visible] - x0) // label_width).astype(np.int64)
+    rows = ((y[visible] - y0) // label_height).astype(np.int64)
+
+    width = int((x1 - x0) // label_width) + 1
+
+    _, first = np.unique(rows * width + columns, return_index=True)
+    first.sort()
+
+    placed: Dict[Tuple[int, int], List[int]] = dict()
+    chosen = []
+
+    for i in first.tolist():
+        index = int(visible[i])
+        cell = (int(rows[i]), int(columns[i]))
+
+        collides = any(
+            abs(x[other] - x[index]) < label_width and
+            abs(y[other] - y[index]) < label_height
+            for row in range(cell[0] - 1, cell[0] + 2)
+            for column in range(cell[1] - 1, cell[1] + 2)
+            for other in placed.get((row, column), ())
+        )
+
+        if collides:
+            continue
+
+        placed.setdefault(cell, []).append(index)
+        chosen.append(index)
+
+        if len(chosen) >= max_labels:
+            break
+
+    return chosen
@@ -13,15 +13,226 @@ else:
     RESOURCES_PATH = "../resources/"
 
 import argparse
-
-import matplotlib
-matplotlib.use("Qt5Agg")
+import multiprocessing
 
 from typing import List
 
-from PyQt5 import QtWidgets
+from event_table import EventTable, parse_moment
+from reb_export import EXPORTERS
+from station_index import StationFilter
+
+# Графические модули (PyQt5, matplotlib, cartopy) импортируются только
+# при запуске окна, чтобы пакетный режим работал на серверах без X
+# и запускался быстро
+
+
+def moment_argument(text: str) -> int:
+    """Тип параметров --from и --to: понятное сообщение вместо ValueError"""
+    try:
+        return parse_moment(text)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def add_processing_arguments(
+    parser: argparse.ArgumentParser,
+    suppress_defaults: bool=False
+) -> None:
+    """Параметры обработки, общие для окна и пакетного режима"""
+    parser.add_argument(
+        "--workers",
+        dest="workers",
+        type=int,
+        default=argparse.SUPPRESS if suppress_defaults else 1,
+        help="Количество процессов для обработки файлов",
+        metavar="N"
+    )
+
+    parser.add_argument(
+        "--catalog",
+        dest="catalog",
+        default=argparse.SUPPRESS if suppress_defaults else None,
+        help="Файл каталога событий, чтобы не разбирать архив каждый раз",
+        metavar="FILE"
+    )
+
+    parser.add_argument(
+        "--mmap",
+        dest="mapped",
+        action="store_true",
+        default=argparse.SUPPRESS if suppress_defaults else False,
+        help="Отображать файлы в память и пропускать события вне фигуры "
+             "без чтения таблицы прихода волн"
+    )
+
+    parser.add_argument(
+        "--report",
+        dest="report",
+        default=argparse.SUPPRESS if suppress_defaults else None,
+        help="JSON файл с отчетом о запуске: время этапов обработки "
+             "и счетчики файлов, байт, событий и ошибок",
+        metavar="FILE"
+    )
+
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store_true",
+        default=argparse.SUPPRESS if suppress_defaults else False,
+        help="Добавить в отчет профиль cProfile, полный профиль "
+             "сохраняется рядом с отчетом в файл .prof"
+    )
+
+    parser.add_argument(
+        "--trace-memory",
+        dest="trace_memory",
+        action="store_true",
+        default=argparse.SUPPRESS if suppress_defaults else False,
+        help="Добавить в отчет пик памяти и места выделения (tracemalloc)"
+    )
+
+
+def add_batch_parser(subparsers) -> None:
+    """Параметры пакетного режима"""
+    batch = subparsers.add_parser(
+        "batch",
+        help="Обработка без графического интерфейса",
+        description="Обработка REB файлов без графического интерфейса"
+    )
+
+    batch.add_argument(
+        "root_directory",
+        help="Папка с REB файлами"
+    )
+
+    figure = batch.add_mutually_exclusive_group(required=True)
+
+    figure.add_argument(
+        "--rectangle",
+        dest="rectangle",
+        nargs=4,
+        type=float,
+        help="Прямоугольник: две широты и две долготы границ",
+        metavar=("LAT1", "LAT2", "LONG1", "LONG2")
+    )
+
+    figure.add_argument(
+        "--ellipse",
+        dest="ellipse",
+        nargs=5,
+        type=float,
+        help="Эллипс: параметры a и b, угол наклона, широта и долгота центра",
+        metavar=("A", "B", "PHI", "LAT", "LONG")
+    )
+
+    batch.add_argument(
+        "--stations",
+        dest="stations",
+        nargs="+",
+        required=True,
+        help="Коды станций",
+        metavar="STA"
+    )
+
+    batch.add_argument(
+        "--station-mode",
+        dest="station_mode",
+        choices=StationFilter.MODES,
+        default=StationFilter.ANY,
+        help="Сколько станций должны были видеть событие"
+    )
+
+    batch.add_argument(
+        "--min-stations",
+        dest="min_stations",
+        type=int,
+        default=1,
+        help="Минимальное количество станций для режима at_least",
+        metavar="N"
+    )
+
+    batch.add_argument(
+        "--from",
+        dest="time_from",
+        type=moment_argument,
+        help="Начало интервала времени: 2018/05/03, 2018/05/03T10:00 "
+             "или 2018/05/03T10:00:00",
+        metavar="DATE"
+    )
+
+    batch.add_argument(
+        "--to",
+        dest="time_to",
+        type=moment_argument,
+        help="Конец интервала времени, сам момент в интервал не входит",
+        metavar="DATE"
+    )
 
-from window import MainWindow, CustomGridLayout
+    batch.add_argument(
+        "--magnitude-type",
+        dest="magnitude_type",
+        choices=("mb", "ML", "Ms"),
+        default="mb",
+        help="Тип магнитуды для --min-magnitude"
+    )
+
+    batch.add_argument(
+        "--min-magnitude",
+        dest="min_magnitude",
+        type=float,
+        help="Минимальная магнитуда события",
+        metavar="M"
+    )
+
+    batch.add_argument(
+        "--max-depth",
+        dest="max_depth",
+        type=float,
+        help="Максимальная глубина события в километрах",
+        metavar="KM"
+    )
+
+    batch.add_argument(
+        "--sort-by",
+        dest="sort_by",
+        choices=EventTable.SORT_COLUMNS,
+        help="Столбец, по которому упорядочить результат"
+    )
+
+    batch.add_argument(
+        "--descending",
+        dest="descending",
+        action="store_true",
+        help="Упорядочить по убыванию"
+    )
+
+    batch.add_argument(
+        "-o",
+        "--output",
+        dest="output",
+        default="result.txt",
+        help="Файл с результатами",
+        metavar="FILE"
+    )
+
+    batch.add_argument(
+        "--format",
+        dest="format",
+        choices=("reb",) + tuple(EXPORTERS),
+        help="Формат результата: исходный текст событий (reb) или таблица "
+             "событий. По умолчанию определяется по расширению файла"
+    )
+
+    batch.add_argument(
+        "--gzip",
+        dest="gzip",
+        action="store_true",
+        help="Сжать результат gzip: таблицу событий или исходный текст"
+    )
+
+    # Общие параметры можно указывать и после batch, не затирая
+    # значения, указанные перед ним
+    add_processing_arguments(batch, suppress_defaults=True)
 
 
 def process_arguments(argv: List[str]) -> argparse.Namespace:
@@ -42,6 +253,11 @@ def process_arguments(argv: List[str]) -> argparse.Namespace:
         metavar=""
     )
 
+    add_processing_arguments(parser)
+
+    subparsers = parser.add_subparsers(dest="command")
+    add_batch_parser(subparsers)
+
     return parser.parse_args(argv)
 
 
@@ -61,17 +277,16 @@ def recources_exist(
         print("Заканчиваю работу!")
         return False
 
-    if not os.path.exists(resources + "chunks"):
-        print("Не найдена папка с частями карты!")
+    if not os.path.exists(resources + "tiles"):
+        print("Не найдена папка с тайлами карты!")
         print("Запускаю программу в легковесном режиме!")
         argv.light = True
 
     return True
 
 
-def main():
-    argv = process_arguments(sys.argv[1:])
-
+def run_window(argv: argparse.Namespace) -> None:
+    """Запуск графического интерфейса"""
     if not recources_exist(
         argv,
         RESOURCES_PATH
@@ -79,6 +294,13 @@ def main():
         input()
         return
 
+    import matplotlib
+    matplotlib.use("Qt5Agg")
+
+    from PyQt5 import QtWidgets
+
+    from window import MainWindow, CustomGridLayout
+
     qt_app = QtWidgets.QApplication(sys.argv)
     main_window = MainWindow(
         "REB Parser",
@@ -91,5 +313,18 @@ def main():
     sys.exit(qt_app.exec_())
 
 
+def main():
+    # Без этого пул процессов не запустится из EXE-файла
+    multiprocessing.freeze_support()
+
+    argv = process_arguments(sys.argv[1:])
+
+    if argv.command == "batch":
+        from batch import run_batch
+        sys.exit(run_batch(argv))
+
+    run_window(argv)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,119 @@
+"""
+Нарезка изображения участка карты на пирамиду тайлов
+
+Пример:
+
+python make_tiles.py nevada.jpg ../resources/tiles/nevada -125 -110 30 45
+"""
+import argparse
+import json
+import math
+import os
+
+from typing import List
+
+from PIL import Image
+
+from tiles import TileRegion
+
+
+TILE_SIZE = 256
+FORMAT = "jpg"
+QUALITY = 90
+
+
+def make_levels(image: Image.Image) -> List[Image.Image]:
+    """Уменьшаем изображение вдвое, пока оно не поместится в один тайл"""
+    levels = [image]
+
+    while max(levels[0].size) > TILE_SIZE:
+        width, height = levels[0].size
+
+        levels.insert(
+            0,
+            levels[0].resize(
+                (max(width // 2, 1), max(height // 2, 1)),
+                Image.LANCZOS
+            )
+        )
+
+    return levels
+
+
+def make_tiles(
+    source: str,
+    destination: str,
+    extent: List[float],
+    name: str=None
+) -> None:
+    """Режем изображение source с границами extent в папку destination"""
+    image = Image.open(source).convert("RGB")
+    levels = make_levels(image)
+
+    for z, level in enumerate(levels):
+        os.makedirs(os.path.join(destination, str(z)), exist_ok=True)
+
+        width, height = level.size
+
+        for row in range(math.ceil(height / TILE_SIZE)):
+            for column in range(math.ceil(width / TILE_SIZE)):
+                tile = level.crop(
+                    (
+                        column * TILE_SIZE,
+                        row * TILE_SIZE,
+                        min((column + 1) * TILE_SIZE, width),
+                        min((row + 1) * TILE_SIZE, height)
+                    )
+                )
+
+                tile.save(
+                    os.path.join(
+                        destination,
+                        str(z),
+                        "{}_{}.{}".format(row, column, FORMAT)
+                    ),
+                    quality=QUALITY
+                )
+
+    manifest = {
+        "name": name or os.path.basename(os.path.normpath(destination)),
+        "extent": extent,
+        "tile_size": TILE_SIZE,
+        "format": FORMAT,
+        "levels": [
+            {"width": level.size[0], "height": level.size[1]}
+            for level in levels
+        ]
+    }
+
+    with open(
+        os.path.join(destination, TileRegion.MANIFEST),
+        "w",
+        encoding="utf-8"
+    ) as file:
+        json.dump(manifest, file, indent=4)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Нарезка участка карты на тайлы"
+    )
+
+    parser.add_argument("source", help="Изображение участка")
+    parser.add_argument("destination", help="Папка участка с тайлами")
+    parser.add_argument(
+        "extent",
+        nargs=4,
+        type=float,
+        metavar=("WEST", "EAST", "SOUTH", "NORTH"),
+        help="Границы участка в градусах"
+    )
+    parser.add_argument("--name", help="Название участка")
+
+    argv = parser.parse_args()
+
+    make_tiles(argv.source, argv.destination, argv.extent, argv.name)
+
+
+if __name__ == "__main__":
+    main()
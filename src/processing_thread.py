@@ -0,0 +1,93 @@
+from typing import Optional
+
+from PyQt5 import QtCore
+
+from progress import Progress
+from reb_export import export_events, guess_format
+from reb_options import REBOptions
+from reb_writer import EventWriter
+from run_metrics import WRITE
+
+
+class ProcessingThread(QtCore.QThread):
+    """
+    Обработка архива в фоновом потоке, чтобы окно не зависало
+
+    Ход обработки (ProgressSnapshot) приходит в progress_changed после
+    каждого файла, окончание - в стандартный сигнал finished
+
+    result - файл, в который события пишутся по мере того, как находятся.
+    Неполный результат после отмены или ошибки удаляется. Таблица событий
+    (csv, jsonl и т.д., см. reb_export) выгружается после обработки
+
+    Замер запуска (reb_options.metrics) включает запись результата и
+    заканчивается вместе с потоком
+    """
+
+    progress_changed = QtCore.pyqtSignal(object)
+    processing_failed = QtCore.pyqtSignal(str)
+
+    def __init__(
+        self,
+        reb_options: REBOptions,
+        result: Optional[str]=None,
+        *args,
+        **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+
+        self.reb_options = reb_options
+        self.result = result
+
+        # Сигналы между потоками Qt доставляет через очередь событий окна
+        self.reb_options.progress.callback = self._emit_progress
+
+    def _emit_progress(
+        self,
+        progress: Progress
+    ) -> None:
+        """
+        Отправляем в окно копию хода обработки: сам Progress поток
+        продолжает менять, пока окно его читает
+        """
+        self.progress_changed.emit(progress.snapshot())
+
+    def run(self) -> None:
+        metrics = self.reb_options.metrics
+        metrics.start()
+
+        try:
+            export_format, compress = guess_format(self.result or "")
+
+            if not self.result or export_format:
+                self.reb_options.process_directories()
+
+                if export_format and not self.is_cancelled():
+                    with metrics.stage(WRITE):
+                        export_events(
+                            self.result,
+                            self.reb_options.get_events(),
+                            export_format,
+                            compress
+                        )
+
+                return
+
+            with EventWriter(self.result, atomic=True) as writer:
+                self.reb_options.process_directories(writer)
+
+                if self.is_cancelled():
+                    writer.discard()
+
+        except Exception as error:
+            self.processing_failed.emit(str(error))
+
+        finally:
+            metrics.finish()
+
+    def cancel(self) -> None:
+        """Останавливаем обработку после текущего файла"""
+        self.reb_options.progress.cancel()
+
+    def is_cancelled(self) -> bool:
+        return self.reb_options.progress.cancelled
@@ -0,0 +1,108 @@
+import time
+
+from typing import Callable, List, NamedTuple, Optional
+
+from reb_archive import source_size
+
+
+class ProgressSnapshot(NamedTuple):
+    """Неизменяемая копия хода обработки для передачи в другой поток"""
+
+    total_files: int
+    total_bytes: int
+    files_done: int
+    bytes_done: int
+    events: int
+    eta: Optional[float]
+
+
+class Progress:
+    """
+    Ход обработки архива
+
+    Хранит число обработанных файлов, байт и найденных событий, а также
+    флаг отмены. Обработка проверяет флаг между файлами, поэтому отменить
+    ее можно из другого потока. callback вызывается после каждого шага
+    """
+
+    def __init__(
+        self,
+        callback: Optional[Callable[["Progress"], None]]=None
+    ) -> None:
+        self.callback = callback
+
+        self.total_files = 0
+        self.total_bytes = 0
+        self.files_done = 0
+        self.bytes_done = 0
+        self.events = 0
+
+        self.cancelled = False
+        self.started = time.monotonic()
+
+    def start(
+        self,
+        files: List[str]
+    ) -> None:
+        """Начинаем обработку списка файлов"""
+        self.total_files = len(files)
+        self.total_bytes = sum(file_size(filepath) for filepath in files)
+        self.started = time.monotonic()
+
+        self._notify()
+
+    def advance(
+        self,
+        size: int,
+        events: int=0,
+        files: int=1
+    ) -> None:
+        """Отмечаем обработанные файлы общим размером size"""
+        self.files_done += files
+        self.bytes_done += size
+        self.events += events
+
+        self._notify()
+
+    def add_events(
+        self,
+        events: int
+    ) -> None:
+        self.events += events
+
+        self._notify()
+
+    def cancel(self) -> None:
+        """Просим остановить обработку после текущего файла"""
+        self.cancelled = True
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def eta(self) -> Optional[float]:
+        """Оценка оставшегося времени в секундах по скорости чтения"""
+        if not self.bytes_done:
+            return None
+
+        left = max(self.total_bytes - self.bytes_done, 0)
+
+        return self.elapsed() * left / self.bytes_done
+
+    def snapshot(self) -> ProgressSnapshot:
+        return ProgressSnapshot(
+            self.total_files,
+            self.total_bytes,
+            self.files_done,
+            self.bytes_done,
+            self.events,
+            self.eta()
+        )
+
+    def _notify(self) -> None:
+        if self.callback is not None:
+            self.callback(self)
+
+
+def file_size(filepath: str) -> int:
+    """Размер файла на диске, недоступный файл считаем пустым"""
+    return source_size(filepath)
@@ -0,0 +1,299 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import queue
+import threading
+import zipfile
+
+from collections import OrderedDict
+from typing import BinaryIO, List, Optional, Tuple
+
+
+# Разделитель пути к zip архиву и имени файла внутри него:
+# archive/2018_05.zip::2018_05_03.txt
+MEMBER_SEPARATOR = "::"
+
+ZIP_SUFFIX = ".zip"
+
+# Сжатые одиночные файлы, например 2018_05_03.txt.gz
+COMPRESSORS = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open
+}
+
+
+def split_source(source: str) -> Tuple[str, Optional[str]]:
+    """Путь к файлу на диске и имя файла внутри zip архива"""
+    path, separator, member = source.partition(MEMBER_SEPARATOR)
+
+    return path, member if separator else None
+
+
+def archive_path(source: str) -> str:
+    """Файл на диске, в котором лежит источник"""
+    return split_source(source)[0]
+
+
+def is_compressed(source: str) -> bool:
+    """Сжатый источник нельзя отобразить в память и копировать sendfile"""
+    path, member = split_source(source)
+
+    return member is not None or os.path.splitext(path)[1] in COMPRESSORS
+
+
+def inner_name(source: str) -> str:
+    """Имя источника без расширения сжатия: a.txt.gz -> a.txt"""
+    root, extension = os.path.splitext(source)
+
+    if extension in COMPRESSORS:
+        return root
+
+    return source
+
+
+def list_sources(path: str) -> List[str]:
+    """Источники в файле: члены zip архива или сам файл"""
+    if os.path.splitext(path)[1] != ZIP_SUFFIX:
+        return [path]
+
+    with zipfile.ZipFile(path) as archive:
+        return [
+            path + MEMBER_SEPARATOR + info.filename
+            for info in archive.infolist() if not info.is_dir()
+        ]
+
+
+def source_size(source: str) -> int:
+    """Сколько байт источник занимает на диске, недоступный - 0"""
+    path, member = split_source(source)
+
+    try:
+        if member is None:
+            return os.path.getsize(path)
+
+        with zipfile.ZipFile(path) as archive:
+            return archive.getinfo(member).compress_size
+
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return 0
+
+
+class PrefetchStream(io.RawIOBase):
+    """
+    Чтение потока в фоновом потоке
+
+    Распаковка gzip, bz2 и xz отпускает GIL, поэтому следующий кусок
+    распаковывается, пока разбирается текущий. В очереди держится не
+    больше DEPTH кусков по CHUNK_SIZE байт
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    DEPTH = 4
+
+    def __init__(
+        self,
+        stream: BinaryIO
+    ) -> None:
+        super().__init__()
+
+        self.stream = stream
+
+        self._chunks: queue.Queue = queue.Queue(self.DEPTH)
+        self._chunk = memoryview(b"")
+        self._finished = False
+        self._stop = threading.Event()
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> None:
+        """Кладем кусок в очередь, пока чтение не остановили"""
+        while not self._stop.is_set():
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                chunk = self.stream.read(self.CHUNK_SIZE)
+                self._put(chunk)
+
+                if not chunk:
+                    return
+
+        except Exception as error:
+            # Ошибку распаковки поднимаем в читающем потоке
+            self._put(error)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self._chunk:
+            if self._finished:
+                return 0
+
+            chunk = self._chunks.get()
+
+            if isinstance(chunk, Exception):
+                self._finished = True
+                raise chunk
+
+            if not chunk:
+                self._finished = True
+                return 0
+
+            self._chunk = memoryview(chunk)
+
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+
+        return size
+
+    def close(self) -> None:
+        if self.closed:
+            return
+
+        self._stop.set()
+
+        # Освобождаем место в очереди, чтобы фоновый поток завершился
+        while self._thread.is_alive():
+            try:
+                self._chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+        self.stream.close()
+        super().close()
+
+
+def open_source(
+    source: str,
+    prefetch: bool=False
+) -> BinaryIO:
+    """
+    Открываем источник в бинарном режиме
+
+    Сжатые файлы и члены zip архива читаются потоком без распаковки на
+    диск, смещения в них считаются по распакованному тексту. prefetch -
+    распаковывать в фоновом потоке (такой поток нельзя перематывать)
+    """
+    path, member = split_source(source)
+
+    if member is not None:
+        with zipfile.ZipFile(path) as archive:
+            # Открытый член архива держит файл, пока его не закроют
+            stream = archive.open(member)
+    else:
+        compressor = COMPRESSORS.get(os.path.splitext(path)[1])
+
+        if compressor is None:
+            return open(path, "rb")
+
+        stream = compressor(path, "rb")
+
+    if prefetch:
+        return io.BufferedReader(PrefetchStream(stream))
+
+    return stream
+
+
+class RangeReader:
+    """
+    Чтение диапазонов байтов из нескольких источников
+
+    Последние max_open источников держатся открытыми. Сжатый поток нельзя
+    перемотать назад без распаковки с начала, но перемотка вперед только
+    продолжает распаковку, поэтому чтение по возрастанию смещения
+    распаковывает файл один раз, а не заново для каждого диапазона
+    """
+
+    MAX_OPEN = 4
+
+    def __init__(
+        self,
+        max_open: int=MAX_OPEN
+    ) -> None:
+        self.max_open = max_open
+        self._files: "OrderedDict[str, BinaryIO]" = OrderedDict()
+
+    def __enter__(self) -> "RangeReader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def open(
+        self,
+        source: str
+    ) -> BinaryIO:
+        """Открытый источник, давно не использованный закрывается"""
+        file = self._files.get(source)
+
+        if file is None:
+            if len(self._files) >= self.max_open:
+                self._files.popitem(last=False)[1].close()
+
+            file = open_source(source)
+            self._files[source] = file
+        else:
+            self._files.move_to_end(source)
+
+        return file
+
+    def read(
+        self,
+        source: str,
+        offset: int,
+        length: int
+    ) -> bytes:
+        """Байты источника с offset длиной length"""
+        file = self.open(source)
+        file.seek(offset)
+
+        return file.read(length)
+
+    def close(self) -> None:
+        for file in self._files.values():
+            file.close()
+
+        self._files.clear()
+
+
+# Сжатые источники, из которых события читаются по одному (Event.data)
+_compressed_reader = RangeReader()
+_compressed_lock = threading.Lock()
+
+
+def read_range(
+    source: str,
+    offset: int,
+    length: int
+) -> bytes:
+    """
+    Байты источника с offset длиной length
+
+    Обычный файл открывается на время чтения, а сжатый остается открытым
+    в общем RangeReader, чтобы следующее событие из него не распаковывало
+    файл с начала
+    """
+    if is_compressed(source):
+        with _compressed_lock:
+            return _compressed_reader.read(source, offset, length)
+
+    with open_source(source) as file:
+        file.seek(offset)
+        return file.read(length)
+
+
+def close_ranges() -> None:
+    """Закрываем сжатые источники, оставшиеся открытыми после read_range"""
+    with _compressed_lock:
+        _compressed_reader.close()
@@ -0,0 +1,523 @@
+import math
+import os
+import sqlite3
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from figures import Figure
+from progress import Progress, file_size
+from reb_archive import archive_path, open_source
+from reb_event import Event
+from event_table import EventTable, to_epoch_ms
+from reb_formats import HEADER_FIELDS, SNIFF_SIZE, detect_format
+from reb_parser import REBParser
+from reb_query import Query
+from spatial_index import LatLonGrid
+from station_index import StationFilter
+
+
+def index_file(filepath: str) -> List[tuple]:
+    """Разбираем все события файла вместе со станциями для каталога"""
+    with open_source(filepath, prefetch=True) as file:
+        reb_format = detect_format(file.peek(SNIFF_SIZE)[:SNIFF_SIZE])
+
+        return [
+            event.to_record()
+            for event in REBParser(reb_format).parse(file, filepath)
+        ]
+
+
+class REBCatalog:
+    """
+    Каталог событий REB архива в SQLite
+
+    Хранит для каждого события номер, время, координаты, станции и
+    положение текста в исходном файле. При обновлении заново разбираются
+    только файлы, у которых изменились время модификации или размер
+    """
+
+    # Каталог можно в любой момент построить заново, поэтому при смене
+    # схемы старые таблицы просто удаляются
+    SCHEMA_VERSION = 5
+
+    # Размер ячейки сетки в градусах
+    CELL_SIZE = 1.0
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            path TEXT UNIQUE NOT NULL,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL,
+            ordinal INTEGER
+        );
+
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY,
+            file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+            event TEXT NOT NULL,
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            latitude REAL NOT NULL,
+            longtitude REAL NOT NULL,
+            cell INTEGER NOT NULL,
+            source_offset INTEGER NOT NULL,
+            source_length INTEGER NOT NULL,
+            padding BLOB NOT NULL,
+            stations TEXT NOT NULL,
+            {}
+        );
+
+        CREATE INDEX IF NOT EXISTS events_file ON events(file_id);
+
+        CREATE INDEX IF NOT EXISTS events_cell ON events(cell);
+
+        CREATE TABLE IF NOT EXISTS stations (
+            id INTEGER PRIMARY KEY,
+            name TEXT UNIQUE NOT NULL
+        );
+
+        -- Инвертированный индекс: для каждой станции события, которые
+        -- она зарегистрировала (список читается по detections_station)
+        CREATE TABLE IF NOT EXISTS detections (
+            event_id INTEGER NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+            station_id INTEGER NOT NULL REFERENCES stations(id)
+        );
+
+        CREATE INDEX IF NOT EXISTS detections_station
+            ON detections(station_id, event_id);
+
+        CREATE INDEX IF NOT EXISTS detections_event
+            ON detections(event_id);
+    """.format(
+        # Поля заголовка события, NaN в SQLite хранится как NULL
+        ",\n            ".join(name + " REAL" for name in HEADER_FIELDS)
+    )
+
+    def __init__(
+        self,
+        path: str
+    ) -> None:
+        self.path = path
+        self.grid = LatLonGrid(self.CELL_SIZE)
+
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != self.SCHEMA_VERSION:
+            self.connection.executescript(
+                "DROP TABLE IF EXISTS detections;"
+                "DROP TABLE IF EXISTS stations;"
+                "DROP TABLE IF EXISTS events;"
+                "DROP TABLE IF EXISTS files;"
+            )
+
+        self.connection.executescript(self.SCHEMA)
+        self.connection.execute(
+            "PRAGMA user_version = {}".format(self.SCHEMA_VERSION)
+        )
+
+        # Коды станций хранятся в каталоге небольшими целыми числами
+        self.station_ids = {
+            name: station_id for station_id, name in
+            self.connection.execute("SELECT id, name FROM stations")
+        }
+
+    def __enter__(self) -> "REBCatalog":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _stat(
+        self,
+        filepath: str
+    ) -> Tuple[float, int]:
+        # Член zip архива считается изменившимся вместе с архивом
+        stat = os.stat(archive_path(filepath))
+        return stat.st_mtime, stat.st_size
+
+    def _changed_files(
+        self,
+        files: List[str]
+    ) -> List[str]:
+        """Отбираем файлы, которых нет в каталоге или которые изменились"""
+        known = {
+            path: (mtime, size) for path, mtime, size in
+            self.connection.execute("SELECT path, mtime, size FROM files")
+        }
+
+        return [
+            filepath for filepath in files
+            if known.get(filepath) != self._stat(filepath)
+        ]
+
+    def _store_file(
+        self,
+        filepath: str,
+        records: List[tuple]
+    ) -> None:
+        """Заменяем события файла в каталоге"""
+        mtime, size = self._stat(filepath)
+
+        self.connection.execute(
+            "DELETE FROM files WHERE path = ?",
+            (filepath,)
+        )
+
+        file_id = self.connection.execute(
+            "INSERT INTO files (path, mtime, size) VALUES (?, ?, ?)",
+            (filepath, mtime, size)
+        ).lastrowid
+
+        for (
+            latitude,
+            longtitude,
+            event,
+            date,
+            time,
+            header,
+            stations,
+            offset,
+            length,
+            padding
+        ) in records:
+            event_id = self.connection.execute(
+                "INSERT INTO events (file_id, event, date, time, latitude, "
+                "longtitude, cell, source_offset, source_length, padding, "
+                "stations, {}) VALUES ({})".format(
+                    ", ".join(HEADER_FIELDS),
+                    ", ".join("?" * (11 + len(HEADER_FIELDS)))
+                ),
+                (
+                    file_id,
+                    event,
+                    date,
+                    time,
+                    latitude,
+                    longtitude,
+                    self.grid.cell(latitude, longtitude),
+                    offset,
+                    length,
+                    padding,
+                    " ".join(stations)
+                ) + tuple(header)
+            ).lastrowid
+
+            self.connection.executemany(
+                "INSERT INTO detections (event_id, station_id) VALUES (?, ?)",
+                [(event_id, self._station_id(station)) for station in stations]
+            )
+
+    def _station_id(
+        self,
+        name: str
+    ) -> int:
+        """Номер станции в каталоге, новая станция добавляется"""
+        station_id = self.station_ids.get(name)
+
+        if station_id is None:
+            station_id = self.connection.execute(
+                "INSERT INTO stations (name) VALUES (?)",
+                (name,)
+            ).lastrowid
+            self.station_ids[name] = station_id
+
+        return station_id
+
+    def _remove_missing(self) -> None:
+        """Убираем из каталога удаленные с диска файлы"""
+        missing = [
+            (path,) for (path,) in
+            self.connection.execute("SELECT path FROM files")
+            if not os.path.exists(archive_path(path))
+        ]
+
+        self.connection.executemany(
+            "DELETE FROM files WHERE path = ?",
+            missing
+        )
+
+    def _set_order(
+        self,
+        files: List[str]
+    ) -> None:
+        """
+        Запоминаем порядок обхода файлов, чтобы выборка шла в том же
+        порядке, что и при разборе файлов напрямую
+        """
+        self.connection.execute("UPDATE files SET ordinal = NULL")
+        self.connection.executemany(
+            "UPDATE files SET ordinal = ? WHERE path = ?",
+            enumerate(files)
+        )
+
+    def update(
+        self,
+        files: List[str],
+        workers: int=1,
+        progress: Optional[Progress]=None
+    ) -> None:
+        """
+        Переиндексируем новые и изменившиеся файлы
+
+        При отмене через progress уже разобранные файлы остаются в каталоге
+        """
+        progress = progress or Progress()
+
+        files = [os.path.abspath(filepath) for filepath in files]
+        changed = self._changed_files(files)
+
+        # Неизменившиеся файлы сразу считаем обработанными
+        unchanged = set(files).difference(changed)
+        progress.advance(
+            sum(file_size(filepath) for filepath in unchanged),
+            files=len(unchanged)
+        )
+
+        with self.connection:
+            self._remove_missing()
+
+            if workers > 1 and len(changed) > 1:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = {
+                        executor.submit(index_file, filepath): filepath
+                        for filepath in sorted(
+                            changed,
+                            key=file_size,
+                            reverse=True
+                        )
+                    }
+
+                    for future in as_completed(futures):
+                        self._index_result(futures[future], future)
+                        progress.advance(file_size(futures[future]))
+
+                        if progress.cancelled:
+                            executor.shutdown(cancel_futures=True)
+                            break
+            else:
+                for filepath in changed:
+                    if progress.cancelled:
+                        break
+
+                    self._index_result(filepath, None)
+                    progress.advance(file_size(filepath))
+
+            self._set_order(files)
+
+        # Обновляем статистику, по которой SQLite выбирает индексы
+        self.connection.execute("PRAGMA optimize")
+
+    def _index_result(
+        self,
+        filepath: str,
+        future
+    ) -> None:
+        """Сохраняем результат разбора файла, сообщая об ошибках"""
+        try:
+            if future is None:
+                records = index_file(filepath)
+            else:
+                records = future.result()
+
+            print(filepath + " - проиндексирован")
+        except:
+            # Запоминаем файл без событий, чтобы не разбирать его
+            # при каждом запуске, пока он не изменится
+            records = []
+            print(filepath + " - возникла ошибка при обработке!!!")
+
+        self._store_file(filepath, records)
+
+    def count_events(self) -> int:
+        """Сколько событий в каталоге у файлов последнего обновления"""
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM events "
+            "JOIN files ON files.id = events.file_id "
+            "WHERE files.ordinal IS NOT NULL"
+        ).fetchone()[0]
+
+    def _cell_condition(
+        self,
+        figure: Optional[Figure]
+    ) -> Tuple[str, list]:
+        """Условие на ячейки сетки, которые покрывают фигуру"""
+        if figure is None:
+            return "1", []
+
+        ranges = self.grid.ranges(figure.bounding_box())
+
+        condition = " OR ".join(
+            "events.cell BETWEEN ? AND ?" for _ in ranges
+        )
+
+        return "(" + condition + ")", [
+            cell for cell_range in ranges for cell in cell_range
+        ]
+
+    def _columns(
+        self,
+        candidates: List[tuple]
+    ) -> Callable[[str], np.ndarray]:
+        """Столбцы кандидатов для Query.select, считаются по требованию"""
+        columns: Dict[str, np.ndarray] = dict()
+
+        def column(name: str) -> np.ndarray:
+            values = columns.get(name)
+
+            if values is not None:
+                return values
+
+            if name == "latitude":
+                values = [row[5] for row in candidates]
+            elif name == "longtitude":
+                values = [row[6] for row in candidates]
+            elif name == "time":
+                values = [to_epoch_ms(row[3], row[4]) for row in candidates]
+            else:
+                # NULL в столбцах заголовка - отсутствующее значение
+                position = 10 + HEADER_FIELDS.index(name)
+                values = [
+                    math.nan if row[position] is None else row[position]
+                    for row in candidates
+                ]
+
+            columns[name] = values = np.array(
+                values,
+                dtype=np.int64 if name == "time" else np.float64
+            )
+
+            return values
+
+        return column
+
+    def _match_stations(
+        self,
+        event_ids: np.ndarray,
+        station_filter: StationFilter
+    ) -> np.ndarray:
+        """
+        Маска событий event_ids, подходящих под условие на станции
+
+        Для каждой выбранной станции из индекса detections читается
+        список зарегистрированных ею событий (только в пределах номеров
+        event_ids), и считается, сколько выбранных станций видели событие
+        """
+        counts = np.zeros(len(event_ids), dtype=np.int64)
+
+        if station_filter.is_empty() or not len(event_ids):
+            return counts > 0
+
+        low = int(event_ids.min())
+        high = int(event_ids.max())
+
+        for name in station_filter.names:
+            station_id = self.station_ids.get(name)
+
+            if station_id is None:
+                continue
+
+            posting = np.fromiter(
+                (
+                    event_id for (event_id,) in self.connection.execute(
+                        "SELECT event_id FROM detections "
+                        "WHERE station_id = ? AND event_id BETWEEN ? AND ?",
+                        (station_id, low, high)
+                    )
+                ),
+                dtype=np.int64
+            )
+
+            counts += np.isin(event_ids, posting)
+
+        return counts >= station_filter.required
+
+    def query(
+        self,
+        query: Query
+    ) -> EventTable:
+        """
+        Выбираем события, подходящие под запрос
+
+        Сначала по индексу сетки отбираются события из ячеек под фигурой,
+        и только для них проверяются условия запроса (Query.select) по
+        столбцам. Затем условие на станции проверяется по индексу
+        detections. Без условия на станции подходят и события, у которых
+        нет ни одной станции, как при разборе файлов
+        """
+        cell_condition, parameters = self._cell_condition(query.figure)
+
+        candidates = self.connection.execute(
+            "SELECT events.id, files.path, events.event, events.date, "
+            "events.time, events.latitude, events.longtitude, "
+            "events.source_offset, events.source_length, events.padding, "
+            "{}, events.stations "
+            "FROM events "
+            "JOIN files ON files.id = events.file_id "
+            "WHERE files.ordinal IS NOT NULL AND {} "
+            "ORDER BY files.ordinal, events.source_offset".format(
+                ", ".join("events." + name for name in HEADER_FIELDS),
+                cell_condition
+            ),
+            parameters
+        ).fetchall()
+
+        selected = query.select(self._columns(candidates), len(candidates))
+
+        if query.station_filter is not None:
+            event_ids = np.array(
+                [candidates[i][0] for i in selected],
+                dtype=np.int64
+            )
+            selected = selected[
+                self._match_stations(event_ids, query.station_filter)
+            ]
+
+        events = EventTable()
+
+        for i in selected:
+            (
+                _,
+                path,
+                event,
+                date,
+                time,
+                latitude,
+                longtitude,
+                offset,
+                length,
+                padding
+            ) = candidates[i][:10]
+
+            header = tuple(
+                math.nan if value is None else value
+                for value in candidates[i][10:-1]
+            )
+
+            events.append(
+                Event(
+                    None,
+                    latitude,
+                    longtitude,
+                    event=event,
+                    date=date,
+                    time=time,
+                    header=header,
+                    stations=tuple(candidates[i][-1].split()),
+                    source=path,
+                    offset=offset,
+                    length=length,
+                    padding=padding
+                )
+            )
+
+        return events
@@ -1,10 +1,41 @@
-from matplotlib import axes
-from cartopy.crs import Projection
-from matplotlib.transforms import offset_copy
+from typing import TYPE_CHECKING
+
+from reb_archive import read_range
+
+if TYPE_CHECKING:
+    from matplotlib import axes
+    from cartopy.crs import Projection
+    from event_table import EventTable
 
 
 class Event:
-    """Событие REB"""
+    """
+    Событие REB
+
+    Текст события можно передать сразу в data, а можно указать только
+    файл-источник, смещение и длину: тогда текст будет прочитан из файла
+    при первом обращении к data
+
+    Много событий хранится в EventTable, а Event - только строка таблицы
+
+    header - глубина, число станций, эллипс ошибок и магнитуды
+    в порядке reb_formats.HEADER_FIELDS
+    """
+
+    __slots__ = (
+        "_data",
+        "latitude",
+        "longtitude",
+        "event",
+        "date",
+        "time",
+        "header",
+        "stations",
+        "source",
+        "offset",
+        "length",
+        "padding"
+    )
 
     MARKER_SIZE = 2
     MARKER_TRANSPARENCY = 0.7
@@ -13,26 +44,125 @@ class Event:
     TEXT_BOX_TRANSPARENCY = 0.5
     FONTSIZE = 6
 
+    # Размер подписи на экране в точках и наибольшее число подписей
+    LABEL_WIDTH = 60
+    LABEL_HEIGHT = 30
+    MAX_LABELS = 300
+
+    ENCODING = "utf-8"
+
     def __init__(
         self,
         data: str,
         latitude: float,
-        longtitude: float
+        longtitude: float,
+        event: str=None,
+        date: str=None,
+        time: str=None,
+        header: tuple=None,
+        stations: tuple=(),
+        source: str=None,
+        offset: int=0,
+        length: int=0,
+        padding: bytes=b""
     ) -> None:
-        self.data = data
+        self._data = data
         self.latitude = latitude
         self.longtitude = longtitude
-        self.event = data.split("\n")[0].split()[1]
+        self.time = time
+        self.header = header
+
+        # Станции, зарегистрировавшие событие
+        self.stations = stations
+
+        # Положение текста события в исходном файле
+        self.source = source
+        self.offset = offset
+        self.length = length
+        self.padding = padding
+
+        if event is None or date is None:
+            lines = data.split("\n")
+            fields = lines[0].split()
+            event = fields[1]
+
+            if len(fields) == 2:
+                date = lines[4].split()[0]
+            else:
+                date = lines[2].split()[0]
+
+        self.event = event
+        self.date = date
+
+    def to_record(self) -> tuple:
+        """Компактное представление события без текста и пути к файлу"""
+        return (
+            self.latitude,
+            self.longtitude,
+            self.event,
+            self.date,
+            self.time,
+            self.header,
+            self.stations,
+            self.offset,
+            self.length,
+            self.padding
+        )
+
+    @classmethod
+    def from_record(
+        cls,
+        source: str,
+        record: tuple
+    ) -> "Event":
+        """Восстанавливаем событие из записи to_record"""
+        (
+            latitude,
+            longtitude,
+            event,
+            date,
+            time,
+            header,
+            stations,
+            offset,
+            length,
+            padding
+        ) = record
+
+        return cls(
+            None,
+            latitude,
+            longtitude,
+            event=event,
+            date=date,
+            time=time,
+            header=header,
+            stations=stations,
+            source=source,
+            offset=offset,
+            length=length,
+            padding=padding
+        )
+
+    def read_bytes(self) -> bytes:
+        """Получаем текст события в том виде, в каком он лежит в файле"""
+        if self._data is not None:
+            return self._data.encode(self.ENCODING)
+
+        return read_range(self.source, self.offset, self.length) + self.padding
+
+    @property
+    def data(self) -> str:
+        """Текст события, загружается только по запросу"""
+        if self._data is None:
+            return self.read_bytes().decode(self.ENCODING, "replace")
 
-        if len(data.split("\n")[0].split()) == 2:
-            self.date = data.split("\n")[4].split()[0]
-        else:
-            self.date = data.split("\n")[2].split()[0]
+        return self._data
 
     def draw_on_map(
         self,
-        ax: axes,
-        projection: Projection,
+        ax: "axes",
+        projection: "Projection",
         show_names: bool
     ) -> None:
         """Отрисовка события на карте"""
@@ -47,20 +177,94 @@ class Event:
         )
 
         if show_names:
-            ax.text(
-                self.longtitude,
-                self.latitude,
-                self.event + "\n" + self.date,
-                fontsize=self.FONTSIZE,
-                verticalalignment="center",
-                horizontalalignment="right",
-                transform=offset_copy(
-                    projection._as_mpl_transform(ax),
-                    units="dots",
-                    y=self.TEXT_OFFSET
-                ),
-                bbox=dict(
-                    alpha=self.TEXT_BOX_TRANSPARENCY,
-                    boxstyle="round"
-                )
+            self._draw_name(ax, projection)
+
+    @classmethod
+    def draw_many_on_map(
+        cls,
+        ax: "axes",
+        projection: "Projection",
+        events: "EventTable"
+    ) -> None:
+        """
+        Отрисовка всех событий одной коллекцией точек
+
+        Вместо отдельной линии на каждое событие рисуется один scatter,
+        поэтому время отрисовки почти не растет с числом событий
+        """
+        if not len(events):
+            return
+
+        # Размер в scatter задается площадью, а толщина контура такая же,
+        # как у маркера plot
+        ax.scatter(
+            events.longtitude,
+            events.latitude,
+            s=cls.MARKER_SIZE ** 2,
+            marker="o",
+            color="red",
+            linewidths=1,
+            alpha=cls.MARKER_TRANSPARENCY,
+            transform=projection
+        )
+
+    @classmethod
+    def draw_names_on_map(
+        cls,
+        ax: "axes",
+        projection: "Projection",
+        events: "EventTable"
+    ) -> None:
+        """
+        Подписи событий без наложений
+
+        Подписываются только события в видимой части карты, подписи
+        которых не перекрывают друг друга, и не больше MAX_LABELS.
+        Раскладка зависит от масштаба, поэтому при приближении подписей
+        становится больше
+        """
+        if not len(events):
+            return
+
+        import numpy as np
+
+        from label_layout import declutter
+
+        points = projection._as_mpl_transform(ax).transform(
+            np.column_stack((events.longtitude, events.latitude))
+        )
+
+        for i in declutter(
+            points,
+            tuple(ax.bbox.extents),
+            cls.LABEL_WIDTH,
+            cls.LABEL_HEIGHT,
+            cls.MAX_LABELS
+        ):
+            events[i]._draw_name(ax, projection)
+
+    def _draw_name(
+        self,
+        ax: "axes",
+        projection: "Projection"
+    ) -> None:
+        """Подпись события под точкой"""
+        from matplotlib.transforms import offset_copy
+
+        ax.text(
+            self.longtitude,
+            self.latitude,
+            self.event + "\n" + self.date,
+            fontsize=self.FONTSIZE,
+            verticalalignment="center",
+            horizontalalignment="right",
+            transform=offset_copy(
+                projection._as_mpl_transform(ax),
+                units="dots",
+                y=self.TEXT_OFFSET
+            ),
+            bbox=dict(
+                alpha=self.TEXT_BOX_TRANSPARENCY,
+                boxstyle="round"
             )
+        )
@@ -0,0 +1,383 @@
+import csv
+import gzip
+import json
+import math
+import os
+
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple, Type
+
+import numpy as np
+
+from event_table import EventTable
+
+
+# Поля, которые попадают в выгрузку, кроме станций. В столбце stations
+# все станции, зарегистрировавшие событие, а не только выбранные
+FIELDS = (
+    "event",
+    "time",
+    "latitude",
+    "longtitude",
+    "depth",
+    "mb",
+    "ML",
+    "Ms"
+)
+
+GZIP_SUFFIX = ".gz"
+
+
+def _iso_times(milliseconds: np.ndarray) -> List[Optional[str]]:
+    """Время в формате ISO 8601, событие без даты дает None"""
+    times = milliseconds.astype("datetime64[ms]")
+    text = np.datetime_as_string(times, unit="ms", timezone="UTC")
+
+    # NO_TIME совпадает с NaT
+    return [
+        None if missing else value
+        for value, missing in zip(text.tolist(), np.isnat(times).tolist())
+    ]
+
+
+def _values(column: np.ndarray) -> list:
+    """Значения столбца для текстовых форматов, NaN заменяется на None"""
+    if column.dtype == np.float32:
+        # Кратчайшая запись float32, иначе 3.8 превращается в 3.799999952316284
+        values = [float(text) for text in column.astype(str).tolist()]
+    else:
+        values = column.tolist()
+
+    if column.dtype.kind == "f":
+        return [None if math.isnan(value) else value for value in values]
+
+    return values
+
+
+class Exporter:
+    """
+    Выгрузка найденных событий в табличный формат
+
+    Пишет прямо из столбцов EventTable кусками по BATCH_SIZE событий,
+    текст событий при этом не читается. Каждое событие - номер, время,
+    координаты, глубина, магнитуды и зарегистрировавшие его станции.
+    Выгрузка пишется во временный файл рядом и переименовывается в
+    итоговый только целиком, как EventWriter(atomic=True)
+    """
+
+    NAME = None
+    EXTENSION = None
+
+    BATCH_SIZE = 10000
+    PARTIAL_SUFFIX = ".part"
+
+    def __init__(
+        self,
+        compress: bool=False
+    ) -> None:
+        self.compress = compress
+
+    def batches(
+        self,
+        table: EventTable
+    ) -> Iterator[Dict[str, list]]:
+        """Куски таблицы в виде списков значений по полям"""
+        columns = {
+            name: table.column(name) for name in FIELDS if name != "time"
+        }
+
+        for start in range(0, len(table), self.BATCH_SIZE):
+            end = min(start + self.BATCH_SIZE, len(table))
+
+            batch = {
+                name: _values(column[start:end])
+                for name, column in columns.items()
+            }
+            batch["time"] = _iso_times(table.time[start:end])
+            batch["stations"] = [
+                list(table.stations(index)) for index in range(start, end)
+            ]
+
+            yield batch
+
+    def _open(
+        self,
+        filename: str
+    ) -> TextIO:
+        if self.compress:
+            return gzip.open(filename, "wt", encoding="utf-8", newline="")
+
+        return open(filename, "w", encoding="utf-8", newline="")
+
+    def export(
+        self,
+        filename: str,
+        table: EventTable
+    ) -> None:
+        """Выгружаем таблицу в filename, при ошибке файл не появляется"""
+        partial = filename + self.PARTIAL_SUFFIX
+
+        try:
+            self._export(partial, table)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+
+        os.replace(partial, filename)
+
+    def _export(
+        self,
+        filename: str,
+        table: EventTable
+    ) -> None:
+        with self._open(filename) as file:
+            self.write(file, table)
+
+    def write(
+        self,
+        file: TextIO,
+        table: EventTable
+    ) -> None:
+        raise NotImplementedError
+
+
+class CSVExporter(Exporter):
+    """CSV с заголовком, станции перечислены через пробел"""
+
+    NAME = "csv"
+    EXTENSION = ".csv"
+
+    def write(
+        self,
+        file: TextIO,
+        table: EventTable
+    ) -> None:
+        writer = csv.writer(file)
+        writer.writerow(FIELDS + ("stations",))
+
+        for batch in self.batches(table):
+            writer.writerows(
+                zip(
+                    *(batch[name] for name in FIELDS),
+                    (" ".join(stations) for stations in batch["stations"])
+                )
+            )
+
+
+class JSONLinesExporter(Exporter):
+    """Одно событие - один JSON объект в строке"""
+
+    NAME = "jsonl"
+    EXTENSION = ".jsonl"
+
+    def write(
+        self,
+        file: TextIO,
+        table: EventTable
+    ) -> None:
+        names = FIELDS + ("stations",)
+
+        for batch in self.batches(table):
+            file.writelines(
+                json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n"
+                for row in zip(*(batch[name] for name in names))
+            )
+
+
+class GeoJSONExporter(Exporter):
+    """FeatureCollection из точек эпицентров со свойствами событий"""
+
+    NAME = "geojson"
+    EXTENSION = ".geojson"
+
+    def write(
+        self,
+        file: TextIO,
+        table: EventTable
+    ) -> None:
+        names = tuple(
+            name for name in FIELDS if name not in ("latitude", "longtitude")
+        ) + ("stations",)
+
+        file.write('{"type": "FeatureCollection", "features": [\n')
+
+        first = True
+        for batch in self.batches(table):
+            for latitude, longtitude, *properties in zip(
+                batch["latitude"],
+                batch["longtitude"],
+                *(batch[name] for name in names)
+            ):
+                feature = {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Point",
+                        "coordinates": [longtitude, latitude]
+                    },
+                    "properties": dict(zip(names, properties))
+                }
+
+                if not first:
+                    file.write(",\n")
+                first = False
+
+                file.write(json.dumps(feature, ensure_ascii=False))
+
+        file.write("\n]}\n")
+
+
+class ArrowExporter(Exporter):
+    """
+    Файл Arrow IPC, столбцы передаются из NumPy без преобразования
+
+    Нужен пакет pyarrow, он импортируется только при выгрузке
+    """
+
+    NAME = "arrow"
+    EXTENSION = ".arrow"
+
+    def _arrow(self):
+        try:
+            import pyarrow
+        except ImportError as error:
+            raise ImportError(
+                "Для выгрузки в {} нужен пакет pyarrow".format(self.NAME)
+            ) from error
+
+        return pyarrow
+
+    def record_batches(
+        self,
+        table: EventTable
+    ) -> Iterator:
+        pa = self._arrow()
+
+        columns = {name: table.column(name) for name in FIELDS}
+
+        # Даже пустая таблица дает один кусок, чтобы записать схему
+        for start in range(0, max(len(table), 1), self.BATCH_SIZE):
+            end = min(start + self.BATCH_SIZE, len(table))
+
+            arrays = {
+                name: pa.array(column[start:end], from_pandas=True)
+                for name, column in columns.items() if name != "time"
+            }
+
+            # Время хранится как метка времени, NO_TIME - как null
+            time = columns["time"][start:end].astype("datetime64[ms]")
+            arrays["time"] = pa.array(time, mask=np.isnat(time))
+
+            arrays["stations"] = pa.array(
+                [list(table.stations(index)) for index in range(start, end)],
+                type=pa.list_(pa.string())
+            )
+
+            yield pa.record_batch(
+                [arrays[name] for name in FIELDS + ("stations",)],
+                names=list(FIELDS + ("stations",))
+            )
+
+    def _export(
+        self,
+        filename: str,
+        table: EventTable
+    ) -> None:
+        if self.compress:
+            raise ValueError("Arrow файл нельзя сжать gzip, выберите parquet")
+
+        pa = self._arrow()
+
+        writer = None
+        try:
+            for batch in self.record_batches(table):
+                if writer is None:
+                    writer = pa.ipc.new_file(filename, batch.schema)
+
+                writer.write_batch(batch)
+        finally:
+            if writer is not None:
+                writer.close()
+
+
+class ParquetExporter(ArrowExporter):
+    """Parquet, gzip задает кодек сжатия столбцов"""
+
+    NAME = "parquet"
+    EXTENSION = ".parquet"
+
+    def _export(
+        self,
+        filename: str,
+        table: EventTable
+    ) -> None:
+        self._arrow()
+        import pyarrow.parquet
+
+        writer = None
+        try:
+            for batch in self.record_batches(table):
+                if writer is None:
+                    writer = pyarrow.parquet.ParquetWriter(
+                        filename,
+                        batch.schema,
+                        compression="gzip" if self.compress else "snappy"
+                    )
+
+                writer.write_table(pyarrow.Table.from_batches([batch]))
+        finally:
+            if writer is not None:
+                writer.close()
+
+
+EXPORTERS: Dict[str, Type[Exporter]] = {
+    exporter.NAME: exporter for exporter in (
+        CSVExporter,
+        JSONLinesExporter,
+        GeoJSONExporter,
+        ArrowExporter,
+        ParquetExporter
+    )
+}
+
+
+def guess_format(filename: str) -> Tuple[Optional[str], bool]:
+    """
+    Формат выгрузки и сжатие по имени файла: events.csv.gz -> csv, True
+
+    Для остальных файлов (например, result.txt) возвращает None -
+    такие файлы получают исходный текст событий
+    """
+    root, extension = os.path.splitext(filename.lower())
+
+    compress = extension == GZIP_SUFFIX
+    if compress:
+        extension = os.path.splitext(root)[1]
+
+    for exporter in EXPORTERS.values():
+        if exporter.EXTENSION == extension:
+            return exporter.NAME, compress
+
+    return None, False
+
+
+def export_events(
+    filename: str,
+    table: EventTable,
+    format: Optional[str]=None,
+    compress: Optional[bool]=None
+) -> None:
+    """
+    Выгружаем события в filename
+
+    Без format и compress они определяются по имени файла
+    """
+    guessed, guessed_compress = guess_format(filename)
+
+    format = format or guessed
+    if compress is None:
+        compress = guessed_compress
+
+    if format not in EXPORTERS:
+        raise ValueError("Неизвестный формат выгрузки: " + str(format))
+
+    EXPORTERS[format](compress).export(filename, table)
@@ -0,0 +1,317 @@
+import math
+import re
+
+from typing import Dict, List, Optional, Tuple, Type
+
+
+# Поля заголовка события, которые разбираются кроме даты и координат.
+# Отсутствующее значение - NaN
+HEADER_FIELDS = (
+    "depth",
+    "ndef",
+    "nsta",
+    "gap",
+    "smajor",
+    "sminor",
+    "strike",
+    "mb",
+    "ML",
+    "Ms"
+)
+
+MAGNITUDES = (b"mb", b"ML", b"Ms")
+
+# Номер поля в заголовке по названию
+FIELD_INDEX = {name: index for index, name in enumerate(HEADER_FIELDS)}
+MAGNITUDE_INDEX = {name: FIELD_INDEX[name.decode()] for name in MAGNITUDES}
+
+
+def empty_header() -> List[float]:
+    return [math.nan] * len(HEADER_FIELDS)
+
+
+def _number(text: bytes) -> float:
+    """Число из столбца, пустой столбец дает NaN"""
+    try:
+        return float(text)
+    except ValueError:
+        return math.nan
+
+
+def _set_magnitude(
+    header: List[float],
+    name: bytes,
+    value: bytes
+) -> None:
+    """Запоминаем магнитуду известного типа, первая встреченная важнее"""
+    index = MAGNITUDE_INDEX.get(name)
+
+    if index is not None:
+        if math.isnan(header[index]):
+            header[index] = _number(value)
+
+
+class REBFormat:
+    """
+    Базовый класс для правил разбора конкретного формата REB донесения
+
+    Сам разбор файла выполняет REBParser, а от формата требуется только
+    отличить заголовок таблицы события от строки с координатами и
+    достать из этой строки нужные поля
+    """
+
+    # Названия диалектов из строк BEGIN и DATA_TYPE BULLETIN
+    DIALECTS = ()
+
+    # Первое слово заголовка таблицы прихода волн
+    ARRIVALS_WORD = b"Sta"
+
+    DATE_INDEX = 0
+    TIME_INDEX = 1
+    LATITUDE_INDEX = None
+    LONGTITUDE_INDEX = None
+
+    # Столбцы строки события с полями HEADER_FIELDS
+    COLUMNS: Dict[str, slice] = dict()
+
+    def is_header(
+        self,
+        line: bytes,
+        skipped: int
+    ) -> bool:
+        """
+        Проверяем, является ли строка заголовком события
+
+        skipped - сколько непустых строк уже пропущено после EVENT
+        """
+        raise NotImplementedError
+
+    def parse_origin(
+        self,
+        line: bytes
+    ) -> Tuple[str, str, float, float]:
+        """Получаем дату, время и координаты эпицентра из строки события"""
+        fields = line.split()
+
+        return (
+            fields[self.DATE_INDEX].decode(),
+            fields[self.TIME_INDEX].decode(),
+            float(fields[self.LATITUDE_INDEX]),
+            float(fields[self.LONGTITUDE_INDEX])
+        )
+
+    def parse_header(
+        self,
+        line: bytes
+    ) -> List[float]:
+        """Получаем поля HEADER_FIELDS из строки события по столбцам"""
+        header = empty_header()
+
+        for name, column in self.COLUMNS.items():
+            header[FIELD_INDEX[name]] = _number(line[column])
+
+        return header
+
+    def parse_details(
+        self,
+        line: bytes,
+        header: List[float]
+    ) -> None:
+        """
+        Дополняем заголовок по строкам между строкой события и
+        таблицей прихода волн
+        """
+        pass
+
+
+# Зарегистрированные форматы по названию диалекта
+FORMATS: Dict[bytes, Type[REBFormat]] = dict()
+
+
+def register_format(reb_format: Type[REBFormat]) -> Type[REBFormat]:
+    """Регистрируем формат, чтобы его находил detect_format"""
+    for dialect in reb_format.DIALECTS:
+        FORMATS[dialect] = reb_format
+
+    return reb_format
+
+
+@register_format
+class OldREBFormat(REBFormat):
+    """Старый формат REB донесения (GSE2.0)"""
+
+    DIALECTS = (b"GSE2.0",)
+
+    HEADER_LINES = 2
+
+    LATITUDE_INDEX = 2
+    LONGTITUDE_INDEX = 3
+
+    COLUMNS = {
+        "depth": slice(44, 52),
+        "ndef": slice(55, 60),
+        "nsta": slice(60, 65),
+        "gap": slice(65, 69)
+    }
+
+    # Начала трех групп "тип значение число станций" с магнитудами
+    MAGNITUDE_COLUMNS = (70, 81, 92)
+    MAGNITUDE_WIDTH = 11
+
+    # Эллипс ошибок во второй строке события
+    ERROR_MARK = b"+-"
+    ERROR_COLUMNS = {
+        "smajor": slice(21, 31),
+        "sminor": slice(31, 38),
+        "strike": slice(38, 43)
+    }
+
+    def is_header(
+        self,
+        line: bytes,
+        skipped: int
+    ) -> bool:
+        """Перед координатами идут две строки с заголовками столбцов"""
+        return skipped < self.HEADER_LINES
+
+    def parse_header(
+        self,
+        line: bytes
+    ) -> List[float]:
+        """Магнитуды старого формата лежат в той же строке, что и координаты"""
+        header = super().parse_header(line)
+
+        for start in self.MAGNITUDE_COLUMNS:
+            group = line[start:start + self.MAGNITUDE_WIDTH]
+
+            _set_magnitude(header, group[:4].strip(), group[4:8])
+
+        return header
+
+    def parse_details(
+        self,
+        line: bytes,
+        header: List[float]
+    ) -> None:
+        """Эллипс ошибок берем из строки с погрешностями"""
+        if self.ERROR_MARK not in line:
+            return
+
+        for name, column in self.ERROR_COLUMNS.items():
+            index = FIELD_INDEX[name]
+
+            if math.isnan(header[index]):
+                header[index] = _number(line[column])
+
+
+@register_format
+class NewREBFormat(REBFormat):
+    """Новый формат REB донесения (IMS2.0)"""
+
+    DIALECTS = (b"IMS2.0",)
+
+    HEADER_WORD = b"Latitude"
+
+    LATITUDE_INDEX = 4
+    LONGTITUDE_INDEX = 5
+
+    COLUMNS = {
+        "smajor": slice(55, 60),
+        "sminor": slice(61, 66),
+        "strike": slice(66, 70),
+        "depth": slice(70, 76),
+        "ndef": slice(82, 87),
+        "nsta": slice(87, 92),
+        "gap": slice(92, 96)
+    }
+
+    def is_header(
+        self,
+        line: bytes,
+        skipped: int
+    ) -> bool:
+        """Заголовок столбцов содержит слово Latitude"""
+        return self.HEADER_WORD in line
+
+    def parse_details(
+        self,
+        line: bytes,
+        header: List[float]
+    ) -> None:
+        """Магнитуды нового формата перечислены в отдельной таблице"""
+        fields = line.split(None, 2)
+
+        if len(fields) >= 2:
+            _set_magnitude(header, fields[0], fields[1])
+
+
+# Сколько байт из начала файла достаточно для определения формата
+SNIFF_SIZE = 4096
+
+# Строка с интервалом времени, за который составлен бюллетень
+COVERAGE = re.compile(
+    rb"Reviewed Event Bulletin .*? from (\S+) (\S+) to (\S+) (\S+)"
+)
+
+
+def parse_coverage(
+    head: bytes
+) -> Optional[Tuple[Tuple[str, str], Tuple[str, str]]]:
+    """
+    Начало и конец интервала бюллетеня из начала файла в виде пар
+    (дата, время), None - если такой строки нет
+    """
+    match = COVERAGE.search(head)
+
+    if match is None:
+        return None
+
+    start_date, start_time, end_date, end_time = (
+        group.decode() for group in match.groups()
+    )
+
+    return (start_date, start_time), (end_date, end_time.rstrip(","))
+
+
+def _guess_by_event(line: bytes) -> Type[REBFormat]:
+    """
+    Запасной способ: в старом формате в строке EVENT только номер события,
+    а в новом еще и название региона
+    """
+    if len(line.split()) == 2:
+        return OldREBFormat
+
+    return NewREBFormat
+
+
+def detect_format(head: bytes) -> REBFormat:
+    """
+    Определяем формат по началу файла
+
+    Приоритет у строки DATA_TYPE BULLETIN, затем смотрим на BEGIN,
+    и только если диалект незнакомый, то на первую строку EVENT
+    """
+    begin_format = None
+
+    for line in head.splitlines():
+        fields = line.split()
+
+        if len(fields) >= 3 and fields[:2] == [b"DATA_TYPE", b"BULLETIN"]:
+            # Например, IMS2.0:SHORT
+            dialect = fields[2].split(b":")[0]
+            if dialect in FORMATS:
+                return FORMATS[dialect]()
+
+        elif len(fields) >= 2 and fields[0] == b"BEGIN":
+            dialect = fields[1].split(b":")[0]
+            begin_format = FORMATS.get(dialect, begin_format)
+
+        elif fields and fields[0] == b"EVENT":
+            if begin_format is None:
+                begin_format = _guess_by_event(line)
+            break
+
+    if begin_format is None:
+        return NewREBFormat()
+
+    return begin_format()
@@ -0,0 +1,778 @@
+import argparse
+import datetime
+import math
+import os
+import random
+
+from typing import List, Optional, Sequence, TextIO, Tuple
+
+from reb_archive import COMPRESSORS
+from reb_event import Event
+from reb_formats import HEADER_FIELDS
+
+
+OLD = "old"
+NEW = "new"
+MIXED = "mixed"
+
+FORMATS = (OLD, NEW, MIXED)
+
+# Станции IMS с примерными координатами: код, широта, долгота
+STATIONS: Tuple[Tuple[str, float, float], ...] = (
+    ("AKASG", 50.70, 29.22),
+    ("ANMO", 34.95, -106.46),
+    ("ARCES", 69.53, 25.51),
+    ("ASAR", -23.67, 133.90),
+    ("ATD", 11.53, 42.85),
+    ("BDFB", -15.64, -48.01),
+    ("BOSA", -28.61, 25.26),
+    ("BRTR", 39.72, 33.64),
+    ("CMAR", 18.46, 98.94),
+    ("CPUP", -26.33, -57.33),
+    ("DAVOX", 46.78, 9.88),
+    ("DBIC", 6.67, -4.86),
+    ("EIL", 29.67, 34.95),
+    ("ESDC", 39.68, -3.96),
+    ("FINES", 61.44, 26.08),
+    ("GERES", 48.85, 13.70),
+    ("HFS", 60.13, 13.70),
+    ("ILAR", 64.77, -146.89),
+    ("KEST", 35.73, 9.34),
+    ("KSRS", 37.48, 127.90),
+    ("KURK", 50.62, 78.53),
+    ("LBTB", -25.02, 25.60),
+    ("LPAZ", -16.29, -68.13),
+    ("LSZ", -15.28, 28.19),
+    ("MAW", -67.60, 62.87),
+    ("MBAR", -0.60, 30.74),
+    ("MJAR", 36.52, 138.21),
+    ("MKAR", 46.79, 82.29),
+    ("MLR", 45.49, 25.94),
+    ("NOA", 61.04, 11.21),
+    ("NVAR", 38.43, -118.30),
+    ("PDAR", 42.77, -109.56),
+    ("PLCA", -40.73, -70.55),
+    ("RPN", -27.13, -109.33),
+    ("SCHQ", 54.83, -66.83),
+    ("SNAA", -71.67, -2.84),
+    ("SPITS", 78.18, 16.37),
+    ("STKA", -31.88, 141.59),
+    ("SUR", -32.38, 20.81),
+    ("TORD", 13.75, 1.70),
+    ("TSUM", -19.20, 17.58),
+    ("TXAR", 29.33, -103.67),
+    ("ULM", 50.25, -95.88),
+    ("USRK", 44.20, 131.99),
+    ("VNDA", -77.52, 161.85),
+    ("WRA", -19.94, 134.34),
+    ("YKA", 62.49, -114.61),
+    ("ZALV", 53.95, 84.82)
+)
+
+# Сейсмически активные районы: название, широта и долгота центра
+REGIONS: Tuple[Tuple[str, float, float], ...] = (
+    ("SOUTHERN GREECE", 37.0, 22.0),
+    ("TURKEY", 39.0, 35.0),
+    ("NORTHERN ITALY", 44.5, 10.5),
+    ("SOUTHERN IRAN", 28.0, 56.0),
+    ("HINDU KUSH REGION, AFGHANISTAN", 36.5, 70.8),
+    ("SOUTHERN XINJIANG, CHINA", 39.5, 76.0),
+    ("NORTH KOREA", 41.3, 129.1),
+    ("HOKKAIDO, JAPAN REGION", 42.5, 143.0),
+    ("KURIL ISLANDS", 46.0, 151.5),
+    ("KAMCHATKA PENINSULA, RUSSIA", 53.0, 159.0),
+    ("NOVAYA ZEMLYA, RUSSIA", 73.4, 54.9),
+    ("ANDREANOF ISLANDS, ALEUTIAN IS.", 51.5, -176.0),
+    ("SOUTHERN ALASKA", 60.5, -150.0),
+    ("CENTRAL CALIFORNIA", 36.5, -121.0),
+    ("NEVADA", 38.5, -117.0),
+    ("OFF COAST OF MEXICO", 16.0, -99.0),
+    ("PERU-BRAZIL BORDER REGION", -9.0, -71.0),
+    ("NORTHERN CHILE", -21.0, -69.0),
+    ("CENTRAL EAST PACIFIC RISE", -15.0, -109.0),
+    ("ICELAND REGION", 64.0, -18.0),
+    ("CENTRAL MID-ATLANTIC RIDGE", 0.5, -25.0),
+    ("ASCENSION ISLAND REGION", -6.0, -11.5),
+    ("SOUTH SANDWICH ISLANDS REGION", -57.0, -26.0),
+    ("NORTHERN SUMATRA, INDONESIA", 3.0, 96.0),
+    ("JAVA, INDONESIA", -8.0, 110.0),
+    ("MINDANAO, PHILIPPINES", 7.0, 126.5),
+    ("NEW BRITAIN REGION, P.N.G.", -5.8, 152.0),
+    ("VANUATU ISLANDS", -16.0, 167.5),
+    ("FIJI ISLANDS REGION", -18.0, -178.0),
+    ("TONGA ISLANDS", -20.0, -174.5)
+)
+
+DEGREE_KM = 111.195
+
+
+def _distance(
+    latitude1: float,
+    longtitude1: float,
+    latitude2: float,
+    longtitude2: float
+) -> Tuple[float, float]:
+    """Расстояние в градусах дуги и азимут из первой точки на вторую"""
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    delta = math.radians(longtitude2 - longtitude1)
+
+    cosine = (
+        math.sin(phi1) * math.sin(phi2) +
+        math.cos(phi1) * math.cos(phi2) * math.cos(delta)
+    )
+    azimuth = math.atan2(
+        math.sin(delta) * math.cos(phi2),
+        math.cos(phi1) * math.sin(phi2) -
+        math.sin(phi1) * math.cos(phi2) * math.cos(delta)
+    )
+
+    return (
+        math.degrees(math.acos(max(-1.0, min(1.0, cosine)))),
+        math.degrees(azimuth) % 360
+    )
+
+
+def _phase(distance: float) -> Tuple[str, float]:
+    """Фаза первого вступления и грубое время пробега в секундах"""
+    if distance < 18:
+        return "Pn", distance * DEGREE_KM / 8.0
+
+    if distance < 100:
+        return "P", 240 + distance * 5.9
+
+    return "PKP", 1100 + distance * 0.7
+
+
+def _round(
+    moment: datetime.datetime,
+    digits: int
+) -> datetime.datetime:
+    """Округляем момент до digits знаков после запятой в секундах"""
+    step = 10 ** (6 - digits)
+
+    return moment.replace(microsecond=0) + datetime.timedelta(
+        microseconds=round(moment.microsecond / step) * step
+    )
+
+
+def _clock(
+    moment: datetime.datetime,
+    digits: int
+) -> Tuple[str, str]:
+    """Дата и время с digits знаками после запятой в секундах"""
+    moment = _round(moment, digits)
+
+    return (
+        moment.strftime("%Y/%m/%d"),
+        "{:%H:%M:%S}.{:0{}d}".format(
+            moment,
+            moment.microsecond // 10 ** (6 - digits),
+            digits
+        )
+    )
+
+
+class SyntheticEvent:
+    """Случайное событие со станциями до перевода в текст"""
+
+    def __init__(
+        self,
+        random_state: random.Random,
+        event: int,
+        moment: datetime.datetime,
+        arrivals: Tuple[int, int],
+        stations: Sequence[Tuple[str, float, float]]
+    ) -> None:
+        self.event = event
+        self.moment = moment
+
+        # Большая часть событий около активных районов, остальные
+        # равномерно по сфере
+        if random_state.random() < 0.7:
+            self.region, latitude, longtitude = random_state.choice(REGIONS)
+            latitude += random_state.gauss(0, 2)
+            longtitude += random_state.gauss(0, 2)
+        else:
+            latitude = math.degrees(math.asin(2 * random_state.random() - 1))
+            longtitude = random_state.uniform(-180, 180)
+            self.region = min(
+                REGIONS,
+                key=lambda region: _distance(
+                    latitude,
+                    longtitude,
+                    region[1],
+                    region[2]
+                )[0]
+            )[0]
+
+        self.latitude = max(-89.9, min(89.9, latitude))
+        self.longtitude = (longtitude + 180) % 360 - 180
+
+        self.fixed = random_state.random() < 0.6
+        self.depth = 0.0 if self.fixed else round(
+            min(random_state.expovariate(1 / 40), 650),
+            1
+        )
+
+        # Закон Гутенберга-Рихтера: магнитуды распределены экспоненциально
+        self.mb = round(min(3.0 + random_state.expovariate(2.3), 7.5), 1)
+        self.ML = round(self.mb - random_state.uniform(0.3, 1.0), 1) \
+            if random_state.random() < 0.3 else None
+        self.Ms = round(self.mb - random_state.uniform(0.2, 0.8), 1) \
+            if random_state.random() < 0.5 else None
+
+        self.smajor = round(random_state.uniform(5, 150), 1)
+        self.sminor = round(self.smajor * random_state.uniform(0.2, 1), 1)
+        self.strike = random_state.randrange(180)
+        self.gap = random_state.randrange(40, 330)
+
+        # Станции ближе к эпицентру видят событие чаще
+        count = min(random_state.randint(*arrivals), len(stations))
+        nearest = sorted(
+            (
+                _distance(self.latitude, self.longtitude, latitude, longtitude) +
+                (name,)
+                for name, latitude, longtitude in stations
+            ),
+            key=lambda station: station[0] + random_state.uniform(0, 60)
+        )[:count]
+
+        self.arrivals = []
+        for distance, azimuth, name in sorted(nearest):
+            phase, travel = _phase(distance)
+            self.arrivals.append((name, distance, azimuth, phase, travel))
+
+            # Часть станций видит еще и поверхностную волну
+            if distance < 100 and random_state.random() < 0.3:
+                self.arrivals.append(
+                    (name, distance, azimuth, "LR", distance * DEGREE_KM / 3.5)
+                )
+
+        self.nsta = len(nearest)
+        self.ndef = self.nsta + random_state.randint(0, 2)
+
+    def stations(self) -> Tuple[str, ...]:
+        return tuple(sorted({arrival[0] for arrival in self.arrivals}))
+
+
+class BulletinGenerator:
+    """
+    Генератор REB файлов
+
+    Файл index покрывает интервал span, начиная со start + index * span,
+    и содержит events событий. Случайность каждого файла задается seed
+    и его номером, поэтому файлы можно создавать в любом порядке
+
+    write_file возвращает события, которые парсер должен найти в файле
+    (Event без текста): по ним проверяется разбор
+    """
+
+    LINE_END = "\r\n"
+
+    def __init__(
+        self,
+        seed: int=0,
+        events: int=100,
+        arrivals: Tuple[int, int]=(5, 30),
+        start: datetime.datetime=datetime.datetime(2018, 1, 1),
+        span: datetime.timedelta=datetime.timedelta(days=1),
+        stations: Sequence[Tuple[str, float, float]]=STATIONS,
+        line_end: str=LINE_END
+    ) -> None:
+        self.seed = seed
+        self.events = events
+        self.arrivals = arrivals
+        self.start = start
+        self.span = span
+        self.stations = stations
+        self.line_end = line_end
+
+    def file_name(
+        self,
+        index: int
+    ) -> str:
+        """Имя файла по началу интервала, как у настоящих донесений"""
+        moment = self.start + index * self.span
+
+        if self.span % datetime.timedelta(days=1):
+            return moment.strftime("%Y_%m_%d_%H%M%S") + ".txt"
+
+        return moment.strftime("%Y_%m_%d") + ".txt"
+
+    def make_events(
+        self,
+        index: int,
+        random_state: random.Random
+    ) -> List[SyntheticEvent]:
+        start = self.start + index * self.span
+        span = self.span.total_seconds()
+
+        offsets = sorted(
+            random_state.uniform(0, span) for _ in range(self.events)
+        )
+
+        return [
+            SyntheticEvent(
+                random_state,
+                (index * self.events + number) % 90000000 + 10000000,
+                start + datetime.timedelta(
+                    seconds=round(offset, 2)
+                ),
+                self.arrivals,
+                self.stations
+            ) for number, offset in enumerate(offsets)
+        ]
+
+    def write_file(
+        self,
+        path: str,
+        index: int,
+        reb_format: str=NEW
+    ) -> List[Event]:
+        """
+        Пишем файл index в path, сжимая его, если path заканчивается
+        на .gz, .bz2 или .xz
+        """
+        random_state = random.Random("{}/{}".format(self.seed, index))
+        events = self.make_events(index, random_state)
+
+        compressor = COMPRESSORS.get(os.path.splitext(path)[1])
+
+        if compressor is None:
+            file = open(path, "w", encoding="ascii", newline="")
+        else:
+            file = compressor(path, "wt", encoding="ascii", newline="")
+
+        write = NewBulletin if reb_format == NEW else OldBulletin
+
+        with file:
+            write(file, self.line_end, random_state).write(
+                self.start + index * self.span,
+                self.span,
+                events
+            )
+
+        return [self._expected(event, reb_format) for event in events]
+
+    def _expected(
+        self,
+        event: SyntheticEvent,
+        reb_format: str
+    ) -> Event:
+        """Событие таким, каким его разберет REBParser"""
+        date, time = _clock(event.moment, 2 if reb_format == NEW else 1)
+        header = dict(
+            depth=event.depth,
+            ndef=event.ndef,
+            nsta=event.nsta,
+            gap=event.gap,
+            smajor=event.smajor,
+            sminor=event.sminor,
+            strike=event.strike,
+            mb=event.mb,
+            ML=event.ML,
+            Ms=event.Ms
+        )
+
+        return Event(
+            None,
+            float("{:.{}f}".format(
+                event.latitude,
+                3 if reb_format == NEW else 4
+            )),
+            float("{:.4f}".format(event.longtitude)),
+            event=str(event.event),
+            date=date,
+            time=time,
+            header=tuple(
+                math.nan if header[name] is None else float(header[name])
+                for name in HEADER_FIELDS
+            ),
+            stations=event.stations()
+        )
+
+
+class Bulletin:
+    """Текст одного донесения: заголовок сообщения, события и STOP"""
+
+    DIALECT = None
+
+    def __init__(
+        self,
+        file: TextIO,
+        line_end: str,
+        random_state: random.Random
+    ) -> None:
+        self.file = file
+        self.line_end = line_end
+        self.random = random_state
+
+    def lines(
+        self,
+        lines: List[str]
+    ) -> None:
+        self.file.write(self.line_end.join(lines) + self.line_end)
+
+    def write(
+        self,
+        start: datetime.datetime,
+        span: datetime.timedelta,
+        events: List[SyntheticEvent]
+    ) -> None:
+        self.lines(self.message_header(start, start + span))
+
+        for event in events:
+            # События разделены тремя пустыми строками
+            self.lines(self.event_lines(event) + ["", "", ""])
+
+        self.lines(["STOP"])
+
+    def message_header(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime
+    ) -> List[str]:
+        return [
+            "BEGIN " + self.DIALECT,
+            "MSG_TYPE DATA",
+            "MSG_ID {} CTBT_IDC".format(self.random.randrange(10 ** 7, 10 ** 8)),
+            "REF_ID reb_synthetic",
+            "DATA_TYPE BULLETIN " + self.DIALECT,
+            "Reviewed Event Bulletin of the CTBT_IDC from {} to {},  "
+            "generated {}".format(
+                start.strftime("%Y/%m/%d %H:%M:%S"),
+                end.strftime("%Y/%m/%d %H:%M:%S"),
+                (end + datetime.timedelta(days=17)).strftime(
+                    "%Y/%m/%d %H:%M:%S"
+                )
+            )
+        ]
+
+    def event_lines(
+        self,
+        event: SyntheticEvent
+    ) -> List[str]:
+        raise NotImplementedError
+
+    def arrival_times(
+        self,
+        event: SyntheticEvent
+    ) -> List[Tuple[tuple, datetime.datetime]]:
+        return [
+            (
+                arrival,
+                event.moment + datetime.timedelta(
+                    seconds=arrival[4] + self.random.gauss(0, 1)
+                )
+            ) for arrival in event.arrivals
+        ]
+
+
+class OldBulletin(Bulletin):
+    """Донесение GSE2.0: магнитуды в строке события, дата у каждой волны"""
+
+    DIALECT = "GSE2.0"
+
+    def event_lines(
+        self,
+        event: SyntheticEvent
+    ) -> List[str]:
+        magnitudes = "".join(
+            " {:<3}{:>3.1f}{:>3d} ".format(name, value, self.random.randint(1, 30))
+            for name, value in (("mb", event.mb), ("ML", event.ML), ("Ms", event.Ms))
+            if value is not None
+        )
+
+        lines = [
+            "EVENT {:>8d}".format(event.event),
+            "   Date       Time       Latitude Longitude    Depth    Ndef "
+            "Nsta Gap    Mag1  N    Mag2  N    Mag3  N  Author          ID",
+            "       rms   OT_Error      Smajor Sminor Az        Err   mdist "
+            " Mdist     Err        Err        Err     Quality",
+            "",
+            "{} {}{:>12.4f}{:>10.4f}{:>9.1f} {}{:>6d}{:>5d}{:>4d} {:<33}"
+            "  IDC_REB   {:>8d}".format(
+                *_clock(event.moment, 1),
+                event.latitude,
+                event.longtitude,
+                event.depth,
+                "f" if event.fixed else " ",
+                event.ndef,
+                event.nsta,
+                event.gap,
+                magnitudes,
+                event.event
+            ),
+            "{:>10.2f}   +-{:>6.2f}{:>10.1f}{:>7.1f}{:>5d}{:>21.2f}{:>7.2f}"
+            "   +-{:.1f}                           m i uk".format(
+                self.random.uniform(0.2, 1.5),
+                self.random.uniform(0.5, 9),
+                event.smajor,
+                event.sminor,
+                event.strike,
+                event.arrivals[0][1],
+                event.arrivals[-1][1],
+                self.random.uniform(0.1, 0.5)
+            ),
+            "",
+            event.region,
+            "Sta    Dist   EvAz     Phase       Date      Time     TRes  Azim "
+            " AzRes  Slow  SRes Def  SNR        Amp   Per   Mag1   Mag2 Arr ID"
+        ]
+
+        for (name, distance, azimuth, phase, _), moment in \
+                self.arrival_times(event):
+            magnitude = "mb {:.1f}".format(event.mb) if phase == "P" else ""
+
+            lines.append(
+                "{:<5}{:>7.2f}{:>6.1f} {}   {:<7} {} {}{:>6.1f}{:>6.1f}{:>7.1f}"
+                "{:>6.1f}{:>6.1f} {:<4}{:>5.1f}{:>10.1f}{:>6.2f} {:<6} {:<6}"
+                "{:>9d}".format(
+                    name,
+                    distance,
+                    azimuth,
+                    self.random.choice("am"),
+                    phase,
+                    *_clock(moment, 1),
+                    self.random.gauss(0, 1),
+                    (azimuth + 180) % 360,
+                    self.random.gauss(0, 10),
+                    self.random.uniform(4, 20),
+                    self.random.gauss(0, 1),
+                    "TAS" if phase != "LR" else "",
+                    self.random.uniform(2, 30),
+                    self.random.uniform(0.1, 20),
+                    self.random.uniform(0.3, 1.2),
+                    magnitude,
+                    magnitude,
+                    self.random.randrange(10 ** 7, 10 ** 8)
+                )
+            )
+
+        return lines
+
+
+class NewBulletin(Bulletin):
+    """Донесение IMS2.0: отдельная таблица магнитуд, у волн только время"""
+
+    DIALECT = "IMS2.0"
+
+    def message_header(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime
+    ) -> List[str]:
+        lines = super().message_header(start, end)
+        lines[4] += ":SHORT"
+
+        return lines
+
+    def event_lines(
+        self,
+        event: SyntheticEvent
+    ) -> List[str]:
+        lines = [
+            "EVENT {:>9d} {}".format(event.event, event.region),
+            "   Date       Time        Err   RMS Latitude Longitude  Smaj "
+            " Smin  Az Depth   Err Ndef Nsta Gap  mdist  Mdist Qual   "
+            "Author      OrigID",
+            "{} {}{:>7.2f}{:>6.2f}{:>9.3f}{:>10.4f}{:>6.1f}{:>6.1f}{:>4d}"
+            "{:>6.1f}{}{:>5}{:>5d}{:>5d}{:>4d}{:>7.2f}{:>7.2f} m i uk "
+            "IDC_REB  {:>9d}".format(
+                *_clock(event.moment, 2),
+                self.random.uniform(0.2, 3),
+                self.random.uniform(0.2, 1.5),
+                event.latitude,
+                event.longtitude,
+                event.smajor,
+                event.sminor,
+                event.strike,
+                event.depth,
+                "f" if event.fixed else " ",
+                "" if event.fixed else "{:.1f}".format(
+                    self.random.uniform(1, 20)
+                ),
+                event.ndef,
+                event.nsta,
+                event.gap,
+                event.arrivals[0][1],
+                event.arrivals[-1][1],
+                event.event
+            ),
+            "",
+            "Magnitude  Err Nsta Author      OrigID"
+        ]
+
+        for name, value in (("ML", event.ML), ("mb", event.mb), ("Ms", event.Ms)):
+            if value is not None:
+                lines.append(
+                    "{:<5}{:>5.1f}{:>4.1f}{:>5d} IDC_REB  {:>9d}".format(
+                        name,
+                        value,
+                        self.random.uniform(0, 0.4),
+                        self.random.randint(1, 30),
+                        event.event
+                    )
+                )
+
+        lines.extend([
+            "",
+            "Sta     Dist  EvAz Phase        Time      TRes  Azim AzRes   "
+            "Slow   SRes Def   SNR       Amp   Per Qual Magnitude    ArrID"
+        ])
+
+        for (name, distance, azimuth, phase, _), moment in \
+                self.arrival_times(event):
+            amplitude = self.random.uniform(0.1, 20)
+            period = self.random.uniform(0.3, 1.2)
+
+            lines.append(
+                "{:<5}{:>7.2f}{:>6.1f} {:<8} {}{:>6.1f}{:>6.1f}{:>6.1f}{:>7.1f}"
+                "{:>7.1f} {:<3}{:>6.1f}{:>10.1f}{:>6.2f} a__ {:<5}{:>5} "
+                "{:>9d}".format(
+                    name,
+                    distance,
+                    azimuth,
+                    phase,
+                    _clock(moment, 3)[1],
+                    self.random.gauss(0, 1),
+                    (azimuth + 180) % 360,
+                    self.random.gauss(0, 10),
+                    self.random.uniform(4, 20),
+                    self.random.gauss(0, 1),
+                    "T__" if phase != "LR" else "___",
+                    self.random.uniform(2, 30),
+                    amplitude,
+                    period,
+                    "mbtmp" if phase == "P" else "",
+                    "{:.1f}".format(event.mb) if phase == "P" else "",
+                    self.random.randrange(10 ** 8, 10 ** 9)
+                )
+            )
+
+            # Вторая магнитуда волны - строка-продолжение с пробела
+            if phase == "P":
+                lines.append(
+                    "{:>93.1f}{:>6.2f}     mb     {:.1f} ".format(
+                        amplitude,
+                        period,
+                        event.mb
+                    )
+                )
+
+        return lines
+
+
+def generate_corpus(
+    directory: str,
+    files: int,
+    generator: BulletinGenerator,
+    reb_format: str=MIXED,
+    files_per_directory: int=1000,
+    compress: Optional[str]=None
+) -> List[str]:
+    """
+    Создаем files файлов в папках directory/0000, directory/0001, ...
+    по files_per_directory в каждой
+
+    reb_format - old, new или mixed (форматы чередуются),
+    compress - расширение сжатия из COMPRESSORS, например .gz.
+    Возвращает пути созданных файлов
+    """
+    paths = []
+
+    for index in range(files):
+        folder = os.path.join(
+            directory,
+            "{:04d}".format(index // files_per_directory)
+        )
+        if index % files_per_directory == 0:
+            os.makedirs(folder, exist_ok=True)
+
+        path = os.path.join(
+            folder,
+            generator.file_name(index) + (compress or "")
+        )
+
+        if reb_format == MIXED:
+            current_format = (NEW, OLD)[index % 2]
+        else:
+            current_format = reb_format
+
+        generator.write_file(path, index, current_format)
+        paths.append(path)
+
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Генератор синтетических REB донесений"
+    )
+
+    parser.add_argument("directory", help="Папка для донесений")
+    parser.add_argument(
+        "--files",
+        type=int,
+        default=10,
+        help="Количество файлов"
+    )
+    parser.add_argument(
+        "--events",
+        type=int,
+        default=100,
+        help="Событий в файле"
+    )
+    parser.add_argument(
+        "--arrivals",
+        type=int,
+        nargs=2,
+        default=(5, 30),
+        metavar=("MIN", "MAX"),
+        help="Сколько станций видит событие"
+    )
+    parser.add_argument(
+        "--format",
+        dest="reb_format",
+        choices=FORMATS,
+        default=MIXED,
+        help="Формат донесений, mixed - чередовать старый и новый"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Начальное значение генератора случайных чисел"
+    )
+    parser.add_argument(
+        "--files-per-directory",
+        dest="files_per_directory",
+        type=int,
+        default=1000,
+        help="Сколько файлов класть в одну папку"
+    )
+    parser.add_argument(
+        "--compress",
+        choices=tuple(COMPRESSORS),
+        help="Сжимать файлы"
+    )
+
+    argv = parser.parse_args()
+
+    paths = generate_corpus(
+        argv.directory,
+        argv.files,
+        BulletinGenerator(argv.seed, argv.events, tuple(argv.arrivals)),
+        argv.reb_format,
+        argv.files_per_directory,
+        argv.compress
+    )
+
+    print("Создано файлов: {}, событий: {}".format(
+        len(paths),
+        len(paths) * argv.events
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,176 @@
+import mmap
 import os
+import time
+import zipfile
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from figures import Figure
-from typing import List
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 from station import Station
+from reb_archive import (
+    close_ranges,
+    is_compressed,
+    inner_name,
+    list_sources,
+    open_source
+)
 from reb_event import Event
+from event_table import EventTable, to_epoch_ms
+from reb_formats import SNIFF_SIZE, detect_format, parse_coverage
+from reb_parser import REBParser
+from reb_query import HEADER, ORIGIN, Predicate, Query, make_query
+from reb_catalog import REBCatalog
+from reb_writer import EventWriter
+from station_index import StationFilter
+from progress import Progress, file_size
+from run_metrics import (
+    BYTES,
+    ERRORS,
+    EVENTS_ACCEPTED,
+    EVENTS_SEEN,
+    FILES,
+    FILTER,
+    PARSE,
+    RunMetrics,
+    SKIPPED,
+    SNIFF,
+    WALK,
+    WRITE
+)
+
+
+def _add_filter_time(
+    metrics: RunMetrics,
+    parser: REBParser
+) -> None:
+    """
+    Переносим время проверки условий из разбора в этап FILTER
+
+    Условия проверяются внутри REBParser.scan, то есть во время этапа
+    PARSE, поэтому их время вычитается из PARSE
+    """
+    wall, cpu, checks = parser.filter_time
+
+    if checks:
+        metrics.add(PARSE, -wall, -cpu, 0)
+        metrics.add(FILTER, wall, cpu, checks)
+
+    metrics.count(EVENTS_SEEN, parser.seen)
+
+
+def parse_file(
+    filepath: str,
+    query: Query,
+    mapped: bool=False,
+    metrics: Optional[RunMetrics]=None
+) -> List[Event]:
+    """
+    Определяем формат файла и разбираем его целиком
+
+    mapped - отобразить файл в память и перескакивать между событиями
+    поиском по байтам (пустой файл так отобразить нельзя)
+
+    Сжатые файлы и члены zip архива (см. reb_archive) разбираются
+    построчно, пока следующий кусок распаковывается в фоновом потоке
+
+    metrics - куда добавить время определения формата, разбора и
+    проверки условий и число встреченных событий
+    """
+    timed = metrics is not None
+    metrics = metrics or RunMetrics()
+
+    if mapped and not is_compressed(filepath):
+        with open(filepath, "rb") as file:
+            if os.fstat(file.fileno()).st_size > 0:
+                with mmap.mmap(
+                    file.fileno(),
+                    0,
+                    access=mmap.ACCESS_READ
+                ) as data:
+                    with metrics.stage(SNIFF):
+                        parser = REBParser(
+                            detect_format(data[:SNIFF_SIZE]),
+                            query,
+                            timed
+                        )
+
+                    with metrics.stage(PARSE):
+                        events = list(parser.parse_mapped(data, filepath))
+
+                    _add_filter_time(metrics, parser)
+
+                    return events
+
+    with open_source(filepath, prefetch=True) as file:
+        # Формат определяем по началу файла, которое уже лежит в буфере,
+        # так что файл читается только один раз
+        with metrics.stage(SNIFF):
+            reb_format = detect_format(file.peek(SNIFF_SIZE)[:SNIFF_SIZE])
+
+        parser = REBParser(
+            reb_format,
+            query,
+            timed
+        )
+
+        with metrics.stage(PARSE):
+            events = list(parser.parse(file, filepath))
+
+        _add_filter_time(metrics, parser)
+
+        return events
+
+
+def _scan_file(
+    filepath: str,
+    query: Query,
+    mapped: bool
+) -> Tuple[List[tuple], dict]:
+    """
+    Разбор файла в дочернем процессе
+
+    Назад передаем только компактные записи без пути к файлу,
+    он и так известен родительскому процессу, и замеры разбора
+    """
+    metrics = RunMetrics()
+
+    records = [
+        event.to_record() for event in parse_file(
+            filepath,
+            query,
+            mapped,
+            metrics
+        )
+    ]
+
+    return records, metrics.snapshot()
 
 
 class REBOptions:
-    """Клас для выборки данных"""
+    """
+    Клас для выборки данных
+
+    station_mode и min_stations задают, сколько из выбранных станций
+    должны были зарегистрировать событие (см. StationFilter)
+
+    progress - ход обработки, через него же обработку можно отменить
+
+    time_window - интервал [начало, конец) в миллисекундах от 1970 года
+    (см. to_epoch_ms). Файлы, бюллетень которых не пересекается с ним,
+    пропускаются по строке заголовка без разбора событий, а из остальных
+    остаются только события, произошедшие внутри интервала
+
+    predicates - дополнительные условия, например HeaderRange по магнитуде.
+    Вместе с фигурой, интервалом и станциями они собираются в запрос
+    Query, который проверяется и при разборе, и при выборке из каталога
 
-    START_WORD = "EVENT"
-    STOP_WORD = "STOP"
+    mapped - разбирать файлы, отображая их в память (см. parse_file)
 
-    EMPTY_LINES = 3
-    COORDS_COUNT = 2
+    metrics - время этапов и счетчики запуска (см. RunMetrics). Запуск
+    начинается в iter_events, если вызывающий не начал его раньше, чтобы
+    включить в замер запись результата, и заканчивается вызовом finish
+    """
 
     def __init__(
         self,
@@ -21,290 +178,355 @@ class REBOptions:
         root_directory: str,
         stations: List[Station],
         range_name: str=None,
-        result: str="result.txt"
+        result: str="result.txt",
+        workers: int=1,
+        catalog: str=None,
+        station_mode: str=StationFilter.ANY,
+        min_stations: int=1,
+        progress: Optional[Progress]=None,
+        time_window: Optional[Tuple[int, int]]=None,
+        mapped: bool=False,
+        predicates: Sequence[Predicate]=(),
+        metrics: Optional[RunMetrics]=None
     ) -> None:
         self.figure = figure
         self.root_directory = root_directory
         self.stations = stations
         self.range_name = range_name
         self.result = result
+        self.workers = workers
+        self.catalog = catalog
+        self.station_filter = StationFilter(
+            [station.name for station in self.stations],
+            station_mode,
+            min_stations
+        )
+        self.progress = progress or Progress()
+        self.time_window = time_window
+        self.mapped = mapped
+        self.metrics = metrics or RunMetrics()
+        self.query = make_query(
+            figure,
+            self.station_filter,
+            time_window,
+            predicates
+        )
+
+        self._valid_events = EventTable()
+
+    def get_events(self) -> EventTable:
+        return self._valid_events
 
-        self._valid_events = list()
+    def _collect_files(self) -> List[str]:
+        """
+        Собираем подходящие файлы в детерминированном порядке
 
-    def get_events(self) -> List[Event]:
-        return self._valid_events
+        Сжатый файл подходит, если подходит его имя без расширения сжатия,
+        а из zip архива берутся подходящие файлы внутри него
+        """
+        collected = []
 
-    def _check_if_name_in_stations(
-        self,
-        name: str
-    ) -> bool:
-        """Проверяем, есть ли данное имя в списке станций"""
-        for station in self.stations:
-            if name == station.name:
-                return True
-        return False
+        # Пробегаемся по всем папкам в директории
+        for (dirname, dirnames, files) in os.walk(self.root_directory):
+            # Обходим папки и файлы в алфавитном порядке, чтобы результат
+            # не зависел от файловой системы
+            dirnames.sort()
 
-    def _check_old_reb(
+            # Игнорируем файлы из текущей папки
+            if dirname == ".":
+                continue
+
+            for filename in sorted(files):
+                try:
+                    sources = list_sources(os.path.join(dirname, filename))
+                except (OSError, zipfile.BadZipFile):
+                    print(
+                        os.path.join(dirname, filename) +
+                        " - возникла ошибка при обработке!!!"
+                    )
+                    self.metrics.count(ERRORS)
+                    continue
+
+                for current_file in sources:
+                    name = inner_name(current_file)
+
+                    if "txt" in name and "ims" not in name:
+                        collected.append(current_file)
+                    else:
+                        print(current_file + " - НЕ обработан")
+                        self.metrics.count(SKIPPED)
+
+        return collected
+
+    def _overlaps_window(
         self,
         filepath: str
     ) -> bool:
-        """Проверяем, формат REB донесения в файле"""
-        with open(filepath, "r") as file:
-            for line in file.readlines():
-                if self.START_WORD in line:
-                    if len(line.split()) == 2:
-                        return True
-                    else:
-                        return False
+        """
+        Пересекается ли бюллетень файла с интервалом time_window
+
+        Читается только начало файла, файл без строки с интервалом
+        на всякий случай обрабатывается
+        """
+        with open_source(filepath) as file:
+            coverage = parse_coverage(file.read(SNIFF_SIZE))
+
+        if coverage is None:
+            return True
 
-    def _process_old_reb(
+        start, end = self.time_window
+
+        return (
+            to_epoch_ms(*coverage[0]) < end and
+            to_epoch_ms(*coverage[1]) > start
+        )
+
+    def _prune_files(
         self,
-        current_file: str
-    ) -> List[Event]:
-        """Набор правил, по которым разбираем старый REB текстовик"""
-        start = False
-        empty = 0
-        valid_events = []
-        current_data = ""
-        current_lat = None
-        current_long = None
-        location = False
-        loc_count = self.COORDS_COUNT
-        valid_stations = []
-
-        with open(current_file, "r") as file:
-            for line in file.readlines():
-                # Когда отрезок уже найден
-                if start:
-                    # Отсекаем косячные события без данных
-                    if self.START_WORD in line:
-                        start = True
-                        current_data = line
-                        location = False
-                        loc_count = self.COORDS_COUNT
-                        valid_stations = []
-                        continue
-
-                    # Если нашли STOP, то заканчиваем
-                    if self.STOP_WORD in line:
-                        current_data += "\n\n"
-                        if valid_stations:
-                            valid_events.append(
-                                Event(
-                                    current_data,
-                                    current_lat,
-                                    current_long
-                                )
-                            )
-                        current_data = ""
-                        current_lat = None
-                        current_long = None
-                        break
-
-                    current_data += line
-
-                    # Если строка пустая, то ищем конец
-                    # if not line:  # Для пустой строки без знака переноса
-                    if len(line) == 1 or len(line) == 2:  # Для строк с одним переносом
-                        empty += 1
-
-                        # Если нашли 3 пустых строки, то заканчиваем считывание
-                        if empty == self.EMPTY_LINES:
-                            empty = 0
-                            start = False
-                            if valid_stations:  # Если хотим, чтобы событие видели все станции
-                            # if not a:  # Если хотим чтобы видна была хотя бы одна станция
-                                valid_events.append(
-                                    Event(
-                                        current_data,
-                                        current_lat,
-                                        current_long
-                                    )
-                                )
-
-                            current_data = ""
-                            current_lat = None
-                            current_long = None
-
-                        continue
-
-                    # Если строка непустая, то обрабатываем
-                    else:
-                        empty = 0
-
-                        if not location:
-                            if loc_count == 0:
-                                location = True
-
-                                latitude = float(line.split()[2])
-                                longtitude = float(line.split()[3])
-
-                                # Если событие не попало, то просто пропускаем его
-                                if not self.figure.check_inside(
-                                    latitude,
-                                    longtitude
-                                ):
-                                    start = False
-                                    current_data = ""
-                                else:
-                                    current_lat = latitude
-                                    current_long = longtitude
-
-                            else:
-                                loc_count -= 1
-
-                        else:
-                            # Проверяем нужные нам станции
-                            current_station = line.split()[0]
-                            if self._check_if_name_in_stations(current_station):
-                                valid_stations.append(current_station)
-
-                # Если нашли начало отрезка, то начинаем считывать инфу
-                elif self.START_WORD in line:
-                    start = True
-                    current_data = line
-                    current_lat = None
-                    current_long = None
-                    location = False
-                    loc_count = self.COORDS_COUNT
-                    valid_stations = []
-
-        return valid_events
-
-    def _process_new_reb(
+        files: List[str]
+    ) -> List[str]:
+        """Отбрасываем файлы вне интервала time_window"""
+        pruned = []
+
+        for current_file in files:
+            try:
+                overlaps = self._overlaps_window(current_file)
+            except (OSError, ValueError):
+                overlaps = True
+
+            if overlaps:
+                pruned.append(current_file)
+            else:
+                print(current_file + " - вне интервала времени")
+                self.metrics.count(SKIPPED)
+
+        return pruned
+
+    def _iter_serial(
         self,
-        current_file: str
-    ) -> List[Event]:
-        """Набор правил, по которым разбираем новый REB текстовик"""
-        start = False
-        empty = 0
-        valid_events = []
-        current_data = ""
-        current_lat = None
-        current_long = None
-        location = False
-        valid_stations = []
-
-        with open(current_file, "r") as file:
-            for line in file.readlines():
-                # Когда отрезок уже найден
-                if start:
-                    # Отсекаем косячные события без данных
-                    if self.START_WORD in line:
-                        start = True
-                        current_data = line
-                        location = False
-                        valid_stations = []
-                        continue
-
-                    # Если нашли STOP, то заканчиваем
-                    if self.STOP_WORD in line:
-                        current_data += "\n\n"
-                        if valid_stations:
-                            valid_events.append(
-                                Event(
-                                    current_data,
-                                    current_lat,
-                                    current_long
-                                )
-                            )
-                        current_data = ""
-                        current_lat = None
-                        current_long = None
-                        break
-
-                    current_data += line
-
-                    # Если строка пустая, то ищем конец
-                    # if not line:  # Для пустой строки без знака переноса
-                    if len(line) == 1 or len(line) == 2:  # Для строк с одним переносом
-                        empty += 1
-
-                        # Если нашли 3 пустых строки, то заканчиваем считывание
-                        if empty == self.EMPTY_LINES:
-                            empty = 0
-                            start = False
-                            if valid_stations:  # Если хотим, чтобы событие видели все станции
-                            # if not a:  # Если хотим чтобы видна была хотя бы одна станция
-                                valid_events.append(
-                                    Event(
-                                        current_data,
-                                        current_lat,
-                                        current_long
-                                    )
-                                )
-
-                            current_data = ""
-                            current_lat = None
-                            current_long = None
-
-                        continue
-
-                    # Если строка непустая, то обрабатываем
-                    else:
-                        empty = 0
-
-                        if not location:
-                            if "Latitude" in line:
-                                continue
-
-                            location = True
-
-                            latitude = float(line.split()[4])
-                            longtitude = float(line.split()[5])
-
-                            # Если событие не попало, то просто пропускаем его
-                            if not self.figure.check_inside(
-                                latitude,
-                                longtitude
-                            ):
-                                start = False
-                                current_data = ""
-                            else:
-                                current_lat = latitude
-                                current_long = longtitude
-
-                        else:
-                            # Проверяем нужные нам станции
-                            current_station = line.split()[0]
-                            if self._check_if_name_in_stations(current_station):
-                                valid_stations.append(current_station)
-
-                # Если нашли начало отрезка, то начинаем считывать инфу
-                elif self.START_WORD in line:
-                    start = True
-                    current_data = line
-                    current_lat = None
-                    current_long = None
-                    location = False
-                    valid_stations = []
-
-        return valid_events
-
-    def _process_file(self, filepath: str) -> None:
-        """Определяем формат файла и обрабатываем его"""
-        if self._check_old_reb(filepath):
-            self._valid_events += self._process_old_reb(filepath)
+        files: List[str]
+    ) -> Iterator[Event]:
+        """Обрабатываем файлы по очереди в текущем процессе"""
+        for current_file in files:
+            if self.progress.cancelled:
+                break
+
+            # События отдаем только после разбора всего файла,
+            # чтобы ошибка не оставляла половину событий
+            try:
+                events = parse_file(
+                    current_file,
+                    self.query,
+                    self.mapped,
+                    self.metrics
+                )
+
+                print(current_file + " - обработан")
+            except:
+                events = []
+                print(current_file + " - возникла ошибка при обработке!!!")
+                self.metrics.count(ERRORS)
+
+            self._advance(current_file, len(events))
+
+            yield from events
+
+    def _advance(
+        self,
+        filepath: str,
+        events: int
+    ) -> None:
+        """Отмечаем обработанный файл в ходе обработки и в счетчиках"""
+        size = file_size(filepath)
+
+        self.progress.advance(size, events)
+
+        self.metrics.count(FILES)
+        self.metrics.count(BYTES, size)
+        self.metrics.count(EVENTS_ACCEPTED, events)
+
+    def _iter_parallel(
+        self,
+        files: List[str]
+    ) -> Iterator[Event]:
+        """
+        Обрабатываем файлы в пуле процессов
+
+        Крупные файлы отдаем первыми, чтобы они не задерживали окончание
+        обработки. События отдаются в том же порядке, что и при
+        последовательной обработке: результат файла ждет, пока не будут
+        отданы все предыдущие
+        """
+        order = sorted(
+            range(len(files)),
+            key=lambda i: file_size(files[i]),
+            reverse=True
+        )
+
+        # Готовые, но еще не отданные результаты
+        ready: Dict[int, List[tuple]] = dict()
+        next_file = 0
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(
+                    _scan_file,
+                    files[i],
+                    self.query,
+                    self.mapped
+                ): i for i in order
+            }
+
+            for future in as_completed(futures):
+                i = futures[future]
+
+                try:
+                    ready[i], snapshot = future.result()
+                    self.metrics.merge(snapshot)
+
+                    print(files[i] + " - обработан")
+                except:
+                    ready[i] = []
+                    print(files[i] + " - возникла ошибка при обработке!!!")
+                    self.metrics.count(ERRORS)
+
+                self._advance(files[i], len(ready[i]))
+
+                # Ждем только уже запущенные файлы, остальные снимаем
+                if self.progress.cancelled:
+                    executor.shutdown(cancel_futures=True)
+                    break
+
+                while next_file in ready:
+                    yield from self._from_records(
+                        files[next_file],
+                        ready.pop(next_file)
+                    )
+                    next_file += 1
+
+        # После отмены отдаем то, что успели разобрать
+        for i in sorted(ready):
+            yield from self._from_records(files[i], ready[i])
+
+    def _from_records(
+        self,
+        source: str,
+        records: List[tuple]
+    ) -> Iterator[Event]:
+        for record in records:
+            yield Event.from_record(source, record)
+
+    def _iter_catalog(
+        self,
+        files: List[str]
+    ) -> Iterator[Event]:
+        """
+        Обновляем каталог событий и делаем выборку по нему вместо
+        разбора всех файлов
+        """
+        with REBCatalog(self.catalog) as catalog:
+            # Разбор здесь - переиндексирование изменившихся файлов
+            with self.metrics.stage(PARSE):
+                catalog.update(files, self.workers, self.progress)
+
+            self.metrics.count(FILES, self.progress.files_done)
+            self.metrics.count(BYTES, self.progress.bytes_done)
+
+            if self.progress.cancelled:
+                return
+
+            with self.metrics.stage(FILTER):
+                events = catalog.query(self.query)
+
+            self.metrics.count(EVENTS_SEEN, catalog.count_events())
+
+        self.progress.add_events(len(events))
+        self.metrics.count(EVENTS_ACCEPTED, len(events))
+
+        yield from events
+
+    def iter_events(self) -> Iterator[Event]:
+        """
+        Пробегаемся по папкам и отдаем подходящие события по мере разбора
+
+        В памяти держатся только события текущего файла (в пуле
+        процессов - еще и файлов, обогнавших очередь), поэтому вместе
+        с EventWriter результат любого размера пишется в файл сразу
+        """
+        if not self.metrics.running:
+            self.metrics.start()
+
+        # Файлы могли измениться с прошлого запуска
+        close_ranges()
+
+        with self.metrics.stage(WALK):
+            files = self._collect_files()
+
+        if self.time_window is not None:
+            with self.metrics.stage(SNIFF):
+                files = self._prune_files(files)
+
+        self.progress.start(files)
+
+        if self.catalog:
+            mode = "catalog"
+            events = self._iter_catalog(files)
+        elif self.workers > 1 and len(files) > 1:
+            mode = "parallel"
+            events = self._iter_parallel(files)
         else:
-            self._valid_events += self._process_new_reb(filepath)
+            mode = "serial"
+            events = self._iter_serial(files)
+
+        self.metrics.details.update(
+            mode=mode,
+            workers=self.workers,
+            mapped=self.mapped,
+            root_directory=self.root_directory
+        )
+
+        yield from events
+
+        # Дочерние процессы проверяют свои копии условий, их счетчики
+        # сюда не возвращаются. Станции сверяет сам REBParser
+        if mode == "parallel":
+            return
+
+        self.metrics.details["query"] = [
+            {
+                "stage": stage,
+                "predicate": type(predicate).__name__,
+                "checked": predicate.checked,
+                "passed": predicate.passed
+            }
+            for stage in (ORIGIN, HEADER)
+            for predicate in self.query.stages[stage]
+        ]
+
+    def process_directories(
+        self,
+        writer: Optional[EventWriter]=None
+    ) -> None:
+        """
+        Собираем все события в таблицу для get_events
 
-    def process_directories(self) -> None:
-        """Пробегается по папкам и обрабатывает каждую"""
-        # Пробегаемся по всем папкам в директории
-        for (dirname, _, files) in os.walk(self.root_directory):
-            # Игнорируем файлы из текущей папки
-            if dirname == ".":
-                continue
+        writer - дописывать каждое событие в файл, как только оно найдено
+        """
+        self._valid_events = EventTable()
+
+        # Запись одного события слишком коротка для отдельного замера,
+        # время копится здесь и попадает в WRITE один раз
+        wall = cpu = 0.0
 
-            for filename in files:
-                current_file = os.path.join(dirname, filename)
+        for event in self.iter_events():
+            self._valid_events.append(event)
 
-                if "txt" in current_file and "ims" not in current_file:
-                    try:
-                        self._process_file(current_file)
+            if writer is not None:
+                start = time.perf_counter()
+                cpu_start = time.thread_time()
+                writer.write(event)
+                cpu += time.thread_time() - cpu_start
+                wall += time.perf_counter() - start
 
-                        print(current_file + " - обработан")
-                    except:
-                        print(current_file + " - возникла ошибка при обработке!!!")
-                else:
-                    print(current_file + " - НЕ обработан")
+        if writer is not None:
+            self.metrics.add(WRITE, wall, cpu, len(self._valid_events))
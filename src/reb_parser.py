@@ -0,0 +1,359 @@
+import mmap
+import time
+
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple
+
+from reb_event import Event
+from reb_formats import REBFormat
+from reb_query import HEADER, ORIGIN, Query
+
+
+class LineReader:
+    """Чтение файла строка за строкой"""
+
+    def __init__(
+        self,
+        file: BinaryIO
+    ) -> None:
+        self.file = file
+        self.readline = file.readline
+
+    def skip_to(
+        self,
+        word: bytes,
+        position: int
+    ) -> Tuple[int, bytes]:
+        """
+        Пропускаем строки до первой, содержащей word
+
+        position - смещение текущей строки. Возвращает смещение и саму
+        найденную строку, в конце файла - (-1, b"")
+        """
+        for line in self.file:
+            if word in line:
+                return position, line
+
+            position += len(line)
+
+        return -1, b""
+
+
+class MappedReader:
+    """
+    Чтение отображенного в память файла
+
+    Строки читаются так же, как из файла, а пропуск до нужного слова
+    выполняется поиском по байтам без разбиения на строки
+    """
+
+    def __init__(
+        self,
+        data: mmap.mmap
+    ) -> None:
+        self.data = data
+        self.readline = data.readline
+
+    def skip_to(
+        self,
+        word: bytes,
+        position: int
+    ) -> Tuple[int, bytes]:
+        data = self.data
+
+        found = data.find(word, position)
+
+        if found < 0:
+            data.seek(len(data))
+            return -1, b""
+
+        # Возвращаемся к началу строки, в которой нашлось слово
+        start = data.rfind(b"\n", position, found) + 1 or position
+
+        data.seek(start)
+
+        return start, data.readline()
+
+
+class REBParser:
+    """
+    Потоковый разбор REB донесения
+
+    Файл читается построчно, поэтому память не зависит от его размера.
+    Текст событий не копируется: для каждого события запоминается только
+    смещение и длина в исходном файле. Отличия форматов вынесены в REBFormat
+
+    Все, что лежит между событиями, и события, не попавшие в фигуру,
+    пропускаются через skip_to до следующего EVENT. Для отображенного в
+    память файла (parse_mapped) это быстрый поиск по байтам, и таблица
+    прихода волн читается только у событий внутри фигуры
+
+    Условия запроса Query проверяются по мере того, как становятся
+    известны нужные данные: строка события, затем заголовок с магнитудами
+    (перед таблицей прихода волн), затем станции в конце события
+
+    Без запроса или без условия на станции разбор отдает все события
+    вместе со всеми зарегистрировавшими их станциями (нужно для каталога)
+    """
+
+    START_WORD = b"EVENT"
+    STOP_WORD = b"STOP"
+
+    EMPTY_LINES = 3
+
+    # Дописывается к последнему событию перед STOP, чтобы в итоговом файле
+    # события были разделены так же, как и остальные
+    STOP_PADDING = b"\n\n"
+
+    def __init__(
+        self,
+        reb_format: REBFormat,
+        query: Optional[Query]=None,
+        timed: bool=False
+    ) -> None:
+        self.reb_format = reb_format
+        self.query = query or Query()
+
+        self.station_filter = self.query.station_filter
+        self.stations = self.query.station_names
+
+        # Сколько событий встретилось при разборе, подошедших и нет
+        self.seen = 0
+
+        # timed - замерять проверки условий: время по часам, процессорное
+        # время потока в секундах и число проверок попадают в filter_time
+        self.timed = timed
+        self.filter_time = [0.0, 0.0, 0]
+
+    def _timed(
+        self,
+        function: Callable[..., bool]
+    ) -> Callable[..., bool]:
+        """Проверка условий, время которой добавляется в filter_time"""
+        filter_time = self.filter_time
+        clock = time.perf_counter
+        cpu_clock = time.thread_time
+
+        def timed(*args) -> bool:
+            start = clock()
+            cpu_start = cpu_clock()
+            result = function(*args)
+            filter_time[1] += cpu_clock() - cpu_start
+            filter_time[0] += clock() - start
+            filter_time[2] += 1
+
+            return result
+
+        return timed
+
+    def _make_event(
+        self,
+        source: str,
+        event: str,
+        origin: tuple,
+        header: list,
+        stations: set,
+        offset: int,
+        length: int,
+        padding: bytes=b""
+    ) -> Event:
+        date, time, latitude, longtitude = origin
+
+        return Event(
+            None,
+            latitude,
+            longtitude,
+            event=event,
+            date=date,
+            time=time,
+            header=tuple(header),
+            stations=tuple(b" ".join(sorted(stations)).decode().split()),
+            source=source,
+            offset=offset,
+            length=length,
+            padding=padding
+        )
+
+    def parse(
+        self,
+        file: BinaryIO,
+        source: str
+    ) -> Iterator[Event]:
+        """Разбираем открытый в бинарном режиме файл и отдаем подходящие события"""
+        return self.scan(LineReader(file), source)
+
+    def parse_mapped(
+        self,
+        data: mmap.mmap,
+        source: str
+    ) -> Iterator[Event]:
+        """Разбираем отображенный в память файл"""
+        return self.scan(MappedReader(data), source)
+
+    def scan(
+        self,
+        reader,
+        source: str
+    ) -> Iterator[Event]:
+        """Разбор строк из LineReader или MappedReader"""
+        readline = reader.readline
+        skip_to = reader.skip_to
+        is_header = self.reb_format.is_header
+        parse_origin = self.reb_format.parse_origin
+        parse_header = self.reb_format.parse_header
+        parse_details = self.reb_format.parse_details
+        arrivals_word = self.reb_format.ARRIVALS_WORD
+        stations = self.stations
+        index_all = stations is None
+
+        if index_all:
+            matches = None
+        else:
+            matches = self.station_filter.matches
+
+        check = self.query.check
+        check_origin = self.query.has(ORIGIN)
+
+        if self.timed:
+            check = self._timed(check)
+
+            if matches is not None:
+                matches = self._timed(matches)
+
+        check_header = self.query.has(HEADER)
+
+        start = False
+        empty = 0
+        position = 0
+        event_offset = 0
+        event = None
+        origin = None
+        header = None
+        skipped = 0
+        arrivals = False
+        detected = set()
+
+        while True:
+            if start:
+                line = readline()
+
+                if not line:
+                    break
+
+                offset = position
+            else:
+                # Пока не нашли начало события, ищем EVENT
+                offset, line = skip_to(self.START_WORD, position)
+
+                if offset < 0:
+                    break
+
+            position = offset + len(line)
+
+            # Косячные события без данных отсекаются, когда EVENT
+            # встречается внутри уже начатого события
+            if self.START_WORD in line:
+                self.seen += 1
+                fields = line.split()
+
+                # Номер события - целое число, иначе строка EVENT
+                # испорчена, и событие пропускается целиком
+                if len(fields) < 2 or not fields[1].isdigit():
+                    start = False
+                    continue
+
+                start = True
+                empty = 0
+                event_offset = offset
+                event = fields[1].decode()
+                origin = None
+                header = None
+                skipped = 0
+                arrivals = False
+                detected = set()
+                continue
+
+            # Если нашли STOP, то заканчиваем
+            if self.STOP_WORD in line:
+                if (
+                    origin is not None and
+                    (
+                        arrivals or not check_header or
+                        check(HEADER, origin, header)
+                    ) and
+                    (index_all or matches(detected & stations))
+                ):
+                    yield self._make_event(
+                        source,
+                        event,
+                        origin,
+                        header,
+                        detected,
+                        event_offset,
+                        offset - event_offset,
+                        self.STOP_PADDING
+                    )
+                break
+
+            # Если строка пустая, то ищем конец события
+            if not line.strip():
+                empty += 1
+
+                # Если нашли 3 пустых строки, то заканчиваем считывание
+                if empty == self.EMPTY_LINES:
+                    start = False
+                    # Событие подошло по заголовку и его видели нужные станции
+                    if (
+                        origin is not None and
+                        (
+                            arrivals or not check_header or
+                            check(HEADER, origin, header)
+                        ) and
+                        (index_all or matches(detected & stations))
+                    ):
+                        yield self._make_event(
+                            source,
+                            event,
+                            origin,
+                            header,
+                            detected,
+                            event_offset,
+                            position - event_offset
+                        )
+
+                continue
+
+            empty = 0
+
+            if origin is None:
+                if is_header(line, skipped):
+                    skipped += 1
+                    continue
+
+                origin = parse_origin(line)
+
+                # Если событие не попало, то просто пропускаем его
+                if check_origin and not check(ORIGIN, origin):
+                    start = False
+                else:
+                    header = parse_header(line)
+
+                continue
+
+            # Станции ищем только в таблице прихода волн, а до нее
+            # могут быть магнитуды и погрешности
+            if not arrivals:
+                arrivals = line.split(None, 1)[0] == arrivals_word
+
+                if not arrivals:
+                    parse_details(line, header)
+
+                # Заголовок разобран целиком, таблицу прихода волн
+                # не подошедшего события не читаем
+                elif check_header and not check(HEADER, origin, header):
+                    start = False
+
+            # Строки-продолжения таблицы начинаются с пробела
+            elif not line[:1].isspace():
+                # В событие попадают все станции, а условие на станции
+                # проверяется только по выбранным
+                detected.add(line.split(None, 1)[0])
@@ -0,0 +1,384 @@
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple
+)
+
+import numpy as np
+
+from event_table import MISSING, to_epoch_ms
+from figures import Figure, Rectangle
+from reb_formats import HEADER_FIELDS
+from station_index import StationFilter
+
+
+# Когда при разборе события становятся известны данные для проверки:
+# строка события, заголовок вместе с магнитудами и погрешностями,
+# станции из таблицы прихода волн
+ORIGIN = "origin"
+HEADER = "header"
+STATIONS = "stations"
+
+STAGES = (ORIGIN, HEADER, STATIONS)
+
+# Столбцы событий для векторной проверки: column(name) -> массив
+Columns = Callable[[str], np.ndarray]
+
+
+class Predicate:
+    """
+    Условие на событие
+
+    COST - примерная стоимость одной проверки относительно сравнения
+    координат с прямоугольником. check проверяет одно событие при
+    потоковом разборе, mask - сразу много событий по столбцам
+
+    Query считает, сколько событий прошло через условие, и по этой
+    наблюдаемой избирательности переупорядочивает условия
+    """
+
+    COST = 1.0
+    STAGE = ORIGIN
+
+    def __init__(self) -> None:
+        self.checked = 0
+        self.passed = 0
+
+    def check(
+        self,
+        origin: tuple,
+        header: Optional[List[float]]
+    ) -> bool:
+        """origin - дата, время, широта и долгота, header - HEADER_FIELDS"""
+        raise NotImplementedError
+
+    def mask(
+        self,
+        column: Columns
+    ) -> np.ndarray:
+        raise NotImplementedError
+
+    def selectivity(self) -> float:
+        """Доля прошедших событий, пока проверок нет - половина"""
+        return (self.passed + 1) / (self.checked + 2)
+
+    def rank(self) -> float:
+        """Чем меньше, тем раньше проверять: дешево и отсекает много"""
+        return self.COST / max(1 - self.selectivity(), 1e-3)
+
+
+class BoundingBox(Predicate):
+    """Описанный прямоугольник фигуры - дешевая предварительная проверка"""
+
+    COST = 1.0
+
+    def __init__(
+        self,
+        figure: Figure
+    ) -> None:
+        super().__init__()
+        self.bottom, self.top, self.left, self.right = figure.bounding_box()
+
+    def check(
+        self,
+        origin: tuple,
+        header: Optional[List[float]]
+    ) -> bool:
+        return (
+            self.bottom <= origin[2] <= self.top and
+            self.left <= origin[3] <= self.right
+        )
+
+    def mask(
+        self,
+        column: Columns
+    ) -> np.ndarray:
+        latitude = column("latitude")
+        longtitude = column("longtitude")
+
+        return (
+            (latitude >= self.bottom) & (latitude <= self.top) &
+            (longtitude >= self.left) & (longtitude <= self.right)
+        )
+
+
+class InsideFigure(Predicate):
+    """Точная проверка попадания эпицентра в фигуру"""
+
+    # Прямоугольник проверяется так же быстро, как описанный
+    # прямоугольник, остальные фигуры заметно дороже
+    COST = 4.0
+    RECTANGLE_COST = 1.0
+
+    def __init__(
+        self,
+        figure: Figure
+    ) -> None:
+        super().__init__()
+        self.figure = figure
+
+        if isinstance(figure, Rectangle):
+            self.COST = self.RECTANGLE_COST
+
+    def check(
+        self,
+        origin: tuple,
+        header: Optional[List[float]]
+    ) -> bool:
+        return self.figure.check_inside(origin[2], origin[3])
+
+    def mask(
+        self,
+        column: Columns
+    ) -> np.ndarray:
+        return self.figure.check_inside_many(
+            column("latitude"),
+            column("longtitude")
+        )
+
+
+class TimeWindow(Predicate):
+    """Время события в интервале [start, end) миллисекунд от 1970 года"""
+
+    COST = 3.0
+
+    def __init__(
+        self,
+        start: int,
+        end: int
+    ) -> None:
+        super().__init__()
+        self.start = start
+        self.end = end
+
+    def check(
+        self,
+        origin: tuple,
+        header: Optional[List[float]]
+    ) -> bool:
+        return self.start <= to_epoch_ms(origin[0], origin[1]) < self.end
+
+    def mask(
+        self,
+        column: Columns
+    ) -> np.ndarray:
+        time = column("time")
+
+        return (time >= self.start) & (time < self.end)
+
+
+class HeaderRange(Predicate):
+    """
+    Поле заголовка (глубина, магнитуда и т.д.) в отрезке [low, high]
+
+    Незаданная граница не проверяется, событие без значения поля
+    не подходит
+    """
+
+    COST = 0.5
+    STAGE = HEADER
+
+    def __init__(
+        self,
+        name: str,
+        low: float=None,
+        high: float=None
+    ) -> None:
+        if name not in HEADER_FIELDS:
+            raise ValueError("Неизвестное поле заголовка: " + str(name))
+
+        super().__init__()
+        self.name = name
+        self.index = HEADER_FIELDS.index(name)
+        self.low = -np.inf if low is None else low
+        self.high = np.inf if high is None else high
+
+    def check(
+        self,
+        origin: tuple,
+        header: Optional[List[float]]
+    ) -> bool:
+        # Сравнение с NaN всегда ложно
+        return self.low <= header[self.index] <= self.high
+
+    def mask(
+        self,
+        column: Columns
+    ) -> np.ndarray:
+        values = column(self.name)
+        mask = (values >= self.low) & (values <= self.high)
+
+        # В целочисленных столбцах EventTable пропуск хранится как MISSING
+        if values.dtype.kind == "i":
+            mask &= values != MISSING
+
+        return mask
+
+
+class Stations(Predicate):
+    """
+    Условие на станции события (см. StationFilter)
+
+    Проверяется в конце события: при разборе строки таблицы прихода волн
+    сверяются с frozenset выбранных станций, в каталоге - по индексу
+    detections
+    """
+
+    STAGE = STATIONS
+
+    def __init__(
+        self,
+        station_filter: StationFilter
+    ) -> None:
+        super().__init__()
+        self.station_filter = station_filter
+        self.names = frozenset(
+            name.encode() for name in station_filter.names
+        )
+
+
+class Query:
+    """
+    Запрос к событиям из набора условий
+
+    Условия разбиты по этапам разбора события (ORIGIN, HEADER, STATIONS),
+    внутри этапа они проверяются по возрастанию rank: сначала дешевые
+    и сильнее всего отсекающие. Порядок пересматривается каждые
+    REPLAN_INTERVAL проверок по наблюдаемой избирательности
+
+    Один и тот же запрос управляет потоковым разбором (REBParser)
+    и выборкой из каталога (REBCatalog)
+    """
+
+    REPLAN_INTERVAL = 1024
+
+    def __init__(
+        self,
+        predicates: Iterable[Predicate]=()
+    ) -> None:
+        self.predicates = list(predicates)
+
+        self.stages: Dict[str, List[Predicate]] = {
+            stage: [
+                predicate for predicate in self.predicates
+                if predicate.STAGE == stage
+            ] for stage in STAGES
+        }
+
+        self.figure: Optional[Figure] = None
+        self.station_filter: Optional[StationFilter] = None
+        self.station_names: Optional[FrozenSet[bytes]] = None
+
+        for predicate in self.predicates:
+            if isinstance(predicate, InsideFigure):
+                self.figure = predicate.figure
+            elif isinstance(predicate, Stations):
+                self.station_filter = predicate.station_filter
+                self.station_names = predicate.names
+
+        self._checks = 0
+        self.plan()
+
+    def plan(self) -> None:
+        """Упорядочиваем условия каждого этапа"""
+        for stage in (ORIGIN, HEADER):
+            self.stages[stage].sort(key=Predicate.rank)
+
+    def has(
+        self,
+        stage: str
+    ) -> bool:
+        return bool(self.stages[stage])
+
+    def check(
+        self,
+        stage: str,
+        origin: tuple,
+        header: Optional[List[float]]=None
+    ) -> bool:
+        """Проверяем одно событие условиями этапа stage"""
+        self._checks += 1
+        if self._checks % self.REPLAN_INTERVAL == 0:
+            self.plan()
+
+        for predicate in self.stages[stage]:
+            predicate.checked += 1
+
+            if not predicate.check(origin, header):
+                return False
+
+            predicate.passed += 1
+
+        return True
+
+    def select(
+        self,
+        column: Columns,
+        size: int
+    ) -> np.ndarray:
+        """
+        Номера подходящих событий из size событий, заданных столбцами
+
+        Условия на станции здесь не проверяются. Каждое следующее условие
+        считается только для событий, прошедших предыдущие
+        """
+        rows = np.arange(size)
+
+        for stage in (ORIGIN, HEADER):
+            for predicate in list(self.stages[stage]):
+                if not len(rows):
+                    return rows
+
+                mask = predicate.mask(lambda name: column(name)[rows])
+
+                predicate.checked += len(rows)
+                rows = rows[mask]
+                predicate.passed += len(rows)
+
+        self.plan()
+
+        return rows
+
+    def describe(self) -> List[Tuple[str, str, float]]:
+        """Порядок условий с их наблюдаемой избирательностью"""
+        return [
+            (stage, type(predicate).__name__, predicate.selectivity())
+            for stage in STAGES
+            for predicate in self.stages[stage]
+        ]
+
+
+def make_query(
+    figure: Optional[Figure],
+    station_filter: Optional[StationFilter],
+    time_window: Optional[Tuple[int, int]]=None,
+    predicates: Sequence[Predicate]=()
+) -> Query:
+    """
+    Запрос из параметров выборки REBOptions
+
+    Для фигур сложнее прямоугольника перед точной проверкой добавляется
+    проверка описанного прямоугольника
+    """
+    query = []
+
+    if figure is not None:
+        if not isinstance(figure, Rectangle):
+            query.append(BoundingBox(figure))
+
+        query.append(InsideFigure(figure))
+
+    if time_window is not None:
+        query.append(TimeWindow(*time_window))
+
+    query.extend(predicates)
+
+    if station_filter is not None:
+        query.append(Stations(station_filter))
+
+    return Query(query)
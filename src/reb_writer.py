@@ -0,0 +1,313 @@
+import gzip
+import os
+
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from reb_archive import RangeReader, is_compressed, open_source
+from reb_event import Event
+from event_table import EventTable
+
+
+class EventWriter:
+    """
+    Запись событий в файл с результатами
+
+    Текст событий не загружается в память целиком: байты копируются
+    напрямую из исходных файлов через os.sendfile, а если он недоступен
+    или файл сжат, то буферизованным копированием. Сжатый файл
+    распаковывается потоком, события из него обычно идут по возрастанию
+    смещения, поэтому перемотка только продолжает распаковку. Таблицу,
+    в которой события сжатых файлов перемешаны (после сортировки),
+    write_table читает порциями не больше PREFETCH_SIZE байт, см.
+    _read_compressed
+
+    События можно дописывать по одному прямо во время обработки.
+    atomic - писать во временный файл рядом и переименовать его в
+    filename при закрытии, а discard удаляет неполный результат.
+    compress - сжимать результат gzip (тогда без sendfile)
+    """
+
+    BUFFER_SIZE = 1024 * 1024
+    PARTIAL_SUFFIX = ".part"
+
+    # Сколько байт событий из сжатых файлов write_table читает заранее
+    PREFETCH_SIZE = 16 * 1024 * 1024
+
+    def __init__(
+        self,
+        filename: str,
+        atomic: bool=False,
+        compress: bool=False
+    ) -> None:
+        self.filename = filename
+        self.atomic = atomic
+        self.compress = compress
+
+        # Сколько событий записано
+        self.count = 0
+
+        self._file = None
+        self._source = None
+        self._source_file = None
+        self._use_sendfile = hasattr(os, "sendfile") and not compress
+
+    def __enter__(self) -> "EventWriter":
+        self.open()
+        return self
+
+    def __exit__(
+        self,
+        error_type,
+        *args
+    ) -> None:
+        if error_type is not None and self.atomic:
+            self.discard()
+        else:
+            self.close()
+
+    def _path(self) -> str:
+        if self.atomic:
+            return self.filename + self.PARTIAL_SUFFIX
+
+        return self.filename
+
+    def open(self) -> None:
+        """Открываем файл с результатами"""
+        if self.compress:
+            self._file = gzip.open(self._path(), "wb")
+        else:
+            self._file = open(self._path(), "wb")
+
+    def close(self) -> None:
+        """Закрываем файл с результатами и последний исходный файл"""
+        self._close_source()
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+            if self.atomic:
+                os.replace(self._path(), self.filename)
+
+    def discard(self) -> None:
+        """Закрываем и удаляем неполный файл с результатами"""
+        self._close_source()
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+            os.remove(self._path())
+
+    def _close_source(self) -> None:
+        if self._source_file is not None:
+            self._source_file.close()
+
+        self._source = None
+        self._source_file = None
+
+    def _open_source(
+        self,
+        source: str
+    ) -> BinaryIO:
+        """
+        Открываем исходный файл события
+
+        События обычно идут подряд из одного файла, поэтому файл держим
+        открытым, пока не встретится событие из другого
+        """
+        if source != self._source:
+            self._close_source()
+            self._source_file = open_source(source)
+            self._source = source
+
+        return self._source_file
+
+    def _sendfile(
+        self,
+        source_file: BinaryIO,
+        offset: int,
+        length: int
+    ) -> int:
+        """
+        Копируем байты средствами ядра, не поднимая их в Python
+
+        Возвращаем количество скопированных байт
+        """
+        # Перед sendfile сбрасываем то, что накопилось в буфере Python
+        self._file.flush()
+
+        copied = 0
+        try:
+            while copied < length:
+                sent = os.sendfile(
+                    self._file.fileno(),
+                    source_file.fileno(),
+                    offset + copied,
+                    length - copied
+                )
+
+                if sent == 0:
+                    break
+
+                copied += sent
+
+        except OSError:
+            # Например, на macOS sendfile умеет писать только в сокет
+            self._use_sendfile = False
+
+        # sendfile пишет в обход позиции файлового объекта
+        self._file.seek(0, os.SEEK_END)
+        return copied
+
+    def _copy_range(
+        self,
+        source: str,
+        offset: int,
+        length: int
+    ) -> None:
+        """Копируем диапазон байтов исходного файла в результат"""
+        source_file = self._open_source(source)
+
+        if self._use_sendfile and not is_compressed(source):
+            copied = self._sendfile(source_file, offset, length)
+            offset += copied
+            length -= copied
+
+        if length <= 0:
+            return
+
+        source_file.seek(offset)
+        while length > 0:
+            chunk = source_file.read(min(length, self.BUFFER_SIZE))
+            if not chunk:
+                break
+
+            self._file.write(chunk)
+            length -= len(chunk)
+
+    def write_range(
+        self,
+        source: str,
+        offset: int,
+        length: int,
+        padding: bytes
+    ) -> None:
+        """Дописываем событие по его положению в исходном файле"""
+        self._copy_range(
+            source,
+            offset,
+            length
+        )
+
+        if padding:
+            self._file.write(padding)
+
+        self.count += 1
+
+    def write(
+        self,
+        event: Event
+    ) -> None:
+        """Дописываем событие в файл с результатами"""
+        if event.source is None:
+            self._file.write(event.read_bytes())
+            self.count += 1
+            return
+
+        self.write_range(
+            event.source,
+            event.offset,
+            event.length,
+            event.padding
+        )
+
+    def _read_compressed(
+        self,
+        reader: RangeReader,
+        ranges: List[Tuple[Optional[str], int, int, bytes]],
+        start: int
+    ) -> Tuple[int, Dict[int, bytes]]:
+        """
+        Заранее читаем события из сжатых файлов, начиная со строки start
+
+        Например, после сортировки по времени события разных файлов
+        перемешаны, и копирование по порядку распаковывало бы файл
+        с начала для каждого события. Вместо этого строки берутся
+        порцией, пока текст ее сжатых событий не превысит PREFETCH_SIZE,
+        и каждый файл порции читается по возрастанию смещения.
+        Возвращаем конец порции и текст ее сжатых событий по номерам строк
+        """
+        # (сжатый файл, смещение, длина, номер строки таблицы)
+        items = []
+        size = 0
+        stop = start
+
+        while stop < len(ranges) and size < self.PREFETCH_SIZE:
+            source, offset, length, _ = ranges[stop]
+
+            if source is not None and is_compressed(source):
+                items.append((source, offset, length, stop))
+                size += length
+
+            stop += 1
+
+        texts = dict()
+        for source, offset, length, index in sorted(items):
+            texts[index] = reader.read(source, offset, length)
+
+        return stop, texts
+
+    def write_table(
+        self,
+        table: EventTable
+    ) -> None:
+        """Дописываем все события таблицы, не собирая объекты Event"""
+        ranges = list(table.ranges())
+
+        # Все сжатые файлы остаются открытыми, чтобы следующая порция
+        # продолжала их распаковку, а не начинала заново
+        sources = {
+            source for source, _, _, _ in ranges
+            if source is not None and is_compressed(source)
+        }
+
+        with RangeReader(max(len(sources), 1)) as reader:
+            start = 0
+
+            while start < len(ranges):
+                stop, texts = self._read_compressed(reader, ranges, start)
+
+                for index in range(start, stop):
+                    source, offset, length, padding = ranges[index]
+
+                    if source is None:
+                        self.write(table[index])
+                    elif index in texts:
+                        self._file.write(texts.pop(index) + padding)
+                        self.count += 1
+                    else:
+                        self.write_range(source, offset, length, padding)
+
+                start = stop
+
+
+def write_events(
+    filename: str,
+    events: Iterable[Event],
+    compress: bool=False
+) -> int:
+    """
+    Пишем текст всех событий в файл, возвращаем их количество
+
+    events может быть генератором, например REBOptions.iter_events:
+    тогда события не копятся в памяти, а сразу пишутся в файл
+    """
+    with EventWriter(filename, compress=compress) as writer:
+        if isinstance(events, EventTable):
+            writer.write_table(events)
+        else:
+            for event in events:
+                writer.write(event)
+
+    return writer.count
@@ -0,0 +1,283 @@
+import cProfile
+import datetime
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+from typing import Any, Dict, Optional
+
+
+# Этапы обработки: обход папок, чтение начала файлов (формат и интервал
+# бюллетеня), разбор, выборка по каталогу, запись результата, отрисовка
+WALK = "walk"
+SNIFF = "sniff"
+PARSE = "parse"
+FILTER = "filter"
+WRITE = "write"
+RENDER = "render"
+
+STAGES = (WALK, SNIFF, PARSE, FILTER, WRITE, RENDER)
+
+# Счетчики
+FILES = "files"
+SKIPPED = "files_skipped"
+BYTES = "bytes"
+EVENTS_SEEN = "events_seen"
+EVENTS_ACCEPTED = "events_accepted"
+ERRORS = "errors"
+
+COUNTERS = (FILES, SKIPPED, BYTES, EVENTS_SEEN, EVENTS_ACCEPTED, ERRORS)
+
+# Файл отчета, если профилирование включено без --report
+REPORT_FILE = "run_report.json"
+
+
+class _Stage:
+    """Замер одного вхождения в этап, используется в with"""
+
+    __slots__ = ("metrics", "name", "wall", "cpu")
+
+    def __init__(
+        self,
+        metrics: "RunMetrics",
+        name: str
+    ) -> None:
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+
+    def __exit__(self, *args) -> None:
+        self.metrics.add(
+            self.name,
+            time.perf_counter() - self.wall,
+            time.thread_time() - self.cpu
+        )
+
+
+class RunMetrics:
+    """
+    Время этапов и счетчики одного запуска REBOptions
+
+    Для каждого этапа копится время по часам и процессорное время потока,
+    который его выполнял (распаковка в фоновом потоке PrefetchStream в
+    него не входит). Этапы из дочерних процессов приходят через snapshot
+    и merge. Запись из разных потоков (разбор в фоне, отрисовка в окне)
+    защищена блокировкой
+
+    profile - профилировать запуск cProfile (только поток, вызвавший
+    start), trace_memory - следить за пиком памяти через tracemalloc
+    """
+
+    # Сколько строк профиля и мест выделения памяти попадает в отчет
+    PROFILE_LINES = 30
+    MEMORY_LINES = 10
+
+    def __init__(
+        self,
+        profile: bool=False,
+        trace_memory: bool=False
+    ) -> None:
+        self.profile = profile
+        self.trace_memory = trace_memory
+
+        # Дополнительные сведения о запуске: режим, условия запроса и т.д.
+        self.details: Dict[str, Any] = dict()
+
+        self.running = False
+
+        self._lock = threading.Lock()
+        self._profiler: Optional[cProfile.Profile] = None
+        self._stats: Optional[pstats.Stats] = None
+        self._memory: Optional[Dict[str, Any]] = None
+        self._started_tracing = False
+
+        self.reset()
+
+    def reset(self) -> None:
+        """Обнуляем замеры перед новым запуском"""
+        # Этап -> [время по часам, процессорное время, число вхождений]
+        self.stages: Dict[str, list] = {name: [0.0, 0.0, 0] for name in STAGES}
+        self.counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+
+        self.started = datetime.datetime.now()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._elapsed: Optional[float] = None
+        self._cpu_elapsed: Optional[float] = None
+
+    def stage(
+        self,
+        name: str
+    ) -> _Stage:
+        """with metrics.stage(PARSE): ... - замер этапа name"""
+        return _Stage(self, name)
+
+    def add(
+        self,
+        name: str,
+        wall: float,
+        cpu: float,
+        calls: int=1
+    ) -> None:
+        with self._lock:
+            stage = self.stages[name]
+            stage[0] += wall
+            stage[1] += cpu
+            stage[2] += calls
+
+    def count(
+        self,
+        name: str,
+        value: int=1
+    ) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def start(self) -> None:
+        """Начинаем запуск: обнуляем замеры и включаем профилирование"""
+        self.reset()
+        self.running = True
+        self._stats = None
+        self._memory = None
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def finish(self) -> None:
+        """Заканчиваем запуск, итоговое время фиксируется"""
+        if not self.running:
+            return
+
+        self.running = False
+        self._elapsed = time.perf_counter() - self._wall
+        self._cpu_elapsed = time.process_time() - self._cpu
+
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._stats = pstats.Stats(self._profiler)
+            self._profiler = None
+
+        if tracemalloc.is_tracing() and self.trace_memory:
+            self._memory = self._memory_report()
+
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Замеры в виде словаря, который можно передать между процессами"""
+        with self._lock:
+            return {
+                "stages": {
+                    name: list(values) for name, values in self.stages.items()
+                },
+                "counters": dict(self.counters)
+            }
+
+    def merge(
+        self,
+        snapshot: Dict[str, Any]
+    ) -> None:
+        """Добавляем замеры из snapshot, например из дочернего процесса"""
+        for name, (wall, cpu, calls) in snapshot["stages"].items():
+            if calls:
+                self.add(name, wall, cpu, calls)
+
+        for name, value in snapshot["counters"].items():
+            if value:
+                self.count(name, value)
+
+    def _memory_report(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics("lineno")
+
+        return {
+            "current": current,
+            "peak": peak,
+            "top": [
+                {
+                    "location": "{}:{}".format(
+                        statistic.traceback[0].filename,
+                        statistic.traceback[0].lineno
+                    ),
+                    "size": statistic.size,
+                    "count": statistic.count
+                } for statistic in top[:self.MEMORY_LINES]
+            ]
+        }
+
+    def _profile_report(self) -> list:
+        """Самые долгие функции по накопленному времени"""
+        stats = self._stats.stats
+        functions = sorted(
+            stats,
+            key=lambda function: stats[function][3],
+            reverse=True
+        )
+
+        return [
+            {
+                "function": "{}:{}({})".format(*function),
+                "calls": stats[function][1],
+                "total": stats[function][2],
+                "cumulative": stats[function][3]
+            } for function in functions[:self.PROFILE_LINES]
+        ]
+
+    def report(self) -> Dict[str, Any]:
+        """Отчет о запуске, незаконченный запуск считается до текущего момента"""
+        snapshot = self.snapshot()
+
+        elapsed = self._elapsed
+        cpu_elapsed = self._cpu_elapsed
+        if elapsed is None:
+            elapsed = time.perf_counter() - self._wall
+            cpu_elapsed = time.process_time() - self._cpu
+
+        report = {
+            "started": self.started.isoformat(timespec="seconds"),
+            "wall": elapsed,
+            "cpu": cpu_elapsed,
+            "stages": {
+                name: {"wall": wall, "cpu": cpu, "calls": calls}
+                for name, (wall, cpu, calls) in snapshot["stages"].items()
+            },
+            "counters": snapshot["counters"]
+        }
+
+        report.update(self.details)
+
+        if self._stats is not None:
+            report["profile"] = self._profile_report()
+
+        if self._memory is not None:
+            report["memory"] = self._memory
+
+        return report
+
+    def write(
+        self,
+        filename: str
+    ) -> None:
+        """
+        Пишем отчет в JSON файл
+
+        Полный профиль сохраняется рядом с расширением .prof, его можно
+        открыть через pstats или snakeviz
+        """
+        with open(filename, "w", encoding="utf-8") as file:
+            json.dump(self.report(), file, ensure_ascii=False, indent=4)
+
+        if self._stats is not None:
+            self._stats.dump_stats(os.path.splitext(filename)[0] + ".prof")
@@ -0,0 +1,67 @@
+import math
+
+from typing import List, Tuple
+
+
+class LatLonGrid:
+    """
+    Равномерная сетка по широте и долготе
+
+    Каждой точке соответствует номер ячейки. Ячейки одной строки сетки
+    идут подряд, поэтому прямоугольная область превращается в небольшой
+    набор непрерывных диапазонов номеров, по которым удобно искать в индексе
+    """
+
+    def __init__(
+        self,
+        cell_size: float=1.0
+    ) -> None:
+        self.cell_size = cell_size
+        self.rows = int(math.ceil(180 / cell_size))
+        self.columns = int(math.ceil(360 / cell_size))
+
+    def _row(
+        self,
+        latitude: float
+    ) -> int:
+        row = int((latitude + 90) // self.cell_size)
+        return min(max(row, 0), self.rows - 1)
+
+    def _column(
+        self,
+        longtitude: float
+    ) -> int:
+        column = int((longtitude + 180) // self.cell_size)
+        return min(max(column, 0), self.columns - 1)
+
+    def cell(
+        self,
+        latitude: float,
+        longtitude: float
+    ) -> int:
+        """Номер ячейки, в которую попадает точка"""
+        return self._row(latitude) * self.columns + self._column(longtitude)
+
+    def ranges(
+        self,
+        bounding_box: Tuple[float, float, float, float]
+    ) -> List[Tuple[int, int]]:
+        """
+        Диапазоны номеров ячеек (включительно), которые покрывают
+        область (нижняя широта, верхняя широта, левая долгота, правая долгота)
+        """
+        latitude_min, latitude_max, longtitude_min, longtitude_max = bounding_box
+
+        first_column = self._column(longtitude_min)
+        last_column = self._column(longtitude_max)
+
+        return [
+            (
+                row * self.columns + first_column,
+                row * self.columns + last_column
+            )
+            for row in range(
+                self._row(latitude_min),
+                self._row(latitude_max) + 1
+            )
+        ]
@@ -1,13 +1,14 @@
-from matplotlib import axes
-from cartopy.crs import Projection
-from matplotlib.transforms import offset_copy
 import json
-from typing import List
+from typing import List, TYPE_CHECKING
 
 from area_shapes import AreaDot, AreaRectangle
 
 from testing_area import TestingArea
 
+if TYPE_CHECKING:
+    from matplotlib import axes
+    from cartopy.crs import Projection
+
 
 class Station:
     """Данные станции"""
@@ -87,10 +88,12 @@ class Station:
 
     def draw_on_map(
         self,
-        ax: axes,
-        projection: Projection
+        ax: "axes",
+        projection: "Projection"
     ) -> None:
         """Отрисовываем станцию и ее полигоны на карте"""
+        from matplotlib.transforms import offset_copy
+
         # Отрисовываем сам полигон
         ax.plot(
             self.longtitude,
@@ -0,0 +1,56 @@
+from typing import FrozenSet, Iterable
+
+
+class StationFilter:
+    """
+    Условие на станции, которые зарегистрировали событие
+
+    mode - режим совпадения:
+    any - хотя бы одна из выбранных станций
+    all - все выбранные станции
+    at_least - не менее count выбранных станций
+    """
+
+    ANY = "any"
+    ALL = "all"
+    AT_LEAST = "at_least"
+
+    MODES = (ANY, ALL, AT_LEAST)
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        mode: str=ANY,
+        count: int=1
+    ) -> None:
+        if mode not in self.MODES:
+            raise ValueError("Неизвестный режим выбора станций: " + str(mode))
+
+        self.names: FrozenSet[str] = frozenset(names)
+        self.mode = mode
+        self.count = count
+
+        if mode == self.ALL:
+            self.required = len(self.names)
+        elif mode == self.AT_LEAST:
+            self.required = max(count, 1)
+        else:
+            self.required = 1
+
+    def is_empty(self) -> bool:
+        """Без выбранных станций ни одно событие не подходит"""
+        return not self.names
+
+    def matches(
+        self,
+        detected: Iterable[str]
+    ) -> bool:
+        """
+        Проверяем набор станций события
+
+        detected - станции события, уже отобранные из выбранных
+        """
+        if self.is_empty():
+            return False
+
+        return len(set(detected)) >= self.required
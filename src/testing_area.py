@@ -1,5 +1,8 @@
-from matplotlib import axes
-from cartopy.crs import Projection
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from matplotlib import axes
+    from cartopy.crs import Projection
 
 from area_shapes import AreaShape
 
@@ -27,8 +30,8 @@ class TestingArea:
 
     def draw_on_map(
         self,
-        ax: axes,
-        projection: Projection
+        ax: "axes",
+        projection: "Projection"
     ) -> None:
         """Отрисовка полигона на карте"""
         self.shape.draw_on_map(
@@ -0,0 +1,165 @@
+import json
+import math
+import os
+
+from collections import OrderedDict
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class TileRegion:
+    """
+    Пирамида тайлов одного участка карты
+
+    Участок описывается файлом manifest.json в своей папке: границы
+    (западная, восточная долгота, южная, северная широта), размер тайла и
+    размеры изображения на каждом уровне, от самого грубого к самому
+    подробному. Тайл уровня z лежит в файле z/<строка>_<столбец>.<формат>,
+    строки считаются с севера
+    """
+
+    MANIFEST = "manifest.json"
+
+    def __init__(
+        self,
+        path: str
+    ) -> None:
+        self.path = path
+
+        with open(os.path.join(path, self.MANIFEST), encoding="utf-8") as file:
+            manifest = json.load(file)
+
+        self.name = manifest["name"]
+        self.west, self.east, self.south, self.north = manifest["extent"]
+        self.tile_size = manifest["tile_size"]
+        self.format = manifest["format"]
+        self.levels = manifest["levels"]
+
+    def choose_level(
+        self,
+        degrees_per_pixel: float
+    ) -> int:
+        """Самый грубый уровень, подробности которого хватает для экрана"""
+        for z, level in enumerate(self.levels):
+            if (self.east - self.west) / level["width"] <= degrees_per_pixel:
+                return z
+
+        return len(self.levels) - 1
+
+    def tile_path(
+        self,
+        z: int,
+        row: int,
+        column: int
+    ) -> str:
+        return os.path.join(
+            self.path,
+            str(z),
+            "{}_{}.{}".format(row, column, self.format)
+        )
+
+    def tiles(
+        self,
+        z: int,
+        extent: Tuple[float, float, float, float]
+    ) -> List[Tuple[str, Tuple[float, float, float, float]]]:
+        """
+        Тайлы уровня z, которые видны в области extent
+        (западная, восточная долгота, южная, северная широта)
+
+        Возвращает пути к файлам тайлов и их границы в том же порядке
+        """
+        west, east, south, north = extent
+
+        if (
+            west >= self.east or east <= self.west or
+            south >= self.north or north <= self.south
+        ):
+            return []
+
+        level = self.levels[z]
+
+        # Размер пикселя уровня в градусах
+        dx = (self.east - self.west) / level["width"]
+        dy = (self.north - self.south) / level["height"]
+
+        columns = math.ceil(level["width"] / self.tile_size)
+        rows = math.ceil(level["height"] / self.tile_size)
+
+        step_x = dx * self.tile_size
+        step_y = dy * self.tile_size
+
+        first_column = max(int((west - self.west) // step_x), 0)
+        last_column = min(int((east - self.west) // step_x), columns - 1)
+        first_row = max(int((self.north - north) // step_y), 0)
+        last_row = min(int((self.north - south) // step_y), rows - 1)
+
+        return [
+            (
+                self.tile_path(z, row, column),
+                (
+                    self.west + column * step_x,
+                    min(self.west + (column + 1) * step_x, self.east),
+                    max(self.north - (row + 1) * step_y, self.south),
+                    self.north - row * step_y
+                )
+            )
+            for row in range(first_row, last_row + 1)
+            for column in range(first_column, last_column + 1)
+        ]
+
+
+def load_regions(path: str) -> List[TileRegion]:
+    """Все участки из папки с тайлами, новый участок - просто новая папка"""
+    if not os.path.isdir(path):
+        return []
+
+    return [
+        TileRegion(os.path.join(path, name))
+        for name in sorted(os.listdir(path))
+        if os.path.exists(os.path.join(path, name, TileRegion.MANIFEST))
+    ]
+
+
+class TileCache:
+    """
+    Кэш прочитанных тайлов
+
+    Хранит не больше max_tiles изображений, при переполнении выбрасывается
+    тайл, к которому дольше всего не обращались
+    """
+
+    MAX_TILES = 256
+
+    def __init__(
+        self,
+        max_tiles: int=MAX_TILES
+    ) -> None:
+        self.max_tiles = max_tiles
+        self.tiles: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    def get(
+        self,
+        path: str
+    ) -> Optional[np.ndarray]:
+        """Изображение тайла, отсутствующий файл дает None"""
+        tile = self.tiles.get(path)
+
+        if tile is not None:
+            self.tiles.move_to_end(path)
+            return tile
+
+        if not os.path.exists(path):
+            return None
+
+        from matplotlib.image import imread
+
+        tile = imread(path)
+
+        self.tiles[path] = tile
+        if len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+
+        return tile
@@ -12,6 +12,14 @@ from figure_buttons import RectangleButton, EllipseButton
 
 from reb_options import REBOptions
 
+from event_table import EventTable
+
+from reb_export import EXPORTERS
+
+from processing_thread import ProcessingThread
+
+from run_metrics import REPORT_FILE, RENDER, RunMetrics
+
 import os
 import subprocess
 import argparse
@@ -30,7 +38,7 @@ class CustomGridLayout(QtWidgets.QGridLayout):
 
 class MainWindow(QtWidgets.QMainWindow):
     """Главное окно программы"""
-    MAP_UPDATE_FREQ = 100  # Количество милесекунд между обновлениями
+    MAP_UPDATE_DELAY = 100  # Пауза в милесекундах перед перерисовкой карты
     def __init__(
         self,
         window_title: str,
@@ -65,13 +73,20 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.current_figure = None
 
+        self._create_map_timer()
+
         self.ellipse()
 
         self.instruments = InstrumentsContainer(self, self.resources_path)
 
         self.reb_options = None
 
-        self.events = list()
+        self.processing_thread = None
+
+        # Нужно ли записать отчет о запуске после отрисовки результата
+        self.report_pending = False
+
+        self.events = EventTable()
 
         self.event_names_visible = True
 
@@ -79,32 +94,30 @@ class MainWindow(QtWidgets.QMainWindow):
             lambda: self._start_processing()
         )
 
+        self.instruments.cancel_button.clicked.connect(
+            lambda: self._cancel_processing()
+        )
+
         self._connect_map_update()
 
         self.showMaximized()
 
     def _start_processing(self) -> None:
-        """Начинаем парсинг файлов"""
+        """Начинаем парсинг файлов в фоновом потоке"""
+        if self.processing_thread is not None:
+            return
+
         try:
             self.reb_options = REBOptions(
                 self.current_figure.get_figure(),
                 self.instruments.get_directory(),
-                self.instruments.get_stations()
-            )
-
-            self._deactivate()
-
-            self.reb_options.process_directories()
-
-            self.events = self.reb_options.get_events()
-
-            self._write_to_file()
-
-            self.map.update(
                 self.instruments.get_stations(),
-                self.current_figure.get_figure(),
-                self.events,
-                self.event_names_visible
+                workers=self.argv.workers,
+                catalog=self.argv.catalog,
+                mapped=self.argv.mapped,
+                station_mode=self.instruments.get_station_mode(),
+                min_stations=self.instruments.get_min_stations(),
+                metrics=RunMetrics(self.argv.profile, self.argv.trace_memory)
             )
 
         except NotADirectoryError:
@@ -113,36 +126,146 @@ class MainWindow(QtWidgets.QMainWindow):
                 "Не указана папка",
                 "Укажите корректную папку"
             )
+            return
+
+        self.processing_thread = ProcessingThread(
+            self.reb_options,
+            self._ask_result_file(),
+            self
+        )
+
+        self.processing_thread.progress_changed.connect(
+            self.instruments.show_progress
+        )
+        self.processing_thread.processing_failed.connect(
+            self._processing_failed
+        )
+        self.processing_thread.finished.connect(self._finish_processing)
+
+        self._deactivate()
+
+        self.processing_thread.start()
+
+    def _cancel_processing(self) -> None:
+        """Просим фоновый поток остановиться после текущего файла"""
+        if self.processing_thread is not None:
+            self.processing_thread.cancel()
 
-    def _write_to_file(self) -> None:
-        """Пишем данные по событиям в текстовый файл"""
-        filename = QtWidgets.QFileDialog.getSaveFileName(
+    def _processing_failed(
+        self,
+        message: str
+    ) -> None:
+        QtWidgets.QMessageBox.critical(
+            self,
+            "Ошибка обработки",
+            message
+        )
+
+    def _finish_processing(self) -> None:
+        """Показываем результат, когда фоновый поток закончил работу"""
+        cancelled = self.processing_thread.is_cancelled()
+        self.processing_thread = None
+
+        self._activate()
+
+        self.events = self.reb_options.get_events()
+
+        # Неполный результат показываем на карте, а файл с ним удален
+        if cancelled:
+            QtWidgets.QMessageBox.information(
+                self,
+                "Обработка отменена",
+                "Найдено событий до отмены: {}".format(len(self.events))
+            )
+
+        # Отчет пишется после отрисовки результата, чтобы в него попало
+        # время карты
+        self.report_pending = bool(
+            self.argv.report or self.argv.profile or self.argv.trace_memory
+        )
+
+        self._schedule_map_update(GlobeMap.EVENTS, GlobeMap.LABELS)
+
+    def _ask_result_file(self) -> str:
+        """
+        Файл, в который события пишутся во время обработки,
+        пустая строка - не записывать
+        """
+        return QtWidgets.QFileDialog.getSaveFileName(
             self,
             "Файл с результатами",
-            filter="Текстовые файлы (*.txt)"
+            filter=";;".join(
+                ["Текстовые файлы (*.txt)"] + [
+                    "Таблица событий {} (*{})".format(
+                        exporter.NAME,
+                        exporter.EXTENSION
+                    ) for exporter in EXPORTERS.values()
+                ]
+            )
         )[0]
 
-        if filename:
-            with open(filename, "w", encoding="utf-8") as file:
-                for event in self.events:
-                    file.write(event.data)
-
     def _deactivate(self) -> None:
-        """Деактивируем все элементы управления и обновление карты"""
-        self.refresh_timer.timeout.disconnect()
+        """Деактивируем элементы управления на время обработки"""
+        self.instruments.set_processing(True)
 
-    def _connect_map_update(self) -> None:
-        """Подключаем обновление карты по таймеру"""
-        self.refresh_timer = QtCore.QTimer()
-        self.refresh_timer.timeout.connect(
-            lambda: self.map.update(
+    def _activate(self) -> None:
+        """Возвращаем элементы управления после обработки"""
+        self.instruments.set_processing(False)
+
+    def _create_map_timer(self) -> None:
+        """
+        Таймер отложенной перерисовки карты
+
+        Изменения копятся, пока пользователь правит поля, и карта
+        перерисовывается один раз после паузы
+        """
+        self.dirty_layers = set()
+
+        self.map_timer = QtCore.QTimer(self)
+        self.map_timer.setSingleShot(True)
+        self.map_timer.setInterval(self.MAP_UPDATE_DELAY)
+        self.map_timer.timeout.connect(lambda: self._update_map())
+
+    def _schedule_map_update(
+        self,
+        *layers: str
+    ) -> None:
+        """Отмечаем слои карты для перерисовки"""
+        self.dirty_layers.update(layers)
+        self.map_timer.start()
+
+    def _update_map(self) -> None:
+        """Перерисовываем изменившиеся слои карты"""
+        layers = [
+            layer for layer in GlobeMap.LAYERS if layer in self.dirty_layers
+        ]
+        self.dirty_layers.clear()
+
+        if self.reb_options is None:
+            metrics = RunMetrics()
+        else:
+            metrics = self.reb_options.metrics
+
+        with metrics.stage(RENDER):
+            self.map.update(
                 self.instruments.get_stations(),
                 self.current_figure.get_figure(),
                 self.events,
-                self.event_names_visible
+                self.event_names_visible,
+                layers
             )
+
+        if self.report_pending:
+            self.report_pending = False
+            metrics.write(self.argv.report or REPORT_FILE)
+
+    def _connect_map_update(self) -> None:
+        """Подключаем обновление карты к изменениям станций"""
+        self.instruments.stations_box.stations_changed.connect(
+            lambda: self._schedule_map_update(GlobeMap.STATIONS)
         )
-        self.refresh_timer.start(self.MAP_UPDATE_FREQ)
+
+        self._schedule_map_update(*GlobeMap.LAYERS)
 
     def _create_layout(
         self,
@@ -180,8 +303,8 @@ class MainWindow(QtWidgets.QMainWindow):
         globe_map: GlobeMap
     ) -> None:
         """Добавляем карту в окно"""
-        self.l.addWidget(globe_map.canvas, 2, 0, 1, 9)
-        self.l.addWidget(globe_map.toolbar, 3, 0, 1, 9)
+        self.l.addWidget(globe_map.canvas, 2, 0, 1, 11)
+        self.l.addWidget(globe_map.toolbar, 3, 0, 1, 11)
 
     def remove_widget(
         self,
@@ -269,6 +392,11 @@ class MainWindow(QtWidgets.QMainWindow):
         ce: QtGui.QCloseEvent
     ) -> None:
         """Еще одно закрытие окна"""
+        # Не оставляем работающий поток после закрытия окна
+        if self.processing_thread is not None:
+            self.processing_thread.cancel()
+            self.processing_thread.wait()
+
         self.file_quit()
 
     def _apply_figure(
@@ -283,6 +411,13 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.current_figure.populate_window()
 
+        for field in self.current_figure.get_fields():
+            field.valueChanged.connect(
+                lambda value: self._schedule_map_update(GlobeMap.FIGURE)
+            )
+
+        self._schedule_map_update(GlobeMap.FIGURE)
+
     def ellipse(self) -> None:
         # На карте эллипс
         self._apply_figure(EllipseButton)
@@ -327,9 +462,4 @@ class MainWindow(QtWidgets.QMainWindow):
         """Включаем и выключаем подписи событий"""
         self.event_names_visible = not self.event_names_visible
 
-        self.map.update(
-            self.instruments.get_stations(),
-            self.current_figure.get_figure(),
-            self.events,
-            self.event_names_visible
-        )
+        self._schedule_map_update(GlobeMap.LABELS)